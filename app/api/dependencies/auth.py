@@ -3,19 +3,32 @@ from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.dependencies.database import get_db
 from app.core.config import settings
+from app.core.security import QueueClaims
+from app.models.queue import queue_admins
 from app.models.user import User
 from app.schemas.user import TokenData
+from app.services.auth_cache import admin_membership_cache, auth_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-) -> User:
+async def authenticate_token(token: str, db: AsyncSession) -> User:
+    """Resolve a bearer token to its user, or raise 401.
+
+    Recently seen tokens are answered from ``auth_cache`` without decoding
+    them or querying ``users``.
+    """
+    cached = auth_cache.get(token)
+    if cached is not None:
+        merged = await db.merge(cached, load=False)
+        merged.queue_claims = cached.queue_claims
+        return merged
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -32,12 +45,50 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception from None
 
-    user = db.query(User).filter(User.username == token_data.username).first()
+    user = await db.scalar(select(User).where(User.username == token_data.username))
     if user is None:
         raise credentials_exception
+    user.queue_claims = QueueClaims.from_payload(payload)
+    auth_cache.set(token, user, payload.get("exp"))
     return user
 
 
+async def is_queue_admin(db: AsyncSession, user: User, queue_id: int) -> bool:
+    """Whether the user manages the queue.
+
+    Current queue claims in the user's token answer without a query. Otherwise
+    one ``EXISTS`` on the ``queue_admins`` primary key decides, memoized in
+    ``admin_membership_cache``; routes that change admins invalidate it, so
+    newly added admins are recognised at once.
+    """
+    claims = user.queue_claims
+    if claims is not None and claims.grants(queue_id, int(user.queue_claims_version)):
+        return True
+
+    user_id = int(user.id)
+    cached = admin_membership_cache.get(user_id, queue_id)
+    if cached is not None:
+        return cached
+    is_admin = bool(
+        await db.scalar(
+            select(
+                exists().where(
+                    queue_admins.c.user_id == user_id,
+                    queue_admins.c.queue_id == queue_id,
+                )
+            )
+        )
+    )
+    admin_membership_cache.set(user_id, queue_id, is_admin)
+    return is_admin
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
+) -> User:
+    return await authenticate_token(token, db)
+
+
 async def get_current_active_user(
     current_user: User = Depends(get_current_user),
 ) -> User:
@@ -49,12 +100,9 @@ async def get_current_active_user(
 async def get_queue_admin(
     queue_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> User:
     # Check if user is admin of this queue
-    from app.models.queue import Queue
-
-    queue = db.query(Queue).filter_by(id=queue_id).first()
-    if not queue or current_user not in queue.admins:
+    if not await is_queue_admin(db, current_user, queue_id):
         raise HTTPException(status_code=403, detail="Not authorized for this queue")
     return current_user
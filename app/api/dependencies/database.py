@@ -1,11 +1,16 @@
-from collections.abc import Generator
+from collections.abc import AsyncGenerator
 
-from app.db.base import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.db.base import AsyncSessionLocal, ReadSessionLocal
 
-def get_db() -> Generator:
-    db = SessionLocal()
-    try:
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Session on the read-only engine, for routes that never write."""
+    async with ReadSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,75 @@
+"""Conditional GET support for the read routes.
+
+Every change to a queue or its entries bumps ``Queue.version``, so a weak ETag
+built from the version identifies a response without building it. Routes look
+the version up first and answer ``304 Not Modified`` when the client already
+has that representation.
+"""
+
+from typing import Optional
+
+from fastapi import Request, Response
+
+from app.core.config import settings
+
+
+def weak_etag(*parts: object) -> str:
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def public_cache_control() -> str:
+    """Cache-Control for listings anyone may see and briefly reuse."""
+    return (
+        f"public, max-age={settings.http_cache_max_age_seconds}, "
+        f"stale-while-revalidate={settings.http_cache_stale_while_revalidate_seconds}"
+    )
+
+
+# Entry data includes phone numbers: only the client itself may cache it, and it
+# must check with us before reusing it
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+
+def _caching_headers(etag: str, cache_control: str) -> dict[str, str]:
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison: ignore the W/ prefix on both sides
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified(
+    request: Request, response: Response, etag: str, cache_control: str
+) -> Optional[Response]:
+    """Set the caching headers, and return a 304 if the client's copy is current.
+
+    Routes return the 304 as is, or carry on building the body; either way
+    the response carries the ETag and Cache-Control.
+    """
+    headers = _caching_headers(etag, cache_control)
+    response.headers.update(headers)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return None
+
+
+def json_response(
+    body: bytes,
+    etag: str,
+    cache_control: str,
+    headers: Optional[dict[str, str]] = None,
+) -> Response:
+    """Send an already serialized JSON body with its caching headers."""
+    return Response(
+        body,
+        media_type="application/json",
+        headers={**_caching_headers(etag, cache_control), **(headers or {})},
+    )
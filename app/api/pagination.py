@@ -0,0 +1,40 @@
+"""Opaque cursors for keyset pagination of the listings.
+
+A page's ``X-Next-Cursor`` header carries the key of its last row; passing it
+back as ``?cursor=`` continues with the rows after that key, found by seeking
+through an index rather than skipping rows. The header is absent on the last
+page. Cursors are base64-encoded JSON arrays of integers; their contents are
+an implementation detail, so clients must not build or edit them.
+"""
+
+import base64
+import binascii
+import json
+from typing import Optional
+
+from fastapi import HTTPException
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values: int) -> str:
+    data = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[tuple[int, ...]]:
+    """The integers in ``cursor``, or None without one; 400 if it is malformed."""
+    if cursor is None:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        values = None
+    if (
+        not isinstance(values, list)
+        or len(values) != size
+        or not all(type(value) is int for value in values)
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return tuple(values)
@@ -1,32 +1,56 @@
+from collections.abc import Callable
 from datetime import timedelta
+from typing import Any, TypeVar
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.dependencies.database import get_db
 from app.core.config import settings
-from app.core.security import create_access_token, get_password_hash, verify_password
+from app.core.security import (
+    create_access_token,
+    get_password_hash,
+    verify_and_update_password,
+)
+from app.models.queue import queue_admins
 from app.models.user import User
 from app.schemas.user import Token, UserCreate
 from app.schemas.user import User as UserSchema
+from app.services.password_hashing import PasswordHashingBusy, password_hasher
 
 router = APIRouter()
 
+T = TypeVar("T")
+
+
+async def _hash_password_call(fn: Callable[..., T], *args: Any) -> T:
+    """Run a bcrypt call on the hashing pool, or answer 503 if it is saturated."""
+    try:
+        return await password_hasher.run(fn, *args)
+    except PasswordHashingBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-ins in progress, please retry shortly",
+            headers={"Retry-After": "1"},
+        ) from None
+
 
 @router.post("/register", response_model=UserSchema)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = (
-        db.query(User)
-        .filter((User.email == user.email) | (User.username == user.username))
-        .first()
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    db_user = await db.scalar(
+        select(User).where(
+            (User.email == user.email) | (User.username == user.username)
+        )
     )
     if db_user:
         raise HTTPException(
             status_code=400, detail="Email or username already registered"
         )
 
-    hashed_password = get_password_hash(user.password)
+    # bcrypt is CPU-bound; keep it off the event loop and the shared threadpool
+    hashed_password = await _hash_password_call(get_password_hash, user.password)
     db_user = User(
         email=user.email,
         username=user.username,
@@ -34,26 +58,44 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         phone_number=user.phone_number,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 
 @router.post("/token", response_model=Token)
-def login(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+async def login(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_db),
 ):
-    user = db.query(User).filter(User.username == form_data.username).first()
+    user = await db.scalar(select(User).where(User.username == form_data.username))
 
-    if not user or not verify_password(form_data.password, str(user.hashed_password)):
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await _hash_password_call(
+            verify_and_update_password, form_data.password, str(user.hashed_password)
+        )
+    if not user or not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if new_hash is not None:
+        # Hashed under an older cost policy: upgrade it while we have the password
+        user.hashed_password = new_hash
+        await db.commit()
+
+    # Embed the queues the user manages, so admin routes can skip the lookup
+    managed_queue_ids = await db.scalars(
+        select(queue_admins.c.queue_id).where(queue_admins.c.user_id == user.id)
+    )
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": user.username},
+        expires_delta=access_token_expires,
+        managed_queue_ids=managed_queue_ids.all(),
+        queue_claims_version=int(user.queue_claims_version),
     )
     return {"access_token": access_token, "token_type": "bearer"}
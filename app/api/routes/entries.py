@@ -1,32 +1,117 @@
-from typing import Optional
-
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy.sql import func
-
-from app.api.dependencies.auth import get_current_active_user
-from app.api.dependencies.database import get_db
+import json
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from typing import Any, Optional, TypeVar
+
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, func, insert, literal, null, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, joinedload
+
+from app.api.dependencies.auth import get_current_active_user, is_queue_admin
+from app.api.dependencies.database import get_db, get_read_db
+from app.api.http_cache import PRIVATE_CACHE_CONTROL, not_modified, weak_etag
+from app.api.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from app.core.config import settings
+from app.db.base import ReadSessionLocal
 from app.models.queue import EntryStatus, Queue, QueueEntry, QueueStatus
 from app.models.user import User
 from app.schemas.queue import (
     QueueEntry as QueueEntrySchema,
 )
 from app.schemas.queue import (
+    QueueEntryBulkCreate,
+    QueueEntryBulkResult,
     QueueEntryCreate,
+    QueueEntryInDB,
 )
+from app.services.broker import event_broker
+from app.services.events import EntryTracker, QueueEvent, Subscription, event_hub
+from app.services.outbox import enqueue_sms, outbox_dispatcher
+from app.services.position_alerts import crossed_threshold, enqueue_position_alerts
+from app.services.queue_counters import (
+    ACTIVE_STATUSES,
+    PositionAllocation,
+    allocate_position,
+    allocate_positions,
+    entries_ahead,
+    resync_next_position,
+    transition_entry,
+)
+from app.services.rank_index import rank_index
+from app.services.response_cache import response_cache
 from app.services.sms import sms_service
+from app.services.wait_estimator import wait_estimator
 
 router = APIRouter()
 
+T = TypeVar("T")
+
+
+def _publish_entry_change(
+    entry: QueueEntry, old_status: EntryStatus, version: int
+) -> None:
+    """Tell subscribers about a committed status change."""
+    event_broker.publish(QueueEvent.entry_updated(entry, old_status, version))
+
+
+async def _with_position_retry(
+    db: AsyncSession, queues: list[Queue], insert: Callable[[], Awaitable[T]]
+) -> T:
+    """Run ``insert`` in a savepoint, retrying if a position is already taken.
+
+    Positions come from the queue counters, so a clash means ``next_position``
+    fell behind the queue's entries, e.g. after rows were written directly.
+    It is moved past them and the insert tried again, at most
+    ``settings.join_max_attempts`` times in all. The rolled back savepoint
+    expires the queues, which are reloaded before the next attempt.
+    """
+    queue_ids = [queue.id for queue in queues]
+    for _ in range(settings.join_max_attempts):
+        try:
+            async with db.begin_nested():
+                return await insert()
+        except IntegrityError:
+            for queue_id, queue in zip(queue_ids, queues):
+                await resync_next_position(db, queue_id)
+                await db.refresh(queue)
+    raise HTTPException(
+        status_code=503,
+        detail="Could not allocate a queue position, please try again",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def _get_managed_entry(db: AsyncSession, entry_id: int) -> QueueEntry:
+    """Load an entry together with its queue."""
+    entry = await db.scalar(
+        select(QueueEntry)
+        .where(QueueEntry.id == entry_id)
+        .options(joinedload(QueueEntry.queue))
+    )
+    if not entry:
+        raise HTTPException(status_code=404, detail="Entry not found")
+    return entry
+
 
 @router.post("/join", response_model=QueueEntrySchema)
-def join_queue(
+async def join_queue(
     entry: QueueEntryCreate,
-    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
 ):
     """Join a queue as a customer. No authentication required."""
     # Check if queue exists and is active
-    queue = db.query(Queue).filter(Queue.id == entry.queue_id).first()
+    queue = await db.get(Queue, entry.queue_id)
     if not queue:
         raise HTTPException(status_code=404, detail="Queue not found")
 
@@ -35,132 +120,505 @@ def join_queue(
             status_code=400, detail="Queue is not accepting new entries"
         )
 
-    # Get the next position
-    last_entry = (
-        db.query(QueueEntry)
-        .filter(QueueEntry.queue_id == entry.queue_id)
-        .order_by(QueueEntry.position.desc())
-        .first()
+    async def insert_entry() -> tuple[QueueEntry, PositionAllocation]:
+        # Reserve the next position; the counters also tell us how many are ahead
+        allocation = await allocate_position(db, entry.queue_id)
+        db_entry = QueueEntry(
+            queue_id=entry.queue_id,
+            customer_name=entry.customer_name,
+            phone_number=entry.phone_number,
+            party_size=entry.party_size,
+            position=allocation.position,
+            status=EntryStatus.WAITING,
+            # The welcome text already gives the position; don't alert for it again
+            last_notified_threshold=crossed_threshold(allocation.waiting_rank),
+        )
+        db.add(db_entry)
+        await db.flush([db_entry])
+        return db_entry, allocation
+
+    db_entry, allocation = await _with_position_retry(db, [queue], insert_entry)
+    estimated_wait = await wait_estimator.estimate_wait(
+        db, queue.id, allocation.entries_ahead, queue.estimated_wait_minutes
     )
-    next_position = (last_entry.position + 1) if last_entry else 1
-
-    # Create entry
-    db_entry = QueueEntry(
-        queue_id=entry.queue_id,
-        customer_name=entry.customer_name,
-        phone_number=entry.phone_number,
-        party_size=entry.party_size,
-        position=next_position,
-        status=EntryStatus.WAITING,
+
+    # Queue the SMS notification in the same transaction as the entry
+    message = enqueue_sms(
+        db,
+        entry.phone_number,
+        sms_service.queue_joined_message(
+            queue.business_name, allocation.position, estimated_wait
+        ),
     )
-    db.add(db_entry)
-    db.commit()
-    db.refresh(db_entry)
-
-    # Calculate estimated wait time
-    entries_ahead = (
-        db.query(QueueEntry)
-        .filter(
-            QueueEntry.queue_id == entry.queue_id,
-            QueueEntry.position < db_entry.position,
-            QueueEntry.status.in_([EntryStatus.WAITING, EntryStatus.CALLED]),
-        )
-        .count()
+
+    await db.commit()
+    await db.refresh(db_entry)
+    response_cache.invalidate_queue(db_entry.queue_id)
+    event_broker.publish(
+        QueueEvent(
+            queue_id=db_entry.queue_id,
+            type="entry_joined",
+            version=allocation.version,
+            entry_id=db_entry.id,
+            position=db_entry.position,
+            status=EntryStatus.WAITING,
+            data=QueueEntryInDB.model_validate(db_entry).model_dump(mode="json"),
+        )
     )
 
+    if message is not None:
+        background_tasks.add_task(outbox_dispatcher.dispatch, [message.id])
+
     result = QueueEntrySchema.model_validate(db_entry)
-    result.estimated_wait_minutes = entries_ahead * queue.estimated_wait_minutes
-
-    # Send SMS notification
-    sms_service.send_queue_joined_notification(
-        phone_number=entry.phone_number,
-        queue_name=queue.business_name,
-        position=db_entry.position,
-        estimated_wait_minutes=result.estimated_wait_minutes,
-    )
+    result.estimated_wait_minutes = estimated_wait
+    result.rank = allocation.entries_ahead + 1
 
     return result
 
 
+@router.post("/join/bulk", response_model=list[QueueEntryBulkResult])
+async def join_queue_bulk(
+    bulk: QueueEntryBulkCreate,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Join many customers, possibly to several queues, in one transaction.
+
+    For kiosks and imports, signed in as an admin of every queue joined: each
+    entry sends an SMS. Each queue's new entries get contiguous positions in
+    request order. Items for a missing or inactive queue fail on their own
+    without affecting the rest; results come back in request order.
+    """
+    queue_ids = {item.queue_id for item in bulk.entries}
+    queues = {
+        queue.id: queue
+        for queue in await db.scalars(select(Queue).where(Queue.id.in_(queue_ids)))
+    }
+    for queue_id in sorted(queues):
+        if not await is_queue_admin(db, current_user, queue_id):
+            raise HTTPException(
+                status_code=403, detail="Not authorized to join customers in bulk"
+            )
+
+    results = [QueueEntryBulkResult(index=i) for i in range(len(bulk.entries))]
+    indexes_by_queue: dict[int, list[int]] = {}
+    for i, item in enumerate(bulk.entries):
+        queue = queues.get(item.queue_id)
+        if queue is None:
+            results[i].error = "Queue not found"
+        elif queue.status != QueueStatus.ACTIVE:
+            results[i].error = "Queue is not accepting new entries"
+        else:
+            indexes_by_queue.setdefault(item.queue_id, []).append(i)
+
+    if not indexes_by_queue:
+        return results
+    # Request index and allocation of each new entry, by (queue id, position)
+    allocations: dict[tuple[int, int], tuple[int, PositionAllocation]] = {}
+
+    async def insert_entries() -> Sequence[QueueEntry]:
+        # One counter update per queue, then a single executemany insert
+        allocations.clear()
+        rows = []
+        for queue_id, indexes in sorted(indexes_by_queue.items()):
+            block = await allocate_positions(db, queue_id, len(indexes))
+            for i, allocation in zip(indexes, block):
+                item = bulk.entries[i]
+                allocations[queue_id, allocation.position] = (i, allocation)
+                rows.append(
+                    {
+                        "queue_id": queue_id,
+                        "customer_name": item.customer_name,
+                        "phone_number": item.phone_number,
+                        "party_size": item.party_size,
+                        "position": allocation.position,
+                        "status": EntryStatus.WAITING,
+                        "last_notified_threshold": crossed_threshold(
+                            allocation.waiting_rank
+                        ),
+                    }
+                )
+        # RETURNING rows may come back in any order; positions identify them
+        return (await db.scalars(insert(QueueEntry).returning(QueueEntry), rows)).all()
+
+    inserted = await _with_position_retry(
+        db, [queues[queue_id] for queue_id in sorted(indexes_by_queue)], insert_entries
+    )
+
+    messages = []
+    for db_entry in inserted:
+        queue = queues[db_entry.queue_id]
+        i, allocation = allocations[db_entry.queue_id, db_entry.position]
+        estimated_wait = await wait_estimator.estimate_wait(
+            db, queue.id, allocation.entries_ahead, queue.estimated_wait_minutes
+        )
+        message = enqueue_sms(
+            db,
+            db_entry.phone_number,
+            sms_service.queue_joined_message(
+                queue.business_name, allocation.position, estimated_wait
+            ),
+        )
+        if message is not None:
+            messages.append(message)
+        result = QueueEntrySchema.model_validate(db_entry)
+        result.estimated_wait_minutes = estimated_wait
+        result.rank = allocation.entries_ahead + 1
+        results[i].entry = result
+
+    await db.commit()
+    for queue_id in indexes_by_queue:
+        response_cache.invalidate_queue(queue_id)
+    for db_entry in inserted:
+        _, allocation = allocations[db_entry.queue_id, db_entry.position]
+        event_broker.publish(
+            QueueEvent(
+                queue_id=db_entry.queue_id,
+                type="entry_joined",
+                version=allocation.version,
+                entry_id=db_entry.id,
+                position=db_entry.position,
+                status=EntryStatus.WAITING,
+                data=QueueEntryInDB.model_validate(db_entry).model_dump(mode="json"),
+            )
+        )
+
+    # All welcome texts go out in one batch
+    if messages:
+        background_tasks.add_task(
+            outbox_dispatcher.dispatch, [message.id for message in messages]
+        )
+
+    return results
+
+
+def _ranked_page(
+    queue_id: int,
+    statuses: list[EntryStatus],
+    after_position: int,
+    active_through: int,
+    recount: bool,
+    skip: int,
+    limit: int,
+) -> Select:
+    """Select a page of entries after a cursor, each with its rank in the queue.
+
+    Ranks count every waiting and called entry, listed or not; entries in
+    other statuses get NULL. A row's rank is the number of active entries up
+    to the cursor, ``active_through``, plus its ``ROW_NUMBER()`` in the page,
+    plus, when only some active statuses are listed, the unlisted active
+    entries between the cursor and the row. With ``recount`` the first term
+    is counted afresh up to the page's first row instead. Positions are
+    unique within a queue, so they alone make a keyset.
+    """
+    page = (
+        select(QueueEntry)
+        .where(
+            QueueEntry.queue_id == queue_id,
+            QueueEntry.status.in_(statuses),
+            QueueEntry.position > after_position,
+        )
+        .order_by(QueueEntry.position)
+        .offset(skip)
+        .limit(limit)
+        .subquery()
+    )
+    listed = aliased(QueueEntry, page)
+    if not set(statuses) <= set(ACTIVE_STATUSES):
+        return select(listed, null()).order_by(listed.position)
+
+    active = QueueEntry.status.in_(ACTIVE_STATUSES)
+    lower: Any = literal(after_position)
+    base: Any = literal(active_through)
+    if recount:
+        lower = select(func.min(page.c.position)).correlate(None).scalar_subquery() - 1
+        base = (
+            select(func.count())
+            .where(
+                QueueEntry.queue_id == queue_id, active, QueueEntry.position <= lower
+            )
+            .scalar_subquery()
+        )
+    rank = base + func.row_number().over(order_by=listed.position)
+
+    unlisted = [status for status in ACTIVE_STATUSES if status not in statuses]
+    if unlisted:
+        between = aliased(QueueEntry)
+        rank = (
+            rank
+            + select(func.count())
+            .where(
+                between.queue_id == queue_id,
+                between.status.in_(unlisted),
+                between.position > lower,
+                between.position < listed.position,
+            )
+            .scalar_subquery()
+        )
+    return select(listed, rank).order_by(listed.position)
+
+
 @router.get("/queue/{queue_id}", response_model=list[QueueEntrySchema])
-def list_queue_entries(
+async def list_queue_entries(
     queue_id: int,
+    request: Request,
+    response: Response,
     status: Optional[EntryStatus] = None,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """List entries in a queue."""
-    queue = db.query(Queue).filter(Queue.id == queue_id).first()
+    """List entries in a queue, by position.
+
+    Pass the ``X-Next-Cursor`` header of a page as ``cursor`` to get the next.
+    Waiting and called entries carry their rank in the whole queue, not just
+    in the page.
+    """
+    queue = await db.get(Queue, queue_id)
     if not queue:
         raise HTTPException(status_code=404, detail="Queue not found")
+    # Position of the previous page's last entry, the number of active entries
+    # up to it, and the queue version that number was counted at
+    after_position, active_through, counted_version = decode_cursor(cursor, 3) or (
+        0,
+        0,
+        queue.version,
+    )
 
-    query = db.query(QueueEntry).filter(QueueEntry.queue_id == queue_id)
-
-    if status:
-        query = query.filter(QueueEntry.status == status)
-    else:
-        # Default to showing waiting and called entries
-        query = query.filter(
-            QueueEntry.status.in_([EntryStatus.WAITING, EntryStatus.CALLED])
+    etag = weak_etag("entries", queue_id, queue.version)
+    cached = not_modified(request, response, etag, PRIVATE_CACHE_CONTROL)
+    if cached is not None:
+        return cached
+
+    # Default to showing waiting and called entries
+    statuses = [status] if status else list(ACTIVE_STATUSES)
+    rows = (
+        await db.execute(
+            _ranked_page(
+                queue_id,
+                statuses,
+                after_position,
+                active_through,
+                # Entries may have joined or left ahead of the cursor: recount
+                recount=bool(skip) or counted_version != queue.version,
+                skip=skip,
+                limit=limit + 1,
+            )
         )
-
-    entries = query.order_by(QueueEntry.position).offset(skip).limit(limit).all()
+    ).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    entries = [entry for entry, _ in rows]
+    ranks = [rank for _, rank in rows]
 
     result = []
-    for i, entry in enumerate(entries):
+    for entry, rank in zip(entries, ranks):
         entry_data = QueueEntrySchema.model_validate(entry)
-        # Calculate estimated wait based on position in active queue
-        if entry.status in [EntryStatus.WAITING, EntryStatus.CALLED]:
-            entry_data.estimated_wait_minutes = i * queue.estimated_wait_minutes
-        else:
-            entry_data.estimated_wait_minutes = 0
+        entry_data.rank = rank
+        entry_data.estimated_wait_minutes = (
+            await wait_estimator.estimate_wait(
+                db, queue_id, rank - 1, queue.estimated_wait_minutes
+            )
+            if rank is not None
+            else 0
+        )
         result.append(entry_data)
 
+    if has_more:
+        last_rank = ranks[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            entries[-1].position,
+            last_rank if last_rank is not None else 0,
+            queue.version if last_rank is not None else -1,
+        )
     return result
 
 
 @router.get("/{entry_id}", response_model=QueueEntrySchema)
-def get_entry(entry_id: int, db: Session = Depends(get_db)):
+async def get_entry(
+    entry_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+):
     """Get a specific queue entry."""
-    entry = db.query(QueueEntry).filter(QueueEntry.id == entry_id).first()
-    if not entry:
-        raise HTTPException(status_code=404, detail="Entry not found")
-
-    # Calculate position in active queue
-    if entry.status in [EntryStatus.WAITING, EntryStatus.CALLED]:
-        entries_ahead = (
-            db.query(QueueEntry)
-            .filter(
-                QueueEntry.queue_id == entry.queue_id,
-                QueueEntry.position < entry.position,
-                QueueEntry.status.in_([EntryStatus.WAITING, EntryStatus.CALLED]),
+    # The entry's rank and wait depend on the whole queue, so its version
+    # identifies the response
+    row = (
+        await db.execute(
+            select(
+                Queue.version,
+                QueueEntry.queue_id,
+                QueueEntry.position,
+                QueueEntry.status,
             )
-            .count()
+            .join(QueueEntry, QueueEntry.queue_id == Queue.id)
+            .where(QueueEntry.id == entry_id)
         )
-        estimated_wait = entries_ahead * entry.queue.estimated_wait_minutes
-    else:
-        estimated_wait = 0
+    ).one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Entry not found")
+    version, queue_id, position, status = row
+
+    etag = weak_etag("entry", entry_id, version)
+    cached = not_modified(request, response, etag, PRIVATE_CACHE_CONTROL)
+    if cached is not None:
+        return cached
+
+    # The queue's rank index answers for the version just read; without it
+    # the entry is ranked in the same indexed query that loads it
+    ahead: Optional[int] = None
+    if status in ACTIVE_STATUSES:
+        ahead = await rank_index.entries_ahead(db, queue_id, position, version)
+    columns = [QueueEntry, Queue.estimated_wait_minutes]
+    if status in ACTIVE_STATUSES and ahead is None:
+        columns.append(entries_ahead())
+    row = (
+        await db.execute(
+            select(*columns).join(QueueEntry.queue).where(QueueEntry.id == entry_id)
+        )
+    ).one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Entry not found")
+    entry, wait_minutes, *counted = row
+    if counted:
+        ahead = counted[0]
 
     result = QueueEntrySchema.model_validate(entry)
-    result.estimated_wait_minutes = estimated_wait
+    if ahead is not None:
+        result.estimated_wait_minutes = await wait_estimator.estimate_wait(
+            db, queue_id, ahead, wait_minutes
+        )
+        result.rank = ahead + 1
+    else:
+        result.estimated_wait_minutes = 0
 
     return result
 
 
+async def _load_entry_tracker(entry_id: int) -> Optional[EntryTracker]:
+    """Snapshot an entry together with the queue version the snapshot reflects."""
+    async with ReadSessionLocal() as db:
+        row = (
+            await db.execute(
+                select(
+                    QueueEntry.queue_id,
+                    QueueEntry.status,
+                    QueueEntry.position,
+                    Queue.estimated_wait_minutes,
+                    Queue.version,
+                    entries_ahead(),
+                )
+                .join(QueueEntry.queue)
+                .where(QueueEntry.id == entry_id)
+            )
+        ).one_or_none()
+        if row is None:
+            return None
+        queue_id, status, position, wait_minutes, version, ahead = row
+        learned = await wait_estimator.queue_learned_minutes(db, queue_id)
+
+    return EntryTracker(
+        entry_id=entry_id,
+        status=EntryStatus(status),
+        position=position,
+        entries_ahead=ahead or 0,
+        wait_minutes_per_entry=wait_minutes or 0,
+        version=version,
+        learned_minutes_per_entry=learned,
+    )
+
+
+async def _refresh_learned_minutes(tracker: EntryTracker, queue_id: int) -> bool:
+    """Pick up what the wait estimator learned from a serve."""
+    async with ReadSessionLocal() as db:
+        # Only queries if the queue's statistics were evicted since
+        learned = await wait_estimator.queue_learned_minutes(db, queue_id)
+    return tracker.set_learned_minutes(learned)
+
+
+def _sse_message(tracker: EntryTracker) -> str:
+    return f"event: entry\ndata: {json.dumps(tracker.as_dict())}\n\n"
+
+
+async def _entry_event_stream(
+    tracker: EntryTracker, subscription: Subscription
+) -> AsyncIterator[str]:
+    with subscription:
+        yield f"retry: {settings.sse_retry_ms}\n" + _sse_message(tracker)
+        while not tracker.finished:
+            event = await subscription.get(timeout=settings.sse_keepalive_seconds)
+
+            if subscription.overflowed:
+                # Missed events: start again from a fresh snapshot
+                subscription.reset()
+                reloaded = await _load_entry_tracker(tracker.entry_id)
+                if reloaded is None:
+                    return
+                tracker = reloaded
+                yield _sse_message(tracker)
+            elif event is None:
+                yield ": keep-alive\n\n"
+            else:
+                changed = tracker.apply(event)
+                # The estimator has already learned from the serve: listeners
+                # run before subscribers are handed the event
+                if event.type == "entry_updated" and event.status == EntryStatus.SERVED:
+                    changed = (
+                        await _refresh_learned_minutes(tracker, subscription.queue_id)
+                        or changed
+                    )
+                if changed:
+                    yield _sse_message(tracker)
+
+
+@router.get("/{entry_id}/events")
+async def entry_events(entry_id: int):
+    """Stream an entry's status, position and estimated wait as Server-Sent Events.
+
+    Sends the current state, then a new ``entry`` event whenever a join, call,
+    serve or cancel changes it, and closes once the entry is served or
+    cancelled. Updates come from the write paths, not from polling.
+    """
+    async with ReadSessionLocal() as db:
+        queue_id = await db.scalar(
+            select(QueueEntry.queue_id).where(QueueEntry.id == entry_id)
+        )
+    if queue_id is None:
+        raise HTTPException(status_code=404, detail="Entry not found")
+
+    # Subscribe before taking the snapshot so no change can fall in between
+    subscription = event_hub.subscribe(queue_id)
+    try:
+        tracker = await _load_entry_tracker(entry_id)
+    except BaseException:
+        subscription.close()
+        raise
+    if tracker is None:
+        subscription.close()
+        raise HTTPException(status_code=404, detail="Entry not found")
+
+    return StreamingResponse(
+        _entry_event_stream(tracker, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.patch("/{entry_id}/call", response_model=QueueEntrySchema)
-def call_entry(
+async def call_entry(
     entry_id: int,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Call a customer to the front. Only queue admins can call."""
-    entry = db.query(QueueEntry).filter(QueueEntry.id == entry_id).first()
-    if not entry:
-        raise HTTPException(status_code=404, detail="Entry not found")
+    entry = await _get_managed_entry(db, entry_id)
 
     # Check if user is admin of this queue
-    if current_user not in entry.queue.admins:
+    if not await is_queue_admin(db, current_user, entry.queue_id):
         raise HTTPException(
             status_code=403, detail="Not authorized to manage this queue"
         )
@@ -169,36 +627,50 @@ def call_entry(
         raise HTTPException(status_code=400, detail=f"Entry is already {entry.status}")
 
     # Update status
-    entry.status = EntryStatus.CALLED
-    entry.called_at = func.now()
+    version = await transition_entry(
+        db, entry, EntryStatus.CALLED, called_at=func.now()
+    )
+    if version is None:
+        raise HTTPException(status_code=409, detail="Entry was modified concurrently")
+
+    # Queue the SMS notifications in the same transaction as the status change
+    messages = await enqueue_position_alerts(db, entry.queue)
+    message = enqueue_sms(
+        db,
+        entry.phone_number,
+        sms_service.customer_called_message(entry.queue.business_name),
+    )
+    if message is not None:
+        messages.append(message)
 
-    db.commit()
-    db.refresh(entry)
+    await db.commit()
+    await db.refresh(entry)
+    response_cache.invalidate_queue(entry.queue_id)
+    _publish_entry_change(entry, EntryStatus.WAITING, version)
+
+    if messages:
+        background_tasks.add_task(
+            outbox_dispatcher.dispatch, [message.id for message in messages]
+        )
 
     result = QueueEntrySchema.model_validate(entry)
     result.estimated_wait_minutes = 0
 
-    # Send SMS notification
-    sms_service.send_customer_called_notification(
-        phone_number=entry.phone_number, queue_name=entry.queue.business_name
-    )
-
     return result
 
 
 @router.patch("/{entry_id}/serve", response_model=QueueEntrySchema)
-def serve_entry(
+async def serve_entry(
     entry_id: int,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Mark a customer as served. Only queue admins can mark as served."""
-    entry = db.query(QueueEntry).filter(QueueEntry.id == entry_id).first()
-    if not entry:
-        raise HTTPException(status_code=404, detail="Entry not found")
+    entry = await _get_managed_entry(db, entry_id)
 
     # Check if user is admin of this queue
-    if current_user not in entry.queue.admins:
+    if not await is_queue_admin(db, current_user, entry.queue_id):
         raise HTTPException(
             status_code=403, detail="Not authorized to manage this queue"
         )
@@ -207,11 +679,27 @@ def serve_entry(
         raise HTTPException(status_code=400, detail="Entry is already served")
 
     # Update status
-    entry.status = EntryStatus.SERVED
-    entry.served_at = func.now()
-
-    db.commit()
-    db.refresh(entry)
+    old_status = EntryStatus(entry.status)
+    version = await transition_entry(
+        db, entry, EntryStatus.SERVED, served_at=func.now()
+    )
+    if version is None:
+        raise HTTPException(status_code=409, detail="Entry was modified concurrently")
+
+    # Serving a waiting entry moves everyone behind it forward
+    messages = []
+    if old_status == EntryStatus.WAITING:
+        messages = await enqueue_position_alerts(db, entry.queue)
+
+    await db.commit()
+    await db.refresh(entry)
+    response_cache.invalidate_queue(entry.queue_id)
+    _publish_entry_change(entry, old_status, version)
+
+    if messages:
+        background_tasks.add_task(
+            outbox_dispatcher.dispatch, [message.id for message in messages]
+        )
 
     result = QueueEntrySchema.model_validate(entry)
     result.estimated_wait_minutes = 0
@@ -220,12 +708,13 @@ def serve_entry(
 
 
 @router.patch("/{entry_id}/cancel", response_model=QueueEntrySchema)
-def cancel_entry(
+async def cancel_entry(
     entry_id: int,
-    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
 ):
     """Cancel a queue entry. Can be done by anyone with the entry ID."""
-    entry = db.query(QueueEntry).filter(QueueEntry.id == entry_id).first()
+    entry = await db.get(QueueEntry, entry_id, options=[joinedload(QueueEntry.queue)])
     if not entry:
         raise HTTPException(status_code=404, detail="Entry not found")
 
@@ -233,10 +722,25 @@ def cancel_entry(
         raise HTTPException(status_code=400, detail=f"Entry is already {entry.status}")
 
     # Update status
-    entry.status = EntryStatus.CANCELLED
-
-    db.commit()
-    db.refresh(entry)
+    old_status = EntryStatus(entry.status)
+    version = await transition_entry(db, entry, EntryStatus.CANCELLED)
+    if version is None:
+        raise HTTPException(status_code=409, detail="Entry was modified concurrently")
+
+    # Leaving the waiting line moves everyone behind the entry forward
+    messages = []
+    if old_status == EntryStatus.WAITING:
+        messages = await enqueue_position_alerts(db, entry.queue)
+
+    await db.commit()
+    await db.refresh(entry)
+    response_cache.invalidate_queue(entry.queue_id)
+    _publish_entry_change(entry, old_status, version)
+
+    if messages:
+        background_tasks.add_task(
+            outbox_dispatcher.dispatch, [message.id for message in messages]
+        )
 
     result = QueueEntrySchema.model_validate(entry)
     result.estimated_wait_minutes = 0
@@ -1,32 +1,122 @@
-from typing import Optional
-
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-
-from app.api.dependencies.auth import get_current_active_user
-from app.api.dependencies.database import get_db
-from app.models.queue import Queue, QueueEntry, QueueStatus, queue_admins
+import asyncio
+import hashlib
+import json
+from collections.abc import Sequence
+from typing import Any, Optional
+
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from pydantic import TypeAdapter
+from sqlalchemy import Row, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from starlette.status import WS_1008_POLICY_VIOLATION
+from starlette.websockets import WebSocketState
+
+from app.api.dependencies.auth import (
+    authenticate_token,
+    get_current_active_user,
+    is_queue_admin,
+)
+from app.api.dependencies.database import get_db, get_read_db
+from app.api.http_cache import (
+    json_response,
+    not_modified,
+    public_cache_control,
+    weak_etag,
+)
+from app.api.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from app.core.config import settings
+from app.db.base import ReadSessionLocal
+from app.models.queue import EntryStatus, Queue, QueueEntry, QueueStatus, queue_admins
 from app.models.user import User
 from app.schemas.queue import (
     Queue as QueueSchema,
 )
 from app.schemas.queue import (
     QueueCreate,
+    QueueEntryInDB,
     QueueUpdate,
 )
+from app.schemas.queue import (
+    QueueEntry as QueueEntrySchema,
+)
+from app.services.broker import event_broker
+from app.services.events import QueueEvent, Subscription, event_hub
+from app.services.outbox import enqueue_sms, outbox_dispatcher
+from app.services.position_alerts import enqueue_position_alerts
+from app.services.queue_counters import (
+    ACTIVE_STATUSES,
+    bump_version,
+    call_next_entries,
+)
+from app.services.response_cache import queue_key, queues_key, response_cache
+from app.services.sms import sms_service
 
 router = APIRouter()
 
+_queue_list_adapter = TypeAdapter(list[QueueSchema])
+
+
+async def _build_queue_responses(
+    db: AsyncSession, queues: Sequence[Queue]
+) -> list[QueueSchema]:
+    """Serialize queues with their computed fields in a constant number of queries.
+
+    Sizes come from the denormalized counters on each queue and admin ids from
+    one query on ``queue_admins``, regardless of how many queues are given.
+    """
+    if not queues:
+        return []
+
+    queue_ids = [queue.id for queue in queues]
+
+    admin_ids: dict[int, list[int]] = {queue_id: [] for queue_id in queue_ids}
+    admin_rows = await db.execute(
+        queue_admins.select()
+        .where(queue_admins.c.queue_id.in_(queue_ids))
+        .order_by(queue_admins.c.queue_id, queue_admins.c.user_id)
+    )
+    for row in admin_rows:
+        admin_ids[row.queue_id].append(row.user_id)
+
+    result = []
+    for queue in queues:
+        queue_data = QueueSchema.model_validate(queue)
+        queue_data.admin_ids = admin_ids[queue.id]
+        result.append(queue_data)
+
+    return result
+
+
+async def _get_queue_with_admins(db: AsyncSession, queue_id: int) -> Queue:
+    """Load a queue and its admins, or raise 404."""
+    queue = await db.scalar(
+        select(Queue).where(Queue.id == queue_id).options(selectinload(Queue.admins))
+    )
+    if not queue:
+        raise HTTPException(status_code=404, detail="Queue not found")
+    return queue
+
 
 @router.post("/", response_model=QueueSchema)
-def create_queue(
+async def create_queue(
     queue: QueueCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Create a new queue. The current user becomes the admin."""
     # Check if queue name already exists
-    existing = db.query(Queue).filter(Queue.name == queue.name).first()
+    existing = await db.scalar(select(Queue).where(Queue.name == queue.name))
     if existing:
         raise HTTPException(
             status_code=400, detail="Queue with this name already exists"
@@ -40,15 +130,23 @@ def create_queue(
         estimated_wait_minutes=queue.estimated_wait_minutes,
     )
     db.add(db_queue)
-    db.flush()  # Get the ID without committing
+    await db.flush()  # Get the ID without committing
 
     # Make the creator an admin
-    db.execute(
+    await db.execute(
         queue_admins.insert().values(user_id=current_user.id, queue_id=db_queue.id)
     )
 
-    db.commit()
-    db.refresh(db_queue)
+    await db.commit()
+    await db.refresh(db_queue)
+    event_broker.publish(
+        QueueEvent(
+            queue_id=int(db_queue.id),
+            type="admins_changed",
+            user_id=int(current_user.id),
+        )
+    )
+    response_cache.invalidate_listings()
 
     # Add computed fields
     result = QueueSchema.model_validate(db_queue)
@@ -58,78 +156,118 @@ def create_queue(
     return result
 
 
+def _page_digest(page: Sequence[Row[tuple[int, int]]], has_next: bool) -> str:
+    """A short digest of a listing page's ordered (id, version) pairs."""
+    digest = hashlib.blake2b(digest_size=8)
+    for queue_id, version in page:
+        digest.update(f"{queue_id}.{version},".encode())
+    digest.update(b"+" if has_next else b".")
+    return digest.hexdigest()
+
+
 @router.get("/", response_model=list[QueueSchema])
-def list_queues(
-    skip: int = 0,
-    limit: int = 100,
+async def list_queues(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(100, ge=1, le=500),
     status: Optional[QueueStatus] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """List all active queues."""
-    query = db.query(Queue)
-
-    if status:
-        query = query.filter(Queue.status == status)
-    else:
-        # Default to showing only active queues
-        query = query.filter(Queue.status == QueueStatus.ACTIVE)
-
-    queues = query.offset(skip).limit(limit).all()
-
-    result = []
-    for queue in queues:
-        queue_data = QueueSchema.model_validate(queue)
-        # Add current size
-        queue_data.current_size = (
-            db.query(QueueEntry)
-            .filter(
-                QueueEntry.queue_id == queue.id,
-                QueueEntry.status.in_(["waiting", "called"]),
-            )
-            .count()
+    """List all active queues, by id.
+
+    Pass the ``X-Next-Cursor`` header of a page as ``cursor`` to get the next.
+    """
+    # Default to showing only active queues
+    status = status or QueueStatus.ACTIVE
+    status_filter = Queue.status == status
+    (after_id,) = decode_cursor(cursor, 1) or (0,)
+
+    # The page's ids and versions, and the first queue after it for the next
+    # cursor. Any change to a queue raises its version and ids are never
+    # reused, so the tag changes whenever the page would, including when
+    # queues move in or out of the status filter.
+    rows = (
+        await db.execute(
+            select(Queue.id, Queue.version)
+            .where(status_filter, Queue.id > after_id)
+            .order_by(Queue.id)
+            .offset(skip)
+            .limit(limit + 1)
         )
-        # Add admin IDs
-        queue_data.admin_ids = [admin.id for admin in queue.admins]
-        result.append(queue_data)
-
-    return result
+    ).all()
+    page, has_next = rows[:limit], len(rows) > limit
+    etag = weak_etag("queues", _page_digest(page, has_next))
+    cache_control = public_cache_control()
+    cached = not_modified(request, response, etag, cache_control)
+    if cached is not None:
+        return cached
+
+    key = queues_key(status.value, skip, limit, after_id)
+    body = response_cache.get(key, etag)
+    if body is None:
+        page_ids = [queue_id for queue_id, _ in page]
+        queues: Sequence[Queue] = []
+        if page_ids:
+            queues = (
+                await db.scalars(
+                    select(Queue).where(Queue.id.in_(page_ids)).order_by(Queue.id)
+                )
+            ).all()
+        body = _queue_list_adapter.dump_json(await _build_queue_responses(db, queues))
+        response_cache.set(key, etag, body, page_ids)
+
+    headers = {}
+    if has_next:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(page[-1].id)
+    return json_response(body, etag, cache_control, headers)
 
 
 @router.get("/{queue_id}", response_model=QueueSchema)
-def get_queue(queue_id: int, db: Session = Depends(get_db)):
+async def get_queue(
+    queue_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+):
     """Get a specific queue by ID."""
-    queue = db.query(Queue).filter(Queue.id == queue_id).first()
-    if not queue:
+    # One load for the tag and the body, so they always agree and a queue
+    # deleted in between can't turn into a server error
+    queue = await db.get(Queue, queue_id)
+    if queue is None:
         raise HTTPException(status_code=404, detail="Queue not found")
 
-    result = QueueSchema.model_validate(queue)
-    result.current_size = (
-        db.query(QueueEntry)
-        .filter(
-            QueueEntry.queue_id == queue.id,
-            QueueEntry.status.in_(["waiting", "called"]),
-        )
-        .count()
-    )
-    result.admin_ids = [admin.id for admin in queue.admins]
+    etag = weak_etag("queue", queue_id, queue.version)
+    cache_control = public_cache_control()
+    cached = not_modified(request, response, etag, cache_control)
+    if cached is not None:
+        return cached
 
-    return result
+    key = queue_key(queue_id)
+    body = response_cache.get(key, etag)
+    if body is None:
+        result = (await _build_queue_responses(db, [queue]))[0]
+        body = result.model_dump_json().encode()
+        response_cache.set(key, etag, body, [queue_id])
+
+    return json_response(body, etag, cache_control)
 
 
 @router.patch("/{queue_id}", response_model=QueueSchema)
-def update_queue(
+async def update_queue(
     queue_id: int,
     queue_update: QueueUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Update a queue. Only admins can update."""
-    queue = db.query(Queue).filter(Queue.id == queue_id).first()
+    queue = await db.get(Queue, queue_id)
     if not queue:
         raise HTTPException(status_code=404, detail="Queue not found")
 
     # Check if user is admin
-    if current_user not in queue.admins:
+    if not await is_queue_admin(db, current_user, queue_id):
         raise HTTPException(
             status_code=403, detail="Not authorized to update this queue"
         )
@@ -138,76 +276,298 @@ def update_queue(
     update_data = queue_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(queue, field, value)
-
-    db.commit()
-    db.refresh(queue)
-
-    result = QueueSchema.model_validate(queue)
-    result.current_size = (
-        db.query(QueueEntry)
-        .filter(
-            QueueEntry.queue_id == queue.id,
-            QueueEntry.status.in_(["waiting", "called"]),
+    version = await bump_version(db, queue_id)
+
+    await db.commit()
+    await db.refresh(queue)
+    response_cache.invalidate_queue(queue.id)
+    if "status" in update_data:
+        # The status decides which listings the queue appears in
+        response_cache.invalidate_listings()
+
+    response = (await _build_queue_responses(db, [queue]))[0]
+    event_broker.publish(
+        QueueEvent(
+            queue_id=queue.id,
+            type="queue_updated",
+            version=version,
+            estimated_wait_minutes=queue.estimated_wait_minutes,
+            data=response.model_dump(mode="json"),
         )
-        .count()
     )
-    result.admin_ids = [admin.id for admin in queue.admins]
 
-    return result
+    return response
 
 
 @router.delete("/{queue_id}", status_code=204)
-def delete_queue(
+async def delete_queue(
     queue_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Delete a queue. Only admins can delete."""
-    queue = db.query(Queue).filter(Queue.id == queue_id).first()
-    if not queue:
-        raise HTTPException(status_code=404, detail="Queue not found")
+    queue = await _get_queue_with_admins(db, queue_id)
 
     # Check if user is admin
-    if current_user not in queue.admins:
+    if not await is_queue_admin(db, current_user, queue_id):
         raise HTTPException(
             status_code=403, detail="Not authorized to delete this queue"
         )
 
-    db.delete(queue)
-    db.commit()
+    # Tokens claiming this queue must stop counting
+    for admin in queue.admins:
+        admin.queue_claims_version = User.queue_claims_version + 1
+    await db.delete(queue)
+    await db.commit()
+    response_cache.invalidate_queue(queue_id)
+    response_cache.invalidate_listings()
+    event_broker.publish(QueueEvent(queue_id=queue_id, type="queue_deleted"))
 
 
 @router.post("/{queue_id}/admins/{user_id}", response_model=dict)
-def add_admin(
+async def add_admin(
     queue_id: int,
     user_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Add an admin to a queue. Only existing admins can add new admins."""
-    queue = db.query(Queue).filter(Queue.id == queue_id).first()
+    queue = await db.get(Queue, queue_id)
     if not queue:
         raise HTTPException(status_code=404, detail="Queue not found")
 
     # Check if current user is admin
-    if current_user not in queue.admins:
+    if not await is_queue_admin(db, current_user, queue_id):
         raise HTTPException(
             status_code=403, detail="Not authorized to manage admins for this queue"
         )
 
     # Check if user exists
-    new_admin = db.query(User).filter(User.id == user_id).first()
+    new_admin = await db.get(User, user_id)
     if not new_admin:
         raise HTTPException(status_code=404, detail="User not found")
 
     # Check if already admin
-    if new_admin in queue.admins:
+    if await is_queue_admin(db, new_admin, queue_id):
         raise HTTPException(
             status_code=400, detail="User is already an admin of this queue"
         )
 
-    # Add admin
-    db.execute(queue_admins.insert().values(user_id=user_id, queue_id=queue_id))
-    db.commit()
+    # Add admin; admin ids are part of the queue's representation
+    await db.execute(queue_admins.insert().values(user_id=user_id, queue_id=queue_id))
+    version = await bump_version(db, queue_id)
+    await db.commit()
+    event_broker.publish(
+        QueueEvent(
+            queue_id=queue_id, type="admins_changed", version=version, user_id=user_id
+        )
+    )
+    response_cache.invalidate_queue(queue_id)
 
     return {"message": "Admin added successfully"}
+
+
+@router.delete("/{queue_id}/admins/{user_id}", response_model=dict)
+async def remove_admin(
+    queue_id: int,
+    user_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Remove an admin from a queue. Only existing admins can remove admins."""
+    queue = await db.get(Queue, queue_id)
+    if not queue:
+        raise HTTPException(status_code=404, detail="Queue not found")
+
+    # Check if current user is admin
+    if not await is_queue_admin(db, current_user, queue_id):
+        raise HTTPException(
+            status_code=403, detail="Not authorized to manage admins for this queue"
+        )
+
+    admin = await db.get(User, user_id)
+    if not admin or not await is_queue_admin(db, admin, queue_id):
+        raise HTTPException(
+            status_code=404, detail="User is not an admin of this queue"
+        )
+    admin_count = await db.scalar(
+        select(func.count())
+        .select_from(queue_admins)
+        .where(queue_admins.c.queue_id == queue_id)
+    )
+    if admin_count == 1:
+        raise HTTPException(
+            status_code=400, detail="A queue must keep at least one admin"
+        )
+
+    await db.execute(
+        queue_admins.delete().where(
+            queue_admins.c.user_id == user_id, queue_admins.c.queue_id == queue_id
+        )
+    )
+    version = await bump_version(db, queue_id)
+    # Tokens issued before now may still claim the queue for this user
+    admin.queue_claims_version = User.queue_claims_version + 1
+    await db.commit()
+    event_broker.publish(
+        QueueEvent(
+            queue_id=queue_id, type="admins_changed", version=version, user_id=user_id
+        )
+    )
+    response_cache.invalidate_queue(queue_id)
+
+    return {"message": "Admin removed successfully"}
+
+
+@router.post("/{queue_id}/call-next", response_model=list[QueueEntrySchema])
+async def call_next(
+    queue_id: int,
+    background_tasks: BackgroundTasks,
+    count: int = Query(1, ge=1, le=50),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Call the next ``count`` waiting customers. Only queue admins can call.
+
+    The entries are claimed in one statement, so concurrent callers always get
+    different customers. Returns fewer entries if fewer are waiting.
+    """
+    queue = await db.get(Queue, queue_id)
+    if not queue:
+        raise HTTPException(status_code=404, detail="Queue not found")
+
+    if not await is_queue_admin(db, current_user, queue_id):
+        raise HTTPException(
+            status_code=403, detail="Not authorized to manage this queue"
+        )
+
+    called = await call_next_entries(db, queue_id, count)
+    if not called:
+        return []
+
+    # Queue the SMS notifications in the same transaction as the status change
+    messages = await enqueue_position_alerts(db, queue)
+    called_message = sms_service.customer_called_message(queue.business_name)
+    for entry, _ in called:
+        message = enqueue_sms(db, entry.phone_number, called_message)
+        if message is not None:
+            messages.append(message)
+
+    await db.commit()
+    response_cache.invalidate_queue(queue_id)
+    for entry, version in called:
+        event_broker.publish(
+            QueueEvent.entry_updated(entry, EntryStatus.WAITING, version)
+        )
+
+    if messages:
+        background_tasks.add_task(
+            outbox_dispatcher.dispatch, [message.id for message in messages]
+        )
+
+    results = []
+    for entry, _ in called:
+        result = QueueEntrySchema.model_validate(entry)
+        result.estimated_wait_minutes = 0
+        results.append(result)
+    return results
+
+
+async def _load_dashboard_snapshot(
+    queue_id: int,
+) -> tuple[Optional[dict[str, Any]], int]:
+    """The queue and its active entries, with the version they reflect."""
+    async with ReadSessionLocal() as db:
+        queue = await db.get(Queue, queue_id)
+        if queue is None:
+            return None, 0
+        entries = await db.scalars(
+            select(QueueEntry)
+            .where(
+                QueueEntry.queue_id == queue_id,
+                QueueEntry.status.in_(ACTIVE_STATUSES),
+            )
+            .order_by(QueueEntry.position)
+        )
+        queue_data = (await _build_queue_responses(db, [queue]))[0]
+        snapshot = {
+            "type": "snapshot",
+            "version": queue.version,
+            "queue": queue_data.model_dump(mode="json"),
+            "entries": [
+                QueueEntryInDB.model_validate(entry).model_dump(mode="json")
+                for entry in entries
+            ],
+        }
+        return snapshot, queue.version
+
+
+async def _forward_queue_events(
+    websocket: WebSocket, subscription: Subscription
+) -> None:
+    """Send a snapshot, then every later change, until the queue is deleted."""
+    snapshot, version = await _load_dashboard_snapshot(subscription.queue_id)
+    if snapshot is None:
+        return
+    await websocket.send_text(json.dumps(snapshot))
+
+    while True:
+        event = await subscription.get(timeout=settings.websocket_keepalive_seconds)
+
+        if subscription.overflowed:
+            # Missed events: start again from a fresh snapshot
+            subscription.reset()
+            snapshot, version = await _load_dashboard_snapshot(subscription.queue_id)
+            if snapshot is None:
+                return
+            await websocket.send_text(json.dumps(snapshot))
+        elif event is None:
+            await websocket.send_text('{"type": "ping"}')
+        elif event.version is None or event.version > version:
+            await websocket.send_text(event.message_json)
+            if event.type == "queue_deleted":
+                return
+
+
+async def _wait_for_disconnect(websocket: WebSocket) -> None:
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+@router.websocket("/{queue_id}/ws")
+async def queue_updates(websocket: WebSocket, queue_id: int, token: str = ""):
+    """Push a queue's entries and status to its admins.
+
+    The bearer token is passed as the ``token`` query parameter, since browsers
+    can't set headers on WebSocket requests. Sends a ``snapshot`` message, then
+    one small delta per change as the write routes publish it.
+    """
+    async with ReadSessionLocal() as db:
+        try:
+            user = await authenticate_token(token, db)
+        except HTTPException:
+            await websocket.close(code=WS_1008_POLICY_VIOLATION)
+            return
+        is_admin = user.is_active and await is_queue_admin(db, user, queue_id)
+    if not is_admin:
+        await websocket.close(code=WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    # Subscribe before the snapshot so no change can fall in between
+    with event_hub.subscribe(queue_id) as subscription:
+        forwarder = asyncio.create_task(_forward_queue_events(websocket, subscription))
+        receiver = asyncio.create_task(_wait_for_disconnect(websocket))
+        done, pending = await asyncio.wait(
+            {forwarder, receiver}, return_when=asyncio.FIRST_COMPLETED
+        )
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    if forwarder in done:
+        error = forwarder.exception()
+        if error is not None and not isinstance(error, WebSocketDisconnect):
+            raise error
+    if websocket.client_state == WebSocketState.CONNECTED:
+        await websocket.close()
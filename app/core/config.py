@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -10,10 +10,97 @@ class Settings(BaseSettings):
     secret_key: str = "your-secret-key-here"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    # Managed queue ids embedded in access tokens are trusted for this long
+    queue_claims_expire_minutes: int = 5
+
+    # Password hashing: bcrypt cost factor, and the dedicated pool it runs on
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 32
+    # Tokens resolved to users recently, kept per worker (0 entries disables it)
+    auth_cache_max_entries: int = 1024
+    auth_cache_ttl_seconds: float = 60.0
+    # Queue admin checks, memoized per (user, queue) and worker
+    admin_membership_cache_max_entries: int = 4096
+    admin_membership_cache_ttl_seconds: float = 30.0
+
+    # SQLite tuning profile, applied to every new connection
+    sqlite_journal_mode: Literal["wal", "delete", "truncate", "persist"] = "wal"
+    sqlite_synchronous: Literal["off", "normal", "full", "extra"] = "normal"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kib: int = 64 * 1024
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_temp_store: Literal["default", "file", "memory"] = "memory"
 
     twilio_account_sid: Optional[str] = None
     twilio_auth_token: Optional[str] = None
     twilio_phone_number: Optional[str] = None
+    twilio_api_base_url: str = "https://api.twilio.com"
+    twilio_max_concurrency: int = 20
+    twilio_timeout_seconds: float = 10.0
+
+    # SMS pacing: sends above these rates are queued, not rejected (0 disables)
+    sms_provider_rate_per_second: float = 100.0
+    sms_provider_burst: int = 100
+    sms_number_rate_per_second: float = 10.0
+    sms_number_burst: int = 10
+
+    # Server-Sent Events: comment sent on idle streams, client reconnect delay
+    sse_keepalive_seconds: float = 15.0
+    sse_retry_ms: int = 3000
+    websocket_keepalive_seconds: float = 30.0
+
+    # HTTP caching of public listings
+    http_cache_max_age_seconds: int = 5
+    http_cache_stale_while_revalidate_seconds: int = 30
+
+    # In-process cache of serialized queue responses (0 entries disables it)
+    response_cache_max_entries: int = 1024
+    response_cache_ttl_seconds: float = 30.0
+
+    # Live-update events between workers: "memory" (single worker) or "unix"
+    event_broker: Literal["memory", "unix"] = "memory"
+    event_broker_socket_path: str = "/tmp/virtual-queue-events.sock"
+
+    # Active positions of recently read queues, kept per worker to rank
+    # entries without counting (0 queues disables it); every Nth rank is
+    # checked against the database (0 disables the checks)
+    rank_index_max_queues: int = 256
+    rank_index_check_every: int = 100
+
+    # Wait estimates from recent service times, kept per worker: "ewma",
+    # "median", "p75" or "p90" of the minutes each serve took, weighted by
+    # party size, or "static" for the queue's own estimated_wait_minutes.
+    # Queues with fewer serves than wait_estimate_min_samples use the static
+    # setting
+    wait_estimate_statistic: Literal["static", "ewma", "median", "p75", "p90"] = "ewma"
+    wait_estimate_alpha: float = 0.2
+    wait_estimate_window: int = 50
+    wait_estimate_min_samples: int = 5
+    wait_estimate_max_sample_minutes: float = 120.0
+    wait_estimate_max_queues: int = 1024
+
+    # Attempts a join makes at a free position before answering 503
+    join_max_attempts: int = 3
+
+    # Waiting-line ranks at which customers get a position update text
+    position_alert_thresholds: list[int] = [3, 1]
+
+    # "mock", "twilio" (official SDK) or "twilio_async"; unset picks mock in
+    # development and twilio_async otherwise
+    sms_provider: Optional[str] = None
+
+    # SMS outbox dispatcher
+    sms_outbox_batch_size: int = 50
+    sms_outbox_max_attempts: int = 5
+    sms_outbox_retry_base_seconds: float = 5.0
+    sms_outbox_retry_max_seconds: float = 600.0
+    sms_outbox_poll_interval_seconds: float = 1.0
+    # How long the background loop leaves a new message to the request that
+    # wrote it before picking it up itself
+    sms_outbox_handoff_seconds: float = 30.0
+    sms_outbox_lease_seconds: float = 60.0
+    sms_outbox_shutdown_timeout_seconds: float = 10.0
 
     environment: str = "development"
     debug: bool = True
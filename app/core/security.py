@@ -1,29 +1,101 @@
+import calendar
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Optional
 
 from jose import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# The cost is pinned, so hashes made at any other cost are flagged for rehashing
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds,
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, Optional[str]]:
+    """Verify a password, and rehash it if its hash predates the current policy.
+
+    Returns whether the password matched and, if the stored hash should be
+    replaced, the new one.
+    """
+    valid, new_hash = pwd_context.verify_and_update(plain_password, hashed_password)
+    return bool(valid), new_hash
+
+
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+@dataclass(frozen=True)
+class QueueClaims:
+    """Queues an access token says its user manages, as of ``version``.
+
+    The claims expire sooner than the token itself, and are only trusted while
+    ``version`` matches the user's ``queue_claims_version``.
+    """
+
+    queue_ids: frozenset[int]
+    version: int
+    expires_at: float
+
+    def grants(self, queue_id: int, current_version: int) -> bool:
+        return (
+            queue_id in self.queue_ids
+            and self.version == current_version
+            and self.expires_at > time.time()
+        )
+
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> Optional["QueueClaims"]:
+        try:
+            return cls(
+                frozenset(int(queue_id) for queue_id in payload["queues"]),
+                int(payload["queues_ver"]),
+                float(payload["queues_exp"]),
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+
+
+def create_access_token(
+    data: dict,
+    expires_delta: Optional[timedelta] = None,
+    managed_queue_ids: Optional[Iterable[int]] = None,
+    queue_claims_version: int = 0,
+) -> str:
+    """Sign a token; with ``managed_queue_ids``, embed them as queue claims."""
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
+    if managed_queue_ids is not None:
+        claims_expire = min(
+            expire,
+            datetime.utcnow() + timedelta(minutes=settings.queue_claims_expire_minutes),
+        )
+        to_encode.update(
+            {
+                "queues": sorted(managed_queue_ids),
+                "queues_ver": queue_claims_version,
+                "queues_exp": calendar.timegm(claims_expire.utctimetuple()),
+            }
+        )
     encoded_jwt = jwt.encode(
         to_encode, settings.secret_key, algorithm=settings.algorithm
     )
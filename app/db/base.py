@@ -1,9 +1,64 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
 
 from app.core.config import settings
 
-engine = create_engine(settings.database_url, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def get_async_database_url(database_url: str) -> str:
+    """Map a configured database URL onto its asyncio driver."""
+    url = make_url(database_url)
+    if url.drivername == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url.render_as_string(hide_password=False)
+
+
+def sqlite_pragmas(read_only: bool = False) -> list[str]:
+    """PRAGMA statements for the configured SQLite profile."""
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout_ms)}",
+        f"PRAGMA journal_mode = {settings.sqlite_journal_mode}",
+        f"PRAGMA synchronous = {settings.sqlite_synchronous}",
+        # A negative cache_size is a size in KiB rather than in pages
+        f"PRAGMA cache_size = -{int(settings.sqlite_cache_size_kib)}",
+        f"PRAGMA mmap_size = {int(settings.sqlite_mmap_size)}",
+        f"PRAGMA temp_store = {settings.sqlite_temp_store}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+    return pragmas
+
+
+def _create_engine(read_only: bool = False) -> AsyncEngine:
+    database_url = get_async_database_url(settings.database_url)
+    async_engine = create_async_engine(database_url)
+
+    if make_url(database_url).get_backend_name() == "sqlite":
+        pragmas = sqlite_pragmas(read_only=read_only)
+
+        @event.listens_for(async_engine.sync_engine, "connect")
+        def _apply_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+
+    return async_engine
+
+
+# Writes go through ``engine``. GET routes use ``read_engine``, whose
+# connections are query-only, so under WAL polling reads never wait on writers.
+engine = _create_engine()
+read_engine = _create_engine(read_only=True)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=engine, autoflush=False, expire_on_commit=False
+)
+ReadSessionLocal = async_sessionmaker(
+    bind=read_engine, autoflush=False, expire_on_commit=False
+)
 
 Base = declarative_base()
@@ -0,0 +1,45 @@
+"""Apply Alembic migrations to the application database."""
+
+from pathlib import Path
+from typing import Optional
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect
+
+from app.core.config import settings
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+# Revision matching the schema that create_all used to build
+LEGACY_REVISION = "0001"
+
+
+def get_alembic_config(database_url: Optional[str] = None) -> Config:
+    """Build an Alembic config pointing at the given database."""
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("sqlalchemy.url", database_url or settings.database_url)
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def run_migrations(database_url: Optional[str] = None) -> None:
+    """Upgrade the database to the latest revision.
+
+    Databases created by ``create_all`` before migrations existed have tables
+    but no ``alembic_version``; they are stamped at the initial revision first
+    so the later revisions apply on top of them.
+    """
+    database_url = database_url or settings.database_url
+    config = get_alembic_config(database_url)
+
+    engine = create_engine(database_url)
+    try:
+        tables = set(inspect(engine).get_table_names())
+    finally:
+        engine.dispose()
+
+    if "queues" in tables and "alembic_version" not in tables:
+        command.stamp(config, LEGACY_REVISION)
+
+    command.upgrade(config, "head")
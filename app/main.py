@@ -1,16 +1,44 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.routes import auth, entries, queues
-from app.db.base import Base, engine
+from app.db.base import engine, read_engine
+from app.db.migrations import run_migrations
+from app.services.auth_cache import admin_membership_cache, auth_cache
+from app.services.broker import event_broker
+from app.services.outbox import outbox_dispatcher
+from app.services.password_hashing import password_hasher
+from app.services.rank_index import rank_index
+from app.services.response_cache import response_cache
+from app.services.sms import sms_service
+from app.services.wait_estimator import wait_estimator
+
+# Bring the database schema up to date
+run_migrations()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    await outbox_dispatcher.start()
+    await event_broker.start()
+    yield
+    await event_broker.stop()
+    # Send whatever is still queued, then close pooled connections
+    await outbox_dispatcher.stop()
+    await sms_service.aclose()
+    password_hasher.shutdown()
+    await engine.dispose()
+    await read_engine.dispose()
 
-# Create tables
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="Virtual Queue API",
     description="API for virtual queuing system with SMS notifications",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -20,6 +48,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination cursors of the listings
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include routers
@@ -36,3 +66,16 @@ def root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "sms_pacing": sms_service.pacing_stats(),
+        "response_cache": response_cache.cache_stats(),
+        "auth_cache": auth_cache.cache_stats(),
+        "admin_membership_cache": admin_membership_cache.cache_stats(),
+        "password_hashing": password_hasher.executor_stats(),
+        "rank_index": rank_index.cache_stats(),
+        "wait_estimator": wait_estimator.cache_stats(),
+    }
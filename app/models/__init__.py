@@ -1,4 +1,12 @@
+from app.models.outbox import OutboxStatus, SMSOutboxMessage
 from app.models.queue import Queue, QueueEntry, queue_admins
 from app.models.user import User
 
-__all__ = ["Queue", "QueueEntry", "User", "queue_admins"]
+__all__ = [
+    "OutboxStatus",
+    "Queue",
+    "QueueEntry",
+    "SMSOutboxMessage",
+    "User",
+    "queue_admins",
+]
@@ -0,0 +1,35 @@
+import enum
+
+from sqlalchemy import Column, DateTime, Enum, Index, Integer, String
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class OutboxStatus(str, enum.Enum):
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    DEAD = "dead"
+
+
+class SMSOutboxMessage(Base):
+    """An SMS written in the same transaction as the change that triggered it."""
+
+    __tablename__ = "sms_outbox"
+    __table_args__ = (
+        Index("ix_sms_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+    __allow_unmapped__ = True
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_number = Column(String, nullable=False)
+    body = Column(String, nullable=False)
+    status = Column(Enum(OutboxStatus), nullable=False, default=OutboxStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(String, nullable=True)
+    provider_message_id = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
@@ -8,6 +8,7 @@ from sqlalchemy import (
     DateTime,
     Enum,
     ForeignKey,
+    Index,
     Integer,
     String,
     Table,
@@ -40,11 +41,19 @@ queue_admins = Table(
     Base.metadata,
     Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
     Column("queue_id", Integer, ForeignKey("queues.id"), primary_key=True),
+    # The primary key leads with user_id; this serves lookups by queue
+    Index("ix_queue_admins_queue_id_user_id", "queue_id", "user_id"),
 )
 
 
 class Queue(Base):
     __tablename__ = "queues"
+    # AUTOINCREMENT: a new queue never gets the id, and so the ETags, of a
+    # deleted one
+    __table_args__ = (
+        Index("ix_queues_status_id", "status", "id"),
+        {"sqlite_autoincrement": True},
+    )
     __allow_unmapped__ = True
 
     id = Column(Integer, primary_key=True, index=True)
@@ -54,6 +63,12 @@ class Queue(Base):
     address = Column(String)
     status = Column(Enum(QueueStatus), default=QueueStatus.ACTIVE)
     estimated_wait_minutes = Column(Integer, default=5)
+    # Denormalized counters maintained by app.services.queue_counters
+    next_position = Column(Integer, nullable=False, default=1, server_default="1")
+    waiting_count = Column(Integer, nullable=False, default=0, server_default="0")
+    called_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped with the counters on every entry change, so it orders queue events
+    version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -65,9 +80,25 @@ class Queue(Base):
         "QueueEntry", back_populates="queue", cascade="all, delete-orphan"
     )
 
+    @property
+    def current_size(self) -> int:
+        """Number of waiting and called entries, read from the counters."""
+        return (self.waiting_count or 0) + (self.called_count or 0)
+
 
 class QueueEntry(Base):
     __tablename__ = "queue_entries"
+    __table_args__ = (
+        Index(
+            "ix_queue_entries_queue_id_status_position",
+            "queue_id",
+            "status",
+            "position",
+        ),
+        Index(
+            "ix_queue_entries_queue_id_position", "queue_id", "position", unique=True
+        ),
+    )
     __allow_unmapped__ = True
 
     id = Column(Integer, primary_key=True, index=True)
@@ -80,5 +111,7 @@ class QueueEntry(Base):
     joined_at = Column(DateTime(timezone=True), server_default=func.now())
     called_at = Column(DateTime(timezone=True), nullable=True)
     served_at = Column(DateTime(timezone=True), nullable=True)
+    # Smallest position-alert threshold this entry has been notified for
+    last_notified_threshold = Column(Integer, nullable=True)
 
     queue: Mapped[Queue] = relationship("Queue", back_populates="entries")
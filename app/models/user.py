@@ -9,6 +9,7 @@ from sqlalchemy.sql import func
 from app.db.base import Base
 
 if TYPE_CHECKING:
+    from app.core.security import QueueClaims
     from app.models.queue import Queue
 
 
@@ -22,9 +23,18 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     phone_number = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
+    # Bumped when the user stops managing a queue; tokens carrying queue claims
+    # from an older version fall back to checking queue_admins
+    queue_claims_version = Column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Queue claims of the access token this user authenticated with; set per
+    # request, never stored
+    queue_claims: QueueClaims | None = None
+
     # Many-to-many relationship with queues they can manage
     managed_queues: list[Queue] = relationship(  # type: ignore
         "Queue", secondary="queue_admins", back_populates="admins"
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.models.queue import EntryStatus, QueueStatus
 
@@ -51,6 +51,10 @@ class QueueEntryCreate(QueueEntryBase):
     queue_id: int
 
 
+class QueueEntryBulkCreate(BaseModel):
+    entries: list[QueueEntryCreate] = Field(min_length=1, max_length=500)
+
+
 class QueueEntryUpdate(BaseModel):
     status: Optional[EntryStatus] = None
 
@@ -69,3 +73,13 @@ class QueueEntryInDB(QueueEntryBase):
 
 class QueueEntry(QueueEntryInDB):
     estimated_wait_minutes: Optional[int] = None
+    # Place among the queue's waiting and called entries, starting at 1
+    rank: Optional[int] = None
+
+
+class QueueEntryBulkResult(BaseModel):
+    """Outcome of one item of a bulk join, in the order of the request."""
+
+    index: int
+    entry: Optional[QueueEntry] = None
+    error: Optional[str] = None
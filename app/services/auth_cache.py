@@ -0,0 +1,231 @@
+"""Cache of authenticated bearer tokens.
+
+Dashboards authenticate every poll and every action with the same token.
+``AuthCache`` remembers which user a token resolved to, so repeat requests
+skip both the JWT decode and the ``users`` lookup. Entries are bounded in
+number (least recently used first out) and live for ``ttl_seconds`` at most,
+never past the token's own expiry.
+
+Cached users are detached snapshots: callers merge them into their session
+with ``load=False``, which adds them to its identity map without a query, so
+they compare equal to the same user loaded through a relationship.
+
+Any ORM update or delete of a user drops that user's entries in every worker:
+once the session commits, a ``user_changed`` event goes out through the event
+broker. Bulk ``UPDATE`` statements on ``users`` bypass this and are only
+picked up when the entries expire.
+
+``AdminMembershipCache`` memoizes the queue admin checks that token claims
+can't answer.
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from typing import Any, NamedTuple, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from app.core.config import settings
+from app.models.user import User
+from app.services.broker import event_broker
+from app.services.events import QueueEvent, event_hub
+
+
+@dataclass
+class AuthCacheStats:
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class _CachedUser(NamedTuple):
+    user: User
+    expires_at: float
+
+
+def _snapshot(user: User) -> User:
+    """A detached copy of the user's columns and token claims, safe to share."""
+    copy = User(
+        **{attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+    )
+    copy.queue_claims = user.queue_claims
+    make_transient_to_detached(copy)
+    return copy
+
+
+class AuthCache:
+    """LRU cache from bearer tokens to user snapshots, with a TTL."""
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = AuthCacheStats()
+        self._clock = clock
+        self._entries: OrderedDict[str, _CachedUser] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str) -> Optional[User]:
+        cached = self._entries.get(token)
+        if cached is None or cached.expires_at <= self._clock():
+            if cached is not None:
+                del self._entries[token]
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.stats.hits += 1
+        return cached.user
+
+    def set(self, token: str, user: User, token_expires_at: Optional[float]) -> None:
+        """Remember a user; ``token_expires_at`` is the token's ``exp`` claim."""
+        ttl = self.ttl_seconds
+        if token_expires_at is not None:
+            ttl = min(ttl, token_expires_at - time.time())
+        if self.max_entries <= 0 or ttl <= 0:
+            return
+        self._entries[token] = _CachedUser(_snapshot(user), self._clock() + ttl)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> None:
+        tokens = [t for t, cached in self._entries.items() if cached.user.id == user_id]
+        for token in tokens:
+            del self._entries[token]
+        self.stats.invalidations += len(tokens)
+
+    def apply_event(self, event: QueueEvent) -> None:
+        """Drop the tokens of a changed user; listens on the event hub."""
+        if event.type == "user_changed" and event.user_id is not None:
+            self.invalidate_user(event.user_id)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def cache_stats(self) -> dict[str, Any]:
+        return {**self.stats.as_dict(), "entries": len(self._entries)}
+
+
+class _CachedMembership(NamedTuple):
+    is_admin: bool
+    expires_at: float
+
+
+class AdminMembershipCache:
+    """LRU cache of queue admin checks by (user id, queue id), with a TTL.
+
+    The routes that change ``queue_admins`` publish an ``admins_changed`` event
+    for each pair they touch, and every worker's cache drops the pair when the
+    event arrives. A deleted queue's pairs go with its ``queue_deleted`` event.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = AuthCacheStats()
+        self._clock = clock
+        self._entries: OrderedDict[tuple[int, int], _CachedMembership] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: int, queue_id: int) -> Optional[bool]:
+        key = (user_id, queue_id)
+        cached = self._entries.get(key)
+        if cached is None or cached.expires_at <= self._clock():
+            if cached is not None:
+                del self._entries[key]
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return cached.is_admin
+
+    def set(self, user_id: int, queue_id: int, is_admin: bool) -> None:
+        if self.max_entries <= 0:
+            return
+        key = (user_id, queue_id)
+        self._entries[key] = _CachedMembership(
+            is_admin, self._clock() + self.ttl_seconds
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int, queue_id: int) -> None:
+        if self._entries.pop((user_id, queue_id), None) is not None:
+            self.stats.invalidations += 1
+
+    def invalidate_queue(self, queue_id: int) -> None:
+        keys = [key for key in self._entries if key[1] == queue_id]
+        for key in keys:
+            del self._entries[key]
+        self.stats.invalidations += len(keys)
+
+    def apply_event(self, event: QueueEvent) -> None:
+        """Drop the pairs an event changed; listens on the event hub."""
+        if event.type == "admins_changed" and event.user_id is not None:
+            self.invalidate(event.user_id, event.queue_id)
+        elif event.type == "queue_deleted":
+            self.invalidate_queue(event.queue_id)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def cache_stats(self) -> dict[str, Any]:
+        return {**self.stats.as_dict(), "entries": len(self._entries)}
+
+
+# Global instances
+auth_cache = AuthCache(
+    max_entries=settings.auth_cache_max_entries,
+    ttl_seconds=settings.auth_cache_ttl_seconds,
+)
+admin_membership_cache = AdminMembershipCache(
+    max_entries=settings.admin_membership_cache_max_entries,
+    ttl_seconds=settings.admin_membership_cache_ttl_seconds,
+)
+event_hub.add_listener(auth_cache.apply_event)
+event_hub.add_listener(admin_membership_cache.apply_event)
+
+# Session.info key of the ids of users changed in the current transaction
+_CHANGED_USERS = "auth_cache_changed_users"
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _record_changed_user(mapper, connection, target: User) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_CHANGED_USERS, set()).add(int(target.id))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_changed_users(session: Session) -> None:
+    # Only once committed, so no worker can reload and cache the old row
+    for user_id in sorted(session.info.pop(_CHANGED_USERS, ())):
+        event_broker.publish(
+            QueueEvent(queue_id=0, type="user_changed", user_id=user_id)
+        )
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session: Session) -> None:
+    session.info.pop(_CHANGED_USERS, None)
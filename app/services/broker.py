@@ -0,0 +1,264 @@
+"""Delivery of queue events to every worker process.
+
+Routes publish through ``event_broker``; subscribers keep listening on the
+local ``event_hub``. The broker delivers each event to the hub in the
+publishing process straight away and, with a multi-process backend, to the
+hubs of the other workers too.
+
+``InProcessBroker`` is enough for a single worker. ``UnixSocketBroker`` fans
+events out between the workers on one host: whichever worker holds the lock
+file runs a small relay on a Unix domain socket, every worker connects to it,
+and each event written to the relay is copied to all other connections. If the
+relay's worker exits, another worker takes the lock over and the rest
+reconnect; their subscribers are asked to reload, since events may have been
+missed in between.
+
+Counter repairs made through any ``Session`` are announced as ``queue_updated``
+events once their transaction commits.
+"""
+
+import asyncio
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import uuid
+from abc import ABC, abstractmethod
+from typing import IO, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.events import EventHub, QueueEvent, event_hub
+from app.services.queue_counters import REPAIRED_QUEUE_VERSIONS
+
+logger = logging.getLogger(__name__)
+
+
+class EventBroker(ABC):
+    """Publishes queue events to the subscribers of every worker."""
+
+    def __init__(self, hub: EventHub):
+        self.hub = hub
+
+    async def start(self) -> None:
+        """Connect to the other workers, if the backend has any."""
+        return None
+
+    async def stop(self) -> None:
+        """Disconnect from the other workers."""
+        return None
+
+    @abstractmethod
+    def publish(self, event: QueueEvent) -> None:
+        """Deliver an event without blocking the caller."""
+
+
+class InProcessBroker(EventBroker):
+    """Delivers events to this process only."""
+
+    def publish(self, event: QueueEvent) -> None:
+        self.hub.publish(event)
+
+
+class UnixSocketBroker(EventBroker):
+    """Fans events out between workers through a relay on a Unix domain socket."""
+
+    def __init__(
+        self,
+        hub: EventHub,
+        path: str,
+        *,
+        reconnect_seconds: float = 0.2,
+        max_peer_buffer_bytes: int = 1024 * 1024,
+        max_message_bytes: int = 1024 * 1024,
+    ):
+        super().__init__(hub)
+        self.path = path
+        self.reconnect_seconds = reconnect_seconds
+        self.max_peer_buffer_bytes = max_peer_buffer_bytes
+        self.max_message_bytes = max_message_bytes
+        self.origin = uuid.uuid4().hex
+        self.connected = False
+        self._lock_file: Optional[IO[str]] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._peers: set[asyncio.StreamWriter] = set()
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_relay(self) -> bool:
+        return self._server is not None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self._close_connection()
+        await self._stop_relay()
+
+    def publish(self, event: QueueEvent) -> None:
+        self.hub.publish(event)
+        writer = self._writer
+        if writer is None or writer.is_closing():
+            return
+        message = {"origin": self.origin, "event": event.as_dict()}
+        writer.write(json.dumps(message).encode() + b"\n")
+
+    def _receive(self, line: bytes) -> None:
+        try:
+            message = json.loads(line)
+            if message["origin"] == self.origin:
+                return
+            event = QueueEvent.from_dict(message["event"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed event from the relay")
+            return
+        self.hub.publish(event)
+
+    async def _run(self) -> None:
+        reconnecting = False
+        while True:
+            await self._become_relay_if_free()
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(
+                    self.path, limit=self.max_message_bytes
+                )
+            except OSError:
+                await asyncio.sleep(self.reconnect_seconds)
+                continue
+
+            if reconnecting:
+                # Events may have been published while we were disconnected
+                self.hub.request_reload()
+            self.connected = True
+            try:
+                while line := await reader.readline():
+                    self._receive(line)
+            except OSError:
+                pass
+            except ValueError:
+                # readline() raises it for a line over the limit; the rest of
+                # the stream can't be trusted, so reconnect and reload
+                logger.warning(
+                    "Reconnecting after an event over %d bytes", self.max_message_bytes
+                )
+            finally:
+                self.connected = False
+                await self._close_connection()
+            reconnecting = True
+            await asyncio.sleep(self.reconnect_seconds)
+
+    async def wait_connected(self, timeout: float = 5.0) -> None:
+        """Wait until this worker is connected to the relay."""
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not self.connected:
+            if asyncio.get_running_loop().time() > deadline:
+                raise TimeoutError("Not connected to the event relay")
+            await asyncio.sleep(0.01)
+
+    async def _close_connection(self) -> None:
+        writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
+            with contextlib.suppress(OSError):
+                await writer.wait_closed()
+
+    async def _become_relay_if_free(self) -> None:
+        """Start the relay if no other worker holds the lock file."""
+        if self._server is not None:
+            return
+        lock_file = open(f"{self.path}.lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return
+
+        # Whoever held the lock before is gone; its socket file is stale
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.path)
+        self._lock_file = lock_file
+        self._server = await asyncio.start_unix_server(
+            self._serve_peer, self.path, limit=self.max_message_bytes
+        )
+        logger.info("Event relay listening on %s", self.path)
+
+    async def _stop_relay(self) -> None:
+        server, self._server = self._server, None
+        if server is not None:
+            server.close()
+            for peer in list(self._peers):
+                peer.close()
+            await server.wait_closed()
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.path)
+        lock_file, self._lock_file = self._lock_file, None
+        if lock_file is not None:
+            lock_file.close()
+
+    async def _serve_peer(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self._peers.add(writer)
+        try:
+            while line := await reader.readline():
+                self._relay(line, writer)
+        except OSError:
+            pass
+        except ValueError:
+            # Drop the worker rather than relay a cut-off event; it reconnects
+            # and reloads
+            logger.warning("Dropping a worker that sent an oversized event")
+        finally:
+            self._peers.discard(writer)
+            writer.close()
+
+    def _relay(self, line: bytes, sender: asyncio.StreamWriter) -> None:
+        for peer in list(self._peers):
+            if peer is sender:
+                continue
+            if peer.transport.get_write_buffer_size() > self.max_peer_buffer_bytes:
+                # Too slow to keep up: drop it; it reconnects and reloads
+                logger.warning("Dropping a worker that fell behind on events")
+                self._peers.discard(peer)
+                peer.close()
+                continue
+            peer.write(line)
+
+
+def create_event_broker(hub: EventHub, backend: Optional[str] = None) -> EventBroker:
+    """Build the broker selected by ``settings.event_broker``."""
+    backend = backend or settings.event_broker
+    if backend == "memory":
+        return InProcessBroker(hub)
+    if backend == "unix":
+        return UnixSocketBroker(hub, settings.event_broker_socket_path)
+    raise ValueError(f"Unknown event broker: {backend}")
+
+
+# Global instance
+event_broker: EventBroker = create_event_broker(event_hub)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_repaired_queues(session: Session) -> None:
+    # Only once committed, so no worker can reload the old counters
+    repaired = session.info.pop(REPAIRED_QUEUE_VERSIONS, {})
+    for queue_id, version in sorted(repaired.items()):
+        event_broker.publish(
+            QueueEvent(queue_id=queue_id, type="queue_updated", version=version)
+        )
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_repaired_queues(session: Session) -> None:
+    session.info.pop(REPAIRED_QUEUE_VERSIONS, None)
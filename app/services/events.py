@@ -0,0 +1,297 @@
+"""In-process publish/subscribe for queue changes.
+
+Write routes publish a ``QueueEvent`` after their transaction commits, and
+streaming endpoints subscribe to the queues they follow. Subscribers get a
+bounded buffer each; a subscriber that falls too far behind is marked as
+overflowed rather than slowing publishers down, and is expected to reload
+its state from the database.
+
+Entry events carry the queue's ``version`` from the same ``UPDATE`` that
+changed the entry, so a subscriber that loaded a snapshot at version ``v`` can
+ignore events at or below ``v`` and apply the rest. Events from concurrent
+requests may be published out of version order; each is still applied once.
+"""
+
+import asyncio
+import json
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from functools import cached_property
+from types import TracebackType
+from typing import Any, Optional
+
+from app.models.queue import EntryStatus, QueueEntry
+from app.schemas.queue import QueueEntryInDB
+from app.services.queue_counters import ACTIVE_STATUSES
+
+# Events that keep in-process caches current but mean nothing to subscribers
+LISTENER_ONLY_TYPES = frozenset({"admins_changed", "user_changed"})
+
+
+@dataclass(frozen=True)
+class QueueEvent:
+    """A change to a queue or one of its entries."""
+
+    queue_id: int
+    # "entry_joined", "entry_updated", "queue_updated" or "queue_deleted";
+    # "reload" only wakes a subscriber that has been asked to reload, and
+    # "admins_changed" and "user_changed" (with queue_id 0) only reach listeners
+    type: str
+    version: Optional[int] = None
+    entry_id: Optional[int] = None
+    position: Optional[int] = None
+    status: Optional[EntryStatus] = None
+    old_status: Optional[EntryStatus] = None
+    estimated_wait_minutes: Optional[int] = None
+    # The admin an "admins_changed" event added or removed, or the user a
+    # "user_changed" event updated or deleted
+    user_id: Optional[int] = None
+    # Serialized entry or queue, for subscribers that render it
+    data: Optional[dict[str, Any]] = field(default=None, compare=False)
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, values: dict[str, Any]) -> "QueueEvent":
+        values = dict(values)
+        for key in ("status", "old_status"):
+            if values.get(key) is not None:
+                values[key] = EntryStatus(values[key])
+        return cls(**values)
+
+    @classmethod
+    def entry_updated(
+        cls, entry: QueueEntry, old_status: EntryStatus, version: int
+    ) -> "QueueEvent":
+        """The event for a committed status change of ``entry``."""
+        return cls(
+            queue_id=int(entry.queue_id),
+            type="entry_updated",
+            version=version,
+            entry_id=int(entry.id),
+            position=int(entry.position),
+            status=EntryStatus(entry.status),
+            old_status=old_status,
+            data=QueueEntryInDB.model_validate(entry).model_dump(mode="json"),
+        )
+
+    @property
+    def requires_reload(self) -> bool:
+        """Whether the change can't be applied as a delta.
+
+        A ``queue_updated`` event without data follows a counter repair, after
+        entries were written outside the API.
+        """
+        return self.type == "queue_updated" and self.data is None
+
+    @cached_property
+    def message_json(self) -> str:
+        """The event as a small JSON delta, encoded once for all subscribers."""
+        if self.type == "entry_updated" and self.status is not None:
+            message_type = f"entry_{self.status.value}"
+        else:
+            message_type = self.type
+
+        message: dict[str, Any] = {"type": message_type}
+        if self.version is not None:
+            message["version"] = self.version
+        if self.type.startswith("entry_"):
+            message["entry"] = self.data
+        elif self.type == "queue_updated":
+            message["queue"] = self.data
+        return json.dumps(message)
+
+
+class Subscription:
+    """A subscriber's buffer of events for one queue."""
+
+    def __init__(self, hub: "EventHub", queue_id: int, max_pending: int):
+        self.hub = hub
+        self.queue_id = queue_id
+        self.overflowed = False
+        self._events: asyncio.Queue[QueueEvent] = asyncio.Queue(max_pending)
+
+    def put(self, event: QueueEvent) -> None:
+        if event.requires_reload:
+            self.overflowed = True
+        try:
+            self._events.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def request_reload(self) -> None:
+        """Mark the subscriber as out of date and wake it up."""
+        self.overflowed = True
+        self.put(QueueEvent(queue_id=self.queue_id, type="reload"))
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[QueueEvent]:
+        """Wait for the next event, or return None after ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self._events.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def reset(self) -> None:
+        """Drop buffered events and clear the overflow flag before a reload."""
+        while not self._events.empty():
+            self._events.get_nowait()
+        self.overflowed = False
+
+    def close(self) -> None:
+        self.hub.unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+class EventHub:
+    """Fans queue events out to the subscribers in this process."""
+
+    def __init__(self, max_pending: int = 1000):
+        self.max_pending = max_pending
+        self._subscriptions: defaultdict[int, set[Subscription]] = defaultdict(set)
+        self._listeners: list[Callable[[QueueEvent], None]] = []
+
+    def add_listener(self, listener: Callable[[QueueEvent], None]) -> None:
+        """Call ``listener`` with every event, for in-process state kept current."""
+        self._listeners.append(listener)
+
+    def subscribe(self, queue_id: int) -> Subscription:
+        subscription = Subscription(self, queue_id, self.max_pending)
+        self._subscriptions[queue_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.queue_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.queue_id]
+
+    def subscriber_count(self, queue_id: Optional[int] = None) -> int:
+        if queue_id is not None:
+            return len(self._subscriptions.get(queue_id, ()))
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def publish(self, event: QueueEvent) -> None:
+        """Deliver an event to every subscriber of its queue without blocking."""
+        for listener in self._listeners:
+            listener(event)
+        if event.type in LISTENER_ONLY_TYPES:
+            return
+        for subscription in list(self._subscriptions.get(event.queue_id, ())):
+            subscription.put(event)
+
+    def request_reload(self) -> None:
+        """Ask every subscriber to reload, e.g. after events may have been lost."""
+        for subscriptions in list(self._subscriptions.values()):
+            for subscription in list(subscriptions):
+                subscription.request_reload()
+
+
+@dataclass
+class EntryTracker:
+    """An entry's position and status, kept current from queue events.
+
+    Starts from a database snapshot and then applies events in place, so
+    following an entry costs no queries while the queue changes. Waits use
+    ``learned_minutes_per_entry`` from the wait estimator when there is one,
+    like the other routes, and the queue's static setting otherwise.
+    """
+
+    entry_id: int
+    status: EntryStatus
+    position: int
+    entries_ahead: int
+    # The queue's static estimated_wait_minutes
+    wait_minutes_per_entry: int
+    # Queue version the snapshot was loaded at
+    version: int
+    # Version of the change that set ``status``
+    status_version: int = field(init=False)
+    learned_minutes_per_entry: Optional[float] = None
+
+    def __post_init__(self) -> None:
+        self.status_version = self.version
+
+    @property
+    def estimated_wait_minutes(self) -> int:
+        if self.status not in ACTIVE_STATUSES:
+            return 0
+        minutes = self.learned_minutes_per_entry
+        if minutes is None:
+            minutes = self.wait_minutes_per_entry
+        return round(self.entries_ahead * minutes)
+
+    def set_learned_minutes(self, minutes: Optional[float]) -> bool:
+        """Use newly learned minutes. Returns True if the wait changed."""
+        before = self.estimated_wait_minutes
+        self.learned_minutes_per_entry = minutes
+        return self.estimated_wait_minutes != before
+
+    @property
+    def finished(self) -> bool:
+        return self.status not in ACTIVE_STATUSES
+
+    def apply(self, event: QueueEvent) -> bool:
+        """Update from an event. Returns True if anything visible changed."""
+        if event.type == "queue_updated":
+            if event.estimated_wait_minutes is None:
+                return False
+            before = self.estimated_wait_minutes
+            self.wait_minutes_per_entry = event.estimated_wait_minutes
+            return self.estimated_wait_minutes != before
+
+        if event.type == "queue_deleted":
+            self.status = EntryStatus.CANCELLED
+            self.entries_ahead = 0
+            return True
+
+        # Entry events already reflected in the snapshot are skipped
+        if event.version is None or event.version <= self.version:
+            return False
+
+        if event.entry_id == self.entry_id:
+            if event.status is None or event.version < self.status_version:
+                return False
+            changed = event.status != self.status
+            self.status = event.status
+            self.status_version = event.version
+            return changed
+
+        left_line = (
+            event.old_status in ACTIVE_STATUSES and event.status not in ACTIVE_STATUSES
+        )
+        if (
+            left_line
+            and event.position is not None
+            and event.position < self.position
+            and not self.finished
+        ):
+            self.entries_ahead = max(self.entries_ahead - 1, 0)
+            return True
+        return False
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.entry_id,
+            "status": self.status.value,
+            "position": self.position,
+            "entries_ahead": self.entries_ahead,
+            "estimated_wait_minutes": self.estimated_wait_minutes,
+        }
+
+
+# Global instance
+event_hub = EventHub()
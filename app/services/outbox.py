@@ -0,0 +1,315 @@
+"""Transactional SMS outbox and its background dispatcher.
+
+Routes call ``enqueue_sms`` inside the transaction that changes an entry, so a
+notification is stored if and only if that change commits. Once the response
+has been sent, the route hands the new message ids to
+``outbox_dispatcher.dispatch``. A background loop picks up anything that was
+never handed off (for example because the process died) and retries failed
+sends with exponential backoff until they succeed or are dead-lettered.
+
+Delivery is at-least-once: a worker that dies between sending a message and
+recording the result leaves it to be sent again once its lease expires. A
+live dispatcher renews its leases while pacing holds its batch back.
+"""
+
+import asyncio
+import contextlib
+import logging
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.config import settings
+from app.db.base import AsyncSessionLocal
+from app.models.outbox import OutboxStatus, SMSOutboxMessage
+from app.services.sms import SMSService, is_valid_phone_number, sms_service
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_sms(
+    db: AsyncSession, phone_number: str, body: str
+) -> Optional[SMSOutboxMessage]:
+    """Add an SMS to the outbox in the caller's transaction.
+
+    Returns None, and queues nothing, if the phone number is invalid.
+    """
+    if not is_valid_phone_number(phone_number):
+        return None
+
+    message = SMSOutboxMessage(
+        to_number=phone_number,
+        body=body,
+        status=OutboxStatus.PENDING,
+        attempts=0,
+        next_attempt_at=datetime.utcnow()
+        + timedelta(seconds=settings.sms_outbox_handoff_seconds),
+    )
+    db.add(message)
+    return message
+
+
+@dataclass
+class ClaimedMessage:
+    """An outbox row leased to this dispatcher for sending."""
+
+    id: int
+    to_number: str
+    body: str
+    attempts: int
+
+
+class OutboxDispatcher:
+    """Drains the SMS outbox in batches."""
+
+    def __init__(
+        self,
+        sms: SMSService,
+        session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+        *,
+        batch_size: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        retry_base_seconds: Optional[float] = None,
+        retry_max_seconds: Optional[float] = None,
+        poll_interval_seconds: Optional[float] = None,
+        lease_seconds: Optional[float] = None,
+    ):
+        self.sms = sms
+        self.session_factory = session_factory
+        self.batch_size = batch_size or settings.sms_outbox_batch_size
+        self.max_attempts = max_attempts or settings.sms_outbox_max_attempts
+        self.retry_base_seconds = (
+            retry_base_seconds or settings.sms_outbox_retry_base_seconds
+        )
+        self.retry_max_seconds = (
+            retry_max_seconds or settings.sms_outbox_retry_max_seconds
+        )
+        self.poll_interval_seconds = (
+            poll_interval_seconds or settings.sms_outbox_poll_interval_seconds
+        )
+        self.lease_seconds = lease_seconds or settings.sms_outbox_lease_seconds
+
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    def retry_delay(self, attempts: int) -> float:
+        """Seconds to wait before the next try after ``attempts`` failures."""
+        delay = self.retry_base_seconds * 2 ** (attempts - 1)
+        return float(min(delay, self.retry_max_seconds))
+
+    async def dispatch(self, message_ids: Sequence[int]) -> int:
+        """Send the given pending messages now. Returns how many were sent."""
+        if not message_ids:
+            return 0
+
+        claimed = await self._claim(
+            and_(
+                SMSOutboxMessage.id.in_(message_ids),
+                SMSOutboxMessage.status == OutboxStatus.PENDING,
+            ),
+            limit=len(message_ids),
+        )
+        await self._deliver(claimed)
+        return len(claimed)
+
+    async def dispatch_due(self, include_fresh: bool = False) -> int:
+        """Send one batch of messages that are due.
+
+        Due messages are pending ones whose retry time has passed and ones
+        whose lease expired mid-send. ``include_fresh`` also takes messages
+        still waiting for their request-side handoff. Returns the batch size.
+        """
+        now = datetime.utcnow()
+        due = or_(
+            and_(
+                SMSOutboxMessage.status == OutboxStatus.PENDING,
+                SMSOutboxMessage.next_attempt_at <= now,
+            ),
+            and_(
+                SMSOutboxMessage.status == OutboxStatus.SENDING,
+                SMSOutboxMessage.locked_until <= now,
+            ),
+        )
+        if include_fresh:
+            due = or_(
+                due,
+                and_(
+                    SMSOutboxMessage.status == OutboxStatus.PENDING,
+                    SMSOutboxMessage.attempts == 0,
+                ),
+            )
+
+        claimed = await self._claim(due, limit=self.batch_size)
+        await self._deliver(claimed)
+        return len(claimed)
+
+    async def start(self) -> None:
+        """Start the background loop."""
+        if self._task is not None:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def wake(self) -> None:
+        """Make the background loop check for due messages now."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the loop after draining whatever is still queued."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self.wake()
+        if timeout is None:
+            timeout = settings.sms_outbox_shutdown_timeout_seconds
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            logger.warning("SMS outbox drain timed out after %.1fs", timeout)
+        finally:
+            self._task = None
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while not self._stopping:
+            try:
+                while (
+                    await self.dispatch_due() == self.batch_size and not self._stopping
+                ):
+                    pass
+            except Exception:
+                logger.exception("SMS outbox dispatch failed")
+
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=self.poll_interval_seconds
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+        # Graceful drain, including messages whose handoff never happened
+        try:
+            while await self.dispatch_due(include_fresh=True):
+                pass
+        except Exception:
+            logger.exception("SMS outbox drain failed")
+
+    async def _claim(
+        self, condition: ColumnElement[bool], limit: int
+    ) -> list[ClaimedMessage]:
+        """Lease up to ``limit`` matching messages in one atomic UPDATE."""
+        now = datetime.utcnow()
+        candidates = (
+            select(SMSOutboxMessage.id)
+            .where(condition)
+            .order_by(SMSOutboxMessage.id)
+            .limit(limit)
+        )
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(SMSOutboxMessage)
+                .where(SMSOutboxMessage.id.in_(candidates), condition)
+                .values(
+                    status=OutboxStatus.SENDING,
+                    locked_until=now + timedelta(seconds=self.lease_seconds),
+                )
+                .returning(
+                    SMSOutboxMessage.id,
+                    SMSOutboxMessage.to_number,
+                    SMSOutboxMessage.body,
+                    SMSOutboxMessage.attempts,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            claimed = [ClaimedMessage(*row) for row in result.all()]
+            await db.commit()
+        return claimed
+
+    async def _deliver(self, messages: list[ClaimedMessage]) -> None:
+        """Send a claimed batch concurrently and record the outcomes."""
+        if not messages:
+            return
+
+        # Pacing can hold a large batch for longer than the lease, and another
+        # dispatcher would take over the rows still waiting and send them too
+        renewal = asyncio.create_task(
+            self._renew_leases([message.id for message in messages])
+        )
+        try:
+            results = await self.sms.send_batch(
+                [(message.to_number, message.body) for message in messages]
+            )
+        finally:
+            renewal.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await renewal
+
+        now = datetime.utcnow()
+        updates = []
+        for message, result in zip(messages, results):
+            attempts = message.attempts + 1
+            values: dict[str, Any] = {
+                "id": message.id,
+                "attempts": attempts,
+                "locked_until": None,
+                "next_attempt_at": now,
+                "sent_at": None,
+                "provider_message_id": None,
+                "last_error": None,
+            }
+            if result.get("success"):
+                values["status"] = OutboxStatus.SENT
+                values["sent_at"] = now
+                values["provider_message_id"] = result.get("message_id")
+            elif attempts >= self.max_attempts:
+                values["status"] = OutboxStatus.DEAD
+                values["last_error"] = result.get("error")
+                logger.warning(
+                    "SMS %s dead-lettered after %d attempts: %s",
+                    message.id,
+                    attempts,
+                    result.get("error"),
+                )
+            else:
+                values["status"] = OutboxStatus.PENDING
+                values["last_error"] = result.get("error")
+                values["next_attempt_at"] = now + timedelta(
+                    seconds=self.retry_delay(attempts)
+                )
+            updates.append(values)
+
+        async with self.session_factory() as db:
+            await db.execute(update(SMSOutboxMessage), updates)
+            await db.commit()
+
+    async def _renew_leases(self, message_ids: list[int]) -> None:
+        """Extend the lease on messages being sent, every third of a lease."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            async with self.session_factory() as db:
+                await db.execute(
+                    update(SMSOutboxMessage)
+                    .where(
+                        SMSOutboxMessage.id.in_(message_ids),
+                        SMSOutboxMessage.status == OutboxStatus.SENDING,
+                    )
+                    .values(
+                        locked_until=datetime.utcnow()
+                        + timedelta(seconds=self.lease_seconds)
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+
+
+# Global instance
+outbox_dispatcher = OutboxDispatcher(sms_service)
@@ -0,0 +1,111 @@
+"""A dedicated executor for password hashing.
+
+bcrypt is slow on purpose. Run in the shared threadpool, a burst of logins
+occupies the threads every ``run_in_threadpool`` call and sync route relies
+on. Hashing runs on its own small pool instead, and at most ``max_pending``
+calls may be queued or running at once: further calls fail straight away
+with ``PasswordHashingBusy``, so a login storm can't build an unbounded
+backlog either.
+"""
+
+import asyncio
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Optional, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when too many hashing calls are already pending."""
+
+
+@dataclass
+class PasswordHashingStats:
+    completed: int = 0
+    rejected: int = 0
+    max_queue_depth: int = 0
+    total_wait_seconds: float = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        stats = asdict(self)
+        stats["mean_wait_seconds"] = (
+            self.total_wait_seconds / self.completed if self.completed else 0.0
+        )
+        return stats
+
+
+class PasswordHashExecutor:
+    """Runs hashing calls on ``max_workers`` threads of its own."""
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max(max_workers, 1)
+        self.max_pending = max_pending
+        self.stats = PasswordHashingStats()
+        self._pending = 0
+        self._running = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def queue_depth(self) -> int:
+        """Calls waiting for a free hashing thread."""
+        return self._pending - self._running
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        if self._pending >= self.max_pending:
+            self.stats.rejected += 1
+            raise PasswordHashingBusy
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="password-hash"
+            )
+
+        submitted = time.monotonic()
+
+        def call() -> T:
+            with self._lock:
+                self._running += 1
+                self.stats.total_wait_seconds += time.monotonic() - submitted
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+        self._pending += 1
+        self.stats.max_queue_depth = max(self.stats.max_queue_depth, self.queue_depth)
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._executor, call
+            )
+        finally:
+            self._pending -= 1
+        self.stats.completed += 1
+        return result
+
+    def shutdown(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def executor_stats(self) -> dict[str, Any]:
+        return {
+            **self.stats.as_dict(),
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "queue_depth": self.queue_depth,
+        }
+
+
+# Global instance
+password_hasher = PasswordHashExecutor(
+    max_workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending,
+)
@@ -0,0 +1,96 @@
+"""Position alerts for customers nearing the front of a queue.
+
+Customers get a text when their rank among waiting entries reaches one of
+``settings.position_alert_thresholds`` (for example 3 and 1). Each entry
+remembers the smallest threshold it has been alerted for, so a threshold fires
+at most once per entry however often the queue moves.
+"""
+
+from collections.abc import Sequence
+from typing import Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from app.core.config import settings
+from app.models.outbox import SMSOutboxMessage
+from app.models.queue import EntryStatus, Queue, QueueEntry
+from app.services.outbox import enqueue_sms
+from app.services.sms import sms_service
+from app.services.wait_estimator import wait_estimator
+
+
+def crossed_threshold(
+    rank: int, thresholds: Optional[Sequence[int]] = None
+) -> Optional[int]:
+    """Smallest threshold at or above ``rank``, or None if it is behind them all."""
+    if thresholds is None:
+        thresholds = settings.position_alert_thresholds
+    return min((t for t in thresholds if rank <= t), default=None)
+
+
+async def enqueue_position_alerts(
+    db: AsyncSession, queue: Queue
+) -> list[SMSOutboxMessage]:
+    """Queue alerts for waiting entries that have crossed a new threshold.
+
+    Call after a change that moves waiting entries forward, in the same
+    transaction. Ranks the front of the queue in a single query, so the cost
+    does not depend on the queue length. The caller is responsible for
+    committing and dispatching the returned messages.
+    """
+    thresholds = settings.position_alert_thresholds
+    if not thresholds:
+        return []
+
+    rank = func.row_number().over(order_by=QueueEntry.position).label("rank")
+    rows = (
+        await db.execute(
+            select(
+                QueueEntry.id,
+                QueueEntry.phone_number,
+                QueueEntry.last_notified_threshold,
+                rank,
+            )
+            .where(
+                QueueEntry.queue_id == queue.id,
+                QueueEntry.status == EntryStatus.WAITING,
+            )
+            .order_by(QueueEntry.position)
+            .limit(max(thresholds))
+        )
+    ).all()
+
+    if not rows:
+        return []
+    # Learned from recent serves where available, like the entry streams
+    minutes_per_entry = await wait_estimator.minutes_per_entry(
+        db, int(queue.id), int(queue.estimated_wait_minutes or 0)
+    )
+
+    messages = []
+    notified = []
+    for entry_id, phone_number, last_threshold, entry_rank in rows:
+        threshold = crossed_threshold(entry_rank, thresholds)
+        if threshold is None or (
+            last_threshold is not None and threshold >= last_threshold
+        ):
+            continue
+
+        notified.append({"id": entry_id, "last_notified_threshold": threshold})
+        message = enqueue_sms(
+            db,
+            phone_number,
+            sms_service.position_update_message(
+                str(queue.business_name),
+                entry_rank,
+                round((entry_rank - 1) * minutes_per_entry),
+            ),
+        )
+        if message is not None:
+            messages.append(message)
+
+    if notified:
+        await db.execute(update(QueueEntry), notified)
+    return messages
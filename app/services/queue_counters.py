@@ -0,0 +1,278 @@
+"""Maintenance of the denormalized per-queue counters.
+
+``Queue.next_position``, ``Queue.waiting_count`` and ``Queue.called_count``
+let joins allocate a position and reads report the queue size without
+scanning ``queue_entries``. Every change goes through a single ``UPDATE`` in
+the caller's transaction, so the counters commit or roll back together with
+the entry change they describe. The same ``UPDATE`` bumps ``Queue.version``,
+which gives every entry change a place in its queue's history.
+
+The write helpers take an ``AsyncSession``. ``repair_queue_counters`` takes a
+plain ``Session`` so maintenance scripts can call it directly; async callers
+can use ``await db.run_sync(repair_queue_counters)``.
+"""
+
+from typing import Any, NamedTuple, Optional
+
+from sqlalchemy import case, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.sql import func
+
+from app.models.queue import EntryStatus, Queue, QueueEntry
+
+ACTIVE_STATUSES = (EntryStatus.WAITING, EntryStatus.CALLED)
+
+# Session.info key of {queue_id: version} for the queues repaired in the
+# current transaction; the event broker announces them once committed
+REPAIRED_QUEUE_VERSIONS = "repaired_queue_versions"
+
+_COUNTER_COLUMNS = {
+    EntryStatus.WAITING: "waiting_count",
+    EntryStatus.CALLED: "called_count",
+}
+
+
+class PositionAllocation(NamedTuple):
+    position: int
+    # Waiting and called entries ahead of the new one
+    entries_ahead: int
+    # Rank of the new entry among waiting entries, starting at 1
+    waiting_rank: int
+    # Queue version after the allocation
+    version: int
+
+
+async def allocate_position(db: AsyncSession, queue_id: int) -> PositionAllocation:
+    """Reserve the next position in a queue for a new waiting entry."""
+    return (await allocate_positions(db, queue_id, 1))[0]
+
+
+async def allocate_positions(
+    db: AsyncSession, queue_id: int, count: int
+) -> list[PositionAllocation]:
+    """Reserve ``count`` contiguous positions in a queue for new waiting entries.
+
+    One ``UPDATE`` covers the whole block. Each position gets its own version,
+    as if the entries had joined one after another.
+    """
+    result = await db.execute(
+        update(Queue)
+        .where(Queue.id == queue_id)
+        .values(
+            next_position=Queue.next_position + count,
+            waiting_count=Queue.waiting_count + count,
+            version=Queue.version + count,
+        )
+        .returning(
+            Queue.next_position,
+            Queue.waiting_count,
+            Queue.called_count,
+            Queue.version,
+        )
+    )
+    next_position, waiting_count, called_count, version = result.one()
+    first_position = next_position - count
+    first_waiting_rank = waiting_count - count + 1
+    first_version = version - count + 1
+    return [
+        PositionAllocation(
+            position=first_position + i,
+            entries_ahead=first_waiting_rank + called_count - 1 + i,
+            waiting_rank=first_waiting_rank + i,
+            version=first_version + i,
+        )
+        for i in range(count)
+    ]
+
+
+async def bump_version(db: AsyncSession, queue_id: int) -> int:
+    """Give a change to the queue itself a version, and return it.
+
+    For changes that move no entries, such as edits and admin changes; their
+    events carry the version so the rank index sees no gap in the history.
+    """
+    result = await db.execute(
+        update(Queue)
+        .where(Queue.id == queue_id)
+        .values(version=Queue.version + 1)
+        .returning(Queue.version)
+    )
+    return int(result.scalar_one())
+
+
+def entries_ahead(entry: Any = QueueEntry) -> Any:
+    """Active entries ahead of ``entry`` in its queue, as a correlated column.
+
+    NULL unless ``entry`` is waiting or called itself. The count reads only the
+    ``(queue_id, status, position)`` index entries ahead of it, so putting it
+    in the statement that loads the entry costs no extra round trip.
+    """
+    ahead = aliased(QueueEntry)
+    count = (
+        select(func.count())
+        .where(
+            ahead.queue_id == entry.queue_id,
+            ahead.status.in_(ACTIVE_STATUSES),
+            ahead.position < entry.position,
+        )
+        .scalar_subquery()
+    )
+    return case((entry.status.in_(ACTIVE_STATUSES), count))
+
+
+async def resync_next_position(db: AsyncSession, queue_id: int) -> None:
+    """Move a queue's ``next_position`` past its last entry, if it isn't already.
+
+    Positions only repeat when entries were written without going through the
+    counters; the unique ``(queue_id, position)`` index then rejects the join,
+    which calls this before trying again.
+    """
+    last_position = (
+        select(func.max(QueueEntry.position))
+        .where(QueueEntry.queue_id == queue_id)
+        .scalar_subquery()
+    )
+    await db.execute(
+        update(Queue)
+        .where(Queue.id == queue_id, Queue.next_position <= last_position)
+        .values(next_position=last_position + 1)
+    )
+
+
+async def transition_entry(
+    db: AsyncSession, entry: QueueEntry, new_status: EntryStatus, **values: Any
+) -> Optional[int]:
+    """Move an entry to a new status and adjust its queue's counters.
+
+    The status change is conditional on the entry still having the status the
+    caller saw, so two concurrent transitions cannot both apply. Returns the
+    queue's new version, or None if the entry was changed by someone else in
+    the meantime.
+    """
+    old_status = EntryStatus(entry.status)
+    result = await db.execute(
+        update(QueueEntry)
+        .where(QueueEntry.id == entry.id, QueueEntry.status == old_status)
+        .values(status=new_status, **values)
+        .execution_options(synchronize_session="fetch")
+    )
+    if result.rowcount != 1:  # type: ignore[attr-defined]
+        return None
+
+    deltas: dict[str, Any] = {"version": Queue.version + 1}
+    if old_status in _COUNTER_COLUMNS:
+        column = _COUNTER_COLUMNS[old_status]
+        deltas[column] = getattr(Queue, column) - 1
+    if new_status in _COUNTER_COLUMNS:
+        column = _COUNTER_COLUMNS[new_status]
+        deltas[column] = deltas.get(column, getattr(Queue, column)) + 1
+    version_result = await db.execute(
+        update(Queue)
+        .where(Queue.id == entry.queue_id)
+        .values(**deltas)
+        .returning(Queue.version)
+    )
+    return int(version_result.scalar_one())
+
+
+async def call_next_entries(
+    db: AsyncSession, queue_id: int, count: int
+) -> list[tuple[QueueEntry, int]]:
+    """Call the first ``count`` waiting entries of a queue.
+
+    The entries are claimed by a single ``UPDATE ... RETURNING`` that selects
+    them by position inside the same statement, so concurrent callers can
+    never claim the same entry. Returns the called entries in position order,
+    each with the queue version of its change.
+    """
+    head = (
+        select(QueueEntry.id)
+        .where(
+            QueueEntry.queue_id == queue_id, QueueEntry.status == EntryStatus.WAITING
+        )
+        .order_by(QueueEntry.position)
+        .limit(count)
+        .scalar_subquery()
+    )
+    called = (
+        await db.scalars(
+            update(QueueEntry)
+            .where(QueueEntry.id.in_(head), QueueEntry.status == EntryStatus.WAITING)
+            .values(status=EntryStatus.CALLED, called_at=func.now())
+            .returning(QueueEntry)
+            .execution_options(synchronize_session=False)
+        )
+    ).all()
+    if not called:
+        return []
+
+    result = await db.execute(
+        update(Queue)
+        .where(Queue.id == queue_id)
+        .values(
+            waiting_count=Queue.waiting_count - len(called),
+            called_count=Queue.called_count + len(called),
+            version=Queue.version + len(called),
+        )
+        .returning(Queue.version)
+    )
+    first_version = int(result.scalar_one()) - len(called) + 1
+    called = sorted(called, key=lambda entry: entry.position)
+    return [(entry, first_version + i) for i, entry in enumerate(called)]
+
+
+def repair_queue_counters(
+    db: Session, queue_ids: Optional[list[int]] = None
+) -> list[int]:
+    """Recompute the counters from ``queue_entries``.
+
+    Returns the ids of the queues whose stored counters were wrong. Their
+    versions are bumped too, so cached responses and rank indexes built from
+    the old counters are replaced. The caller is responsible for committing.
+    """
+    db.flush()
+
+    stats_query = db.query(
+        QueueEntry.queue_id,
+        func.sum(case((QueueEntry.status == EntryStatus.WAITING, 1), else_=0)),
+        func.sum(case((QueueEntry.status == EntryStatus.CALLED, 1), else_=0)),
+        func.max(QueueEntry.position),
+    ).group_by(QueueEntry.queue_id)
+    queue_query = db.query(
+        Queue.id, Queue.next_position, Queue.waiting_count, Queue.called_count
+    )
+    if queue_ids is not None:
+        stats_query = stats_query.filter(QueueEntry.queue_id.in_(queue_ids))
+        queue_query = queue_query.filter(Queue.id.in_(queue_ids))
+
+    stats = {
+        queue_id: (int(waiting), int(called), int(max_position))
+        for queue_id, waiting, called, max_position in stats_query.all()
+    }
+
+    repaired: list[int] = []
+    for queue_id, stored_next, stored_waiting, stored_called in queue_query.all():
+        waiting, called, max_position = stats.get(queue_id, (0, 0, 0))
+        # Never move next_position backwards: positions are not reused
+        next_position = max(stored_next or 1, max_position + 1)
+        if (stored_waiting, stored_called, stored_next) != (
+            waiting,
+            called,
+            next_position,
+        ):
+            version = db.execute(
+                update(Queue)
+                .where(Queue.id == queue_id)
+                .values(
+                    waiting_count=waiting,
+                    called_count=called,
+                    next_position=next_position,
+                    version=Queue.version + 1,
+                )
+                .returning(Queue.version)
+            ).scalar_one()
+            db.info.setdefault(REPAIRED_QUEUE_VERSIONS, {})[queue_id] = int(version)
+            repaired.append(queue_id)
+
+    return repaired
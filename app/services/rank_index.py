@@ -0,0 +1,341 @@
+"""In-process rank index of each queue's active entries.
+
+An entry's rank is one plus the number of active (waiting or called) entries
+at lower positions in its queue. Counting them in SQL costs time proportional
+to the entry's rank, so customers at the back of a long queue pay the most.
+``RankIndex`` keeps the active positions of recently read queues in a
+``FenwickTree``, which answers the same count in O(log n).
+
+A queue's index is loaded lazily, in one query, the first time one of its
+entries is ranked, and then kept current from the queue events every write
+route publishes: joins add a position and calls to service, cancellations and
+other exits from the line remove it. Each index remembers the queue version
+it reflects and only applies the event for the next version, so it is only
+ever used when that version matches the one the request read. An index that
+missed an event, or was asked about a newer version than it has seen, is
+dropped and the caller counts in SQL instead; the next read reloads it.
+
+Every ``check_every``-th answer is checked against a count in the database.
+If they disagree at the same version the index is dropped and the database
+answer used. ``verify`` compares a whole index with the database.
+"""
+
+from collections import OrderedDict
+from collections.abc import Iterable, Sequence
+from dataclasses import asdict, dataclass
+from typing import Any, Optional
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.queue import Queue, QueueEntry
+from app.services.events import QueueEvent, event_hub
+from app.services.queue_counters import ACTIVE_STATUSES
+
+
+class FenwickTree:
+    """Prefix sums over ``size`` counters with O(log n) updates and queries.
+
+    Indexes are 1-based.
+    """
+
+    def __init__(self, size: int):
+        self._tree = [0] * (size + 1)
+
+    @classmethod
+    def from_counts(cls, counts: Sequence[int]) -> "FenwickTree":
+        """A tree over ``counts``, built in O(n)."""
+        tree = cls(len(counts))
+        nodes = tree._tree
+        for index, count in enumerate(counts, start=1):
+            nodes[index] += count
+            parent = index + (index & -index)
+            if parent < len(nodes):
+                nodes[parent] += nodes[index]
+        return tree
+
+    @property
+    def size(self) -> int:
+        return len(self._tree) - 1
+
+    def add(self, index: int, delta: int) -> None:
+        nodes = self._tree
+        while index < len(nodes):
+            nodes[index] += delta
+            index += index & -index
+
+    def prefix_sum(self, index: int) -> int:
+        """The sum of the counters at ``1..index``."""
+        nodes = self._tree
+        index = min(index, len(nodes) - 1)
+        total = 0
+        while index > 0:
+            total += nodes[index]
+            index -= index & -index
+        return total
+
+
+class QueueRankIndex:
+    """The active positions of one queue, as of a queue version."""
+
+    # Smallest number of positions a tree is built for
+    MIN_SIZE = 64
+
+    def __init__(self, positions: Iterable[int], version: int):
+        self.version = version
+        self._positions = set(positions)
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        # Tree index i counts position offset + i. The offset starts just
+        # below the front of the line, and the tree leaves room to double the
+        # span up to the back, so joins rebuild it only now and then.
+        self._offset = min(self._positions, default=1) - 1
+        span = max(self._positions, default=self._offset) - self._offset
+        counts = [0] * max(2 * span, self.MIN_SIZE)
+        for position in self._positions:
+            counts[position - self._offset - 1] = 1
+        self._tree = FenwickTree.from_counts(counts)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, position: int) -> bool:
+        return position in self._positions
+
+    def positions(self) -> list[int]:
+        return sorted(self._positions)
+
+    def add(self, position: int) -> None:
+        if position in self._positions:
+            return
+        self._positions.add(position)
+        index = position - self._offset
+        if 1 <= index <= self._tree.size:
+            self._tree.add(index, 1)
+        else:
+            self._rebuild()
+
+    def remove(self, position: int) -> None:
+        if position not in self._positions:
+            return
+        self._positions.discard(position)
+        self._tree.add(position - self._offset, -1)
+
+    def entries_ahead(self, position: int) -> int:
+        """Active positions lower than ``position``."""
+        return self._tree.prefix_sum(position - self._offset - 1)
+
+    def apply(self, event: QueueEvent) -> None:
+        """Add or remove the position an entry event moved."""
+        if event.position is not None:
+            if event.type == "entry_joined":
+                self.add(event.position)
+            elif event.type == "entry_updated":
+                if event.status in ACTIVE_STATUSES:
+                    self.add(event.position)
+                else:
+                    self.remove(event.position)
+
+
+@dataclass
+class RankIndexStats:
+    hits: int = 0
+    misses: int = 0
+    loads: int = 0
+    events_applied: int = 0
+    # Indexes dropped after missing an event
+    dropped: int = 0
+    checks: int = 0
+    mismatches: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class RankIndex:
+    """Rank indexes of up to ``max_queues`` queues, least recently used out."""
+
+    def __init__(self, max_queues: int, check_every: int):
+        self.max_queues = max_queues
+        self.check_every = check_every
+        self.stats = RankIndexStats()
+        self._answers = 0
+        self._queues: OrderedDict[int, QueueRankIndex] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._queues)
+
+    def get(self, queue_id: int, version: int) -> Optional[QueueRankIndex]:
+        """The queue's index if it reflects ``version``.
+
+        An index behind ``version`` has missed a change and is dropped.
+        """
+        index = self._queues.get(queue_id)
+        if index is None or index.version != version:
+            if index is not None and index.version < version:
+                self.drop(queue_id)
+            self.stats.misses += 1
+            return None
+        self._queues.move_to_end(queue_id)
+        self.stats.hits += 1
+        return index
+
+    async def load(self, db: AsyncSession, queue_id: int) -> Optional[QueueRankIndex]:
+        """Build the queue's index from the database; None if there's no queue."""
+        index = await self._snapshot(db, queue_id)
+        if index is not None:
+            self._store(queue_id, index)
+        return index
+
+    async def entries_ahead(
+        self, db: AsyncSession, queue_id: int, position: int, version: int
+    ) -> Optional[int]:
+        """Active entries ahead of ``position`` at queue ``version``.
+
+        Loads the queue's index if needed. Returns None if the index can't
+        answer for ``version``, leaving the count to the caller.
+        """
+        if self.max_queues <= 0:
+            return None
+        index = self.get(queue_id, version)
+        if index is None:
+            index = await self.load(db, queue_id)
+            if index is None or index.version != version:
+                return None
+
+        ahead = index.entries_ahead(position)
+        self._answers += 1
+        if self.check_every > 0 and self._answers % self.check_every == 0:
+            return await self._check(db, queue_id, position, index, ahead)
+        return ahead
+
+    async def verify(self, db: AsyncSession, queue_id: int) -> bool:
+        """Compare the queue's index with the database and replace it.
+
+        Returns False if the index disagreed with the database at the same
+        version; an index at another version can't be compared.
+        """
+        snapshot = await self._snapshot(db, queue_id)
+        index = self._queues.get(queue_id)
+        agrees = (
+            index is None
+            or snapshot is None
+            or index.version != snapshot.version
+            or index.positions() == snapshot.positions()
+        )
+        if not agrees:
+            self.stats.mismatches += 1
+        self.drop(queue_id)
+        if snapshot is not None:
+            self._store(queue_id, snapshot)
+        return agrees
+
+    def apply_event(self, event: QueueEvent) -> None:
+        """Keep the event's queue index current; listens on the event hub."""
+        index = self._queues.get(event.queue_id)
+        if index is None:
+            return
+        if event.type == "queue_deleted" or event.requires_reload:
+            self.drop(event.queue_id)
+            return
+        # Events at or below the index's version are already in it; queue
+        # edits and admin changes only advance the version
+        if event.version is None or event.version <= index.version:
+            return
+        if event.version != index.version + 1:
+            # An event in between hasn't arrived, and may never
+            self.stats.dropped += 1
+            self.drop(event.queue_id)
+            return
+        index.apply(event)
+        index.version = event.version
+        self.stats.events_applied += 1
+
+    def drop(self, queue_id: int) -> None:
+        self._queues.pop(queue_id, None)
+
+    def clear(self) -> None:
+        self._queues.clear()
+        self._answers = 0
+
+    def cache_stats(self) -> dict[str, Any]:
+        return {
+            **self.stats.as_dict(),
+            "queues": len(self._queues),
+            "entries": sum(len(index) for index in self._queues.values()),
+        }
+
+    async def _snapshot(
+        self, db: AsyncSession, queue_id: int
+    ) -> Optional[QueueRankIndex]:
+        # The version and positions in one statement, so they agree
+        rows = (
+            await db.execute(
+                select(Queue.version, QueueEntry.position)
+                .outerjoin(
+                    QueueEntry,
+                    and_(
+                        QueueEntry.queue_id == Queue.id,
+                        QueueEntry.status.in_(ACTIVE_STATUSES),
+                    ),
+                )
+                .where(Queue.id == queue_id)
+            )
+        ).all()
+        if not rows:
+            return None
+        self.stats.loads += 1
+        return QueueRankIndex(
+            (position for _, position in rows if position is not None),
+            rows[0].version,
+        )
+
+    def _store(self, queue_id: int, index: QueueRankIndex) -> None:
+        current = self._queues.get(queue_id)
+        if current is not None and current.version > index.version:
+            # A concurrent load already stored a newer snapshot
+            return
+        self._queues[queue_id] = index
+        self._queues.move_to_end(queue_id)
+        while len(self._queues) > self.max_queues:
+            self._queues.popitem(last=False)
+
+    async def _check(
+        self,
+        db: AsyncSession,
+        queue_id: int,
+        position: int,
+        index: QueueRankIndex,
+        ahead: int,
+    ) -> int:
+        """Count in the database instead, dropping the index if it was wrong."""
+        self.stats.checks += 1
+        counted = (
+            select(func.count())
+            .where(
+                QueueEntry.queue_id == queue_id,
+                QueueEntry.status.in_(ACTIVE_STATUSES),
+                QueueEntry.position < position,
+            )
+            .scalar_subquery()
+        )
+        row = (
+            await db.execute(select(Queue.version, counted).where(Queue.id == queue_id))
+        ).one_or_none()
+        if row is None:
+            return ahead
+        version, db_ahead = row
+        if version == index.version and db_ahead != ahead:
+            self.stats.mismatches += 1
+            self.drop(queue_id)
+        return int(db_ahead)
+
+
+# Global instance
+rank_index = RankIndex(
+    max_queues=settings.rank_index_max_queues,
+    check_every=settings.rank_index_check_every,
+)
+event_hub.add_listener(rank_index.apply_event)
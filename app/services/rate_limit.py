@@ -0,0 +1,91 @@
+"""Token-bucket pacing for outgoing requests.
+
+A ``TokenBucket`` never rejects: each caller reserves the next token and is
+told how long to wait for it, so a burst above the configured rate is spread
+out at that rate in arrival order instead of failing.
+"""
+
+import asyncio
+import threading
+import time
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass
+from typing import Any
+
+
+@dataclass
+class PacingStats:
+    """How much delay a bucket has added to the requests it paced."""
+
+    acquired: int = 0
+    delayed: int = 0
+    total_delay_seconds: float = 0.0
+    max_delay_seconds: float = 0.0
+
+    def record(self, delay: float) -> None:
+        self.acquired += 1
+        if delay > 0:
+            self.delayed += 1
+            self.total_delay_seconds += delay
+            self.max_delay_seconds = max(self.max_delay_seconds, delay)
+
+    def as_dict(self) -> dict[str, Any]:
+        stats = asdict(self)
+        stats["mean_delay_seconds"] = (
+            self.total_delay_seconds / self.acquired if self.acquired else 0.0
+        )
+        return stats
+
+
+class TokenBucket:
+    """Allow ``rate`` acquisitions per second with bursts of up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.stats = PacingStats()
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        # A threading lock so sync and async callers can share one bucket
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return how many seconds to wait before using it.
+
+        The balance may go negative: later callers queue behind earlier ones.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            return max(-self._tokens / self.rate, 0.0)
+
+
+def reserve_all(buckets: Sequence[TokenBucket]) -> float:
+    """Reserve a token from every bucket and return the longest wait."""
+    delays = [bucket.reserve() for bucket in buckets]
+    delay = max(delays, default=0.0)
+    for bucket in buckets:
+        bucket.stats.record(delay)
+    return delay
+
+
+async def acquire(buckets: Sequence[TokenBucket]) -> float:
+    """Wait until every bucket allows another request. Returns the delay."""
+    delay = reserve_all(buckets)
+    if delay > 0:
+        await asyncio.sleep(delay)
+    return delay
+
+
+def acquire_blocking(buckets: Sequence[TokenBucket]) -> float:
+    """Blocking variant of ``acquire`` for callers outside the event loop."""
+    delay = reserve_all(buckets)
+    if delay > 0:
+        time.sleep(delay)
+    return delay
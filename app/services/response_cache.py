@@ -0,0 +1,127 @@
+"""In-process cache of serialized queue responses.
+
+The queue directory and queue details are read far more often than they
+change. ``ResponseCache`` keeps the final JSON bytes of those responses, so a
+hit skips the ORM queries and the per-row schema validation entirely.
+
+Each entry is stored with the ETag it was built for. Routes already look the
+ETag up before building a response, and a cached body is only served while
+it still matches, so another worker's writes can never be served stale. The
+write routes also invalidate the entries a change affects straight away, to
+free them, and entries expire after ``ttl_seconds`` in any case. At most
+``max_entries`` are kept, evicting the least recently used.
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable
+from dataclasses import asdict, dataclass
+from typing import Any, NamedTuple, Optional
+
+from app.core.config import settings
+
+
+@dataclass
+class ResponseCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        stats = asdict(self)
+        lookups = self.hits + self.misses
+        stats["hit_ratio"] = self.hits / lookups if lookups else 0.0
+        return stats
+
+
+class _CachedResponse(NamedTuple):
+    etag: str
+    body: bytes
+    expires_at: float
+    # Queues whose data the body contains
+    queue_ids: frozenset[int]
+
+
+class ResponseCache:
+    """LRU cache of response bodies with a TTL, keyed by route and parameters."""
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = ResponseCacheStats()
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, _CachedResponse] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, etag: str) -> Optional[bytes]:
+        """The cached body for ``key`` if it was built for ``etag`` and is fresh."""
+        cached = self._entries.get(key)
+        if cached is None or cached.etag != etag or cached.expires_at <= self._clock():
+            if cached is not None:
+                del self._entries[key]
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return cached.body
+
+    def set(
+        self, key: Hashable, etag: str, body: bytes, queue_ids: Iterable[int]
+    ) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = _CachedResponse(
+            etag, body, self._clock() + self.ttl_seconds, frozenset(queue_ids)
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def invalidate_queue(self, queue_id: int) -> None:
+        """Drop every response containing the queue's data."""
+        self._drop([k for k, v in self._entries.items() if queue_id in v.queue_ids])
+
+    def invalidate_listings(self) -> None:
+        """Drop every queue listing, e.g. after a queue joins or leaves one."""
+        self._drop([k for k in self._entries if _is_listing_key(k)])
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _drop(self, keys: list[Hashable]) -> None:
+        for key in keys:
+            del self._entries[key]
+        self.stats.invalidations += len(keys)
+
+    def cache_stats(self) -> dict[str, Any]:
+        return {**self.stats.as_dict(), "entries": len(self._entries)}
+
+
+def queue_key(queue_id: int) -> tuple[str, int]:
+    return ("queue", queue_id)
+
+
+def queues_key(
+    status: str, skip: int, limit: int, after_id: int = 0
+) -> tuple[str, str, int, int, int]:
+    return ("queues", status, skip, limit, after_id)
+
+
+def _is_listing_key(key: Hashable) -> bool:
+    return isinstance(key, tuple) and key[0] == "queues"
+
+
+# Global instance
+response_cache = ResponseCache(
+    max_entries=settings.response_cache_max_entries,
+    ttl_seconds=settings.response_cache_ttl_seconds,
+)
@@ -1,22 +1,65 @@
 """SMS notification service with mock and Twilio providers."""
 
+import asyncio
 import re
+import threading
 import uuid
 from abc import ABC, abstractmethod
+from collections.abc import Sequence
 from datetime import datetime
 from typing import Any, Optional, Union
 
+import httpx
+
 from app.core.config import settings
+from app.services.rate_limit import TokenBucket, acquire, acquire_blocking
+
+# Simple validation - starts with + and has 10-15 digits
+PHONE_NUMBER_PATTERN = re.compile(r"^\+\d{10,15}$")
+
+
+def is_valid_phone_number(phone_number: str) -> bool:
+    """Check a phone number is in E.164 format."""
+    return bool(PHONE_NUMBER_PATTERN.match(phone_number))
 
 
 class SMSProvider(ABC):
     """Abstract base class for SMS providers."""
 
+    from_number: Optional[str] = None
+
     @abstractmethod
     def send_sms(self, to: str, body: str) -> dict[str, Any]:
         """Send an SMS message."""
         pass
 
+    async def send_sms_async(self, to: str, body: str) -> dict[str, Any]:
+        """Send an SMS message without blocking the event loop.
+
+        The default runs the blocking ``send_sms`` in a worker thread; providers
+        with a native async client override this.
+        """
+        return await asyncio.to_thread(self.send_sms, to, body)
+
+    async def send_batch(
+        self, messages: Sequence[tuple[str, str]]
+    ) -> list[dict[str, Any]]:
+        """Send ``(to, body)`` pairs concurrently. Results keep the input order."""
+        results = await asyncio.gather(
+            *(self.send_sms_async(to, body) for to, body in messages),
+            return_exceptions=True,
+        )
+        return [
+            {"success": False, "error": str(result), "to": to, "body": body}
+            if isinstance(result, BaseException)
+            else result
+            for (to, body), result in zip(messages, results)
+        ]
+
+    async def aclose(self) -> None:
+        """Release any connections held by the provider."""
+        return None
+
 
 class MockSMSProvider(SMSProvider):
     """Mock SMS provider for development and testing."""
@@ -45,6 +88,10 @@ class MockSMSProvider(SMSProvider):
 
         return message
 
+    async def send_sms_async(self, to: str, body: str) -> dict[str, Any]:
+        """Simulate sending an SMS; nothing blocks, so no thread is needed."""
+        return self.send_sms(to, body)
+
     def get_sent_messages(self) -> list[dict[str, Any]]:
         """Get all sent messages (for testing)."""
         return self._sent_messages.copy()
@@ -96,22 +143,172 @@ class TwilioSMSProvider(SMSProvider):
             }
 
 
+class AsyncTwilioSMSProvider(SMSProvider):
+    """Twilio SMS provider on a pooled ``httpx.AsyncClient``.
+
+    Talks to the Messages REST endpoint directly, keeps connections alive
+    between sends and bounds the number of requests in flight, so large batches
+    go out in parallel without opening a connection per message.
+    """
+
+    def __init__(
+        self,
+        account_sid: Optional[str] = None,
+        auth_token: Optional[str] = None,
+        from_number: Optional[str] = None,
+        *,
+        base_url: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        timeout_seconds: Optional[float] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.account_sid = account_sid or settings.twilio_account_sid
+        self.auth_token = auth_token or settings.twilio_auth_token
+        self.from_number = from_number or settings.twilio_phone_number
+        if not all([self.account_sid, self.auth_token, self.from_number]):
+            raise ValueError("Twilio credentials not configured")
+
+        self.base_url = base_url or settings.twilio_api_base_url
+        self.max_concurrency = max_concurrency or settings.twilio_max_concurrency
+        self.timeout_seconds = timeout_seconds or settings.twilio_timeout_seconds
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def messages_path(self) -> str:
+        return f"/2010-04-01/Accounts/{self.account_sid}/Messages.json"
+
+    def _client_options(self) -> dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "auth": (self.account_sid, self.auth_token),
+            "timeout": self.timeout_seconds,
+        }
+
+    def _get_client(self) -> tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        # Created on first use so they bind to the running event loop
+        if self._client is None or self._semaphore is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+                transport=self._transport,
+                **self._client_options(),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client, self._semaphore
+
+    def _message_data(self, to: str, body: str) -> dict[str, Any]:
+        return {"To": to, "From": self.from_number, "Body": body}
+
+    def _parse_response(
+        self, to: str, body: str, response: httpx.Response
+    ) -> dict[str, Any]:
+        result: dict[str, Any] = {"to": to, "body": body, "provider": "twilio"}
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {}
+
+        if response.is_success:
+            result.update(success=True, message_id=payload.get("sid"))
+        else:
+            message = payload.get("message") or response.text
+            result.update(
+                success=False,
+                error=f"{response.status_code}: {message}",
+                status_code=response.status_code,
+            )
+        return result
+
+    def _error_result(self, to: str, body: str, error: Exception) -> dict[str, Any]:
+        return {
+            "success": False,
+            "error": str(error) or type(error).__name__,
+            "to": to,
+            "body": body,
+            "provider": "twilio",
+        }
+
+    async def send_sms_async(self, to: str, body: str) -> dict[str, Any]:
+        """Send SMS via the Twilio REST API."""
+        client, semaphore = self._get_client()
+        try:
+            async with semaphore:
+                response = await client.post(
+                    self.messages_path, data=self._message_data(to, body)
+                )
+        except httpx.HTTPError as e:
+            return self._error_result(to, body, e)
+        return self._parse_response(to, body, response)
+
+    def send_sms(self, to: str, body: str) -> dict[str, Any]:
+        """Send SMS via the Twilio REST API, blocking until it completes."""
+        try:
+            with httpx.Client(**self._client_options()) as client:
+                response = client.post(
+                    self.messages_path, data=self._message_data(to, body)
+                )
+        except httpx.HTTPError as e:
+            return self._error_result(to, body, e)
+        return self._parse_response(to, body, response)
+
+    async def aclose(self) -> None:
+        """Close the pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._semaphore = None
+
+
 class SMSService:
-    """Main SMS service that uses different providers."""
+    """Main SMS service that uses different providers.
+
+    Sends are paced by token buckets, one for the provider as a whole and one
+    per sending number, so bursts are spread out at the configured rates
+    instead of being throttled by the carrier.
+    """
+
+    def __init__(
+        self,
+        provider: Optional[Union[str, SMSProvider]] = None,
+        *,
+        provider_rate: Optional[float] = None,
+        provider_burst: Optional[int] = None,
+        number_rate: Optional[float] = None,
+        number_burst: Optional[int] = None,
+    ):
+        self.provider_rate = (
+            settings.sms_provider_rate_per_second
+            if provider_rate is None
+            else provider_rate
+        )
+        self.provider_burst = provider_burst or settings.sms_provider_burst
+        self.number_rate = (
+            settings.sms_number_rate_per_second if number_rate is None else number_rate
+        )
+        self.number_burst = number_burst or settings.sms_number_burst
+        self._buckets: dict[str, TokenBucket] = {}
+        self._buckets_lock = threading.Lock()
 
-    def __init__(self, provider: Optional[Union[str, SMSProvider]] = None):
         self.provider: SMSProvider
+        if provider is None and settings.sms_provider:
+            provider = settings.sms_provider
         if provider is None:
             # Default to mock in development, Twilio in production
             if settings.environment == "development":
                 self.provider = MockSMSProvider()
             else:
-                self.provider = TwilioSMSProvider()
+                self.provider = AsyncTwilioSMSProvider()
         elif isinstance(provider, str):
             if provider == "mock":
                 self.provider = MockSMSProvider()
             elif provider == "twilio":
                 self.provider = TwilioSMSProvider()
+            elif provider == "twilio_async":
+                self.provider = AsyncTwilioSMSProvider()
             else:
                 raise ValueError(f"Unknown provider: {provider}")
         else:
@@ -119,9 +316,103 @@ class SMSService:
 
     def _validate_phone_number(self, phone_number: str) -> bool:
         """Validate phone number format."""
-        # Simple validation - starts with + and has 10-15 digits
-        pattern = r"^\+\d{10,15}$"
-        return bool(re.match(pattern, phone_number))
+        return is_valid_phone_number(phone_number)
+
+    def _bucket(self, key: str, rate: float, burst: int) -> TokenBucket:
+        with self._buckets_lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(rate, burst)
+            return bucket
+
+    def _pacing_buckets(self) -> list[TokenBucket]:
+        """Buckets a send through the current provider has to pass."""
+        buckets = []
+        if self.provider_rate > 0:
+            buckets.append(
+                self._bucket(
+                    f"provider:{type(self.provider).__name__}",
+                    self.provider_rate,
+                    self.provider_burst,
+                )
+            )
+        if self.number_rate > 0 and self.provider.from_number:
+            buckets.append(
+                self._bucket(
+                    f"from:{self.provider.from_number}",
+                    self.number_rate,
+                    self.number_burst,
+                )
+            )
+        return buckets
+
+    def pacing_stats(self) -> dict[str, dict[str, Any]]:
+        """Delay added by pacing so far, per bucket."""
+        with self._buckets_lock:
+            buckets = dict(self._buckets)
+        return {key: bucket.stats.as_dict() for key, bucket in buckets.items()}
+
+    def queue_joined_message(
+        self, queue_name: str, position: int, estimated_wait_minutes: int
+    ) -> str:
+        """Body of the notification sent when a customer joins a queue."""
+        return (
+            f"Welcome to {queue_name}! You are in position {position}. "
+            f"Estimated wait time: {estimated_wait_minutes} minutes. "
+            f"We'll notify you when it's your turn."
+        )
+
+    def customer_called_message(self, queue_name: str) -> str:
+        """Body of the notification sent when a customer is called."""
+        return f"🔔 Your turn is ready at {queue_name}! Please come to the counter now."
+
+    def position_update_message(
+        self, queue_name: str, new_position: int, estimated_wait_minutes: int
+    ) -> str:
+        """Body of the notification sent when a customer's position changes."""
+        return (
+            f"Update from {queue_name}: You are now in position {new_position}. "
+            f"Estimated wait time: {estimated_wait_minutes} minutes."
+        )
+
+    def send_message(self, phone_number: str, body: str) -> dict[str, Any]:
+        """Send a prepared message body."""
+        if not self._validate_phone_number(phone_number):
+            return {"success": False, "error": "Invalid phone number format"}
+
+        delay = acquire_blocking(self._pacing_buckets())
+        result = self.provider.send_sms(phone_number, body)
+        return {**result, "pacing_delay_seconds": delay}
+
+    async def send_message_async(self, phone_number: str, body: str) -> dict[str, Any]:
+        """Send a prepared message body without blocking the event loop."""
+        if not self._validate_phone_number(phone_number):
+            return {"success": False, "error": "Invalid phone number format"}
+
+        delay = await acquire(self._pacing_buckets())
+        try:
+            result = await self.provider.send_sms_async(phone_number, body)
+        except Exception as e:
+            result = {"success": False, "error": str(e), "to": phone_number}
+        return {**result, "pacing_delay_seconds": delay}
+
+    async def send_batch(
+        self, messages: Sequence[tuple[str, str]]
+    ) -> list[dict[str, Any]]:
+        """Send ``(phone_number, body)`` pairs concurrently.
+
+        Results keep the input order. Each send is paced individually, so a
+        batch larger than the burst size is spread out rather than rejected.
+        """
+        return list(
+            await asyncio.gather(
+                *(self.send_message_async(to, body) for to, body in messages)
+            )
+        )
+
+    async def aclose(self) -> None:
+        """Release the provider's connections."""
+        await self.provider.aclose()
 
     def send_queue_joined_notification(
         self,
@@ -131,25 +422,16 @@ class SMSService:
         estimated_wait_minutes: int,
     ) -> dict[str, Any]:
         """Send notification when customer joins queue."""
-        if not self._validate_phone_number(phone_number):
-            return {"success": False, "error": "Invalid phone number format"}
-
-        body = (
-            f"Welcome to {queue_name}! You are in position {position}. "
-            f"Estimated wait time: {estimated_wait_minutes} minutes. "
-            f"We'll notify you when it's your turn."
+        return self.send_message(
+            phone_number,
+            self.queue_joined_message(queue_name, position, estimated_wait_minutes),
         )
-        return self.provider.send_sms(phone_number, body)
 
     def send_customer_called_notification(
         self, phone_number: str, queue_name: str
     ) -> dict[str, Any]:
         """Send notification when customer is called."""
-        if not self._validate_phone_number(phone_number):
-            return {"success": False, "error": "Invalid phone number format"}
-
-        body = f"🔔 Your turn is ready at {queue_name}! Please come to the counter now."
-        return self.provider.send_sms(phone_number, body)
+        return self.send_message(phone_number, self.customer_called_message(queue_name))
 
     def send_position_update_notification(
         self,
@@ -159,14 +441,12 @@ class SMSService:
         estimated_wait_minutes: int,
     ) -> dict[str, Any]:
         """Send notification when customer's position changes."""
-        if not self._validate_phone_number(phone_number):
-            return {"success": False, "error": "Invalid phone number format"}
-
-        body = (
-            f"Update from {queue_name}: You are now in position {new_position}. "
-            f"Estimated wait time: {estimated_wait_minutes} minutes."
+        return self.send_message(
+            phone_number,
+            self.position_update_message(
+                queue_name, new_position, estimated_wait_minutes
+            ),
         )
-        return self.provider.send_sms(phone_number, body)
 
 
 # Global instance
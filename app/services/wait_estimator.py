@@ -0,0 +1,274 @@
+"""Wait estimates learned from each queue's recent service times.
+
+The static ``Queue.estimated_wait_minutes`` is whatever the business typed
+in, so ``WaitEstimator`` learns how long the line actually takes to move.
+Each serve gives a sample: the minutes between the previous serve and this
+one, or since the entry joined if the line was empty in between. That is how
+long one entry ahead adds to a wait, however many counters are serving.
+Samples count once per person, i.e. weighted by ``party_size``.
+
+Per queue it keeps an exponentially weighted moving average (EWMA) of the
+samples and the last ``window`` of them for percentiles, and estimates a wait
+as the entries ahead times ``settings.wait_estimate_statistic``. Queues with
+fewer than ``min_samples`` serves use their static setting.
+
+Statistics are kept per worker. A queue's are loaded lazily from its most
+recent served entries, in one query, and updated incrementally from the
+``entry_updated`` events of serves, which every worker receives. Samples
+longer than ``max_sample_minutes``, such as the first serve after closing
+for the night, are left out.
+
+``benchmarks.wait_estimates`` backtests the statistics on historic entries.
+"""
+
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.queue import EntryStatus, QueueEntry
+from app.services.events import QueueEvent, event_hub
+
+STATISTICS = ("static", "ewma", "median", "p75", "p90")
+
+_PERCENTILES = {"median": 0.5, "p75": 0.75, "p90": 0.9}
+
+
+def _naive_utc(moment: datetime) -> datetime:
+    """SQLite hands timestamps back naive, in UTC; compare like with like."""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def _parse_timestamp(value: str) -> datetime:
+    # fromisoformat only reads a "Z" suffix from Python 3.11
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class ServiceTimes:
+    """Rolling service-time statistics of one queue."""
+
+    def __init__(self, alpha: float, window: int, max_sample_minutes: float):
+        self.alpha = alpha
+        self.max_sample_minutes = max_sample_minutes
+        self.ewma: Optional[float] = None
+        self.last_served_at: Optional[datetime] = None
+        # (minutes, party size) of the most recent samples
+        self.samples: deque[tuple[float, int]] = deque(maxlen=window)
+        # Samples taken, including those that left the window
+        self.count = 0
+
+    def observe(
+        self, joined_at: datetime, served_at: datetime, party_size: int
+    ) -> None:
+        """Add the serve of an entry; serves must come in ``served_at`` order."""
+        joined_at, served_at = _naive_utc(joined_at), _naive_utc(served_at)
+        start = joined_at
+        if self.last_served_at is not None:
+            start = max(start, self.last_served_at)
+            # Serves published out of order still count from the latest one
+            served_at = max(served_at, self.last_served_at)
+        self.last_served_at = served_at
+
+        minutes = max((served_at - start).total_seconds() / 60, 0.0)
+        if minutes > self.max_sample_minutes:
+            return
+        weight = max(party_size, 1)
+        if self.ewma is None:
+            self.ewma = minutes
+        else:
+            # The same as ``weight`` updates with one sample each
+            self.ewma += (1 - (1 - self.alpha) ** weight) * (minutes - self.ewma)
+        self.samples.append((minutes, weight))
+        self.count += 1
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """The weighted ``fraction`` percentile of the recent samples."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        threshold = fraction * sum(weight for _, weight in ordered)
+        seen = 0
+        for minutes, weight in ordered:
+            seen += weight
+            if seen >= threshold:
+                return minutes
+        return ordered[-1][0]
+
+    def statistic(self, name: str) -> Optional[float]:
+        if name == "ewma":
+            return self.ewma
+        if name in _PERCENTILES:
+            return self.percentile(_PERCENTILES[name])
+        return None
+
+
+@dataclass
+class WaitEstimatorStats:
+    loads: int = 0
+    samples: int = 0
+    learned_estimates: int = 0
+    static_estimates: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class WaitEstimator:
+    """Service times of up to ``max_queues`` queues, least recently used out."""
+
+    def __init__(
+        self,
+        max_queues: int,
+        statistic: str,
+        alpha: float,
+        window: int,
+        min_samples: int,
+        max_sample_minutes: float,
+    ):
+        if statistic not in STATISTICS:
+            raise ValueError(f"Unknown wait estimate statistic {statistic!r}")
+        self.max_queues = max_queues
+        self.statistic = statistic
+        self.alpha = alpha
+        self.window = window
+        self.min_samples = min_samples
+        self.max_sample_minutes = max_sample_minutes
+        self.stats = WaitEstimatorStats()
+        self._queues: OrderedDict[int, ServiceTimes] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._queues)
+
+    def service_times(self) -> ServiceTimes:
+        """Empty statistics with this estimator's settings."""
+        return ServiceTimes(self.alpha, self.window, self.max_sample_minutes)
+
+    def learned_minutes(self, times: ServiceTimes) -> Optional[float]:
+        """Minutes per entry ahead, or None until enough serves were seen."""
+        if times.count < self.min_samples:
+            return None
+        return times.statistic(self.statistic)
+
+    async def queue_learned_minutes(
+        self, db: AsyncSession, queue_id: int
+    ) -> Optional[float]:
+        """The queue's learned minutes per entry ahead, loading it if needed.
+
+        None when waits come from the static setting.
+        """
+        if self.statistic == "static" or self.max_queues <= 0:
+            return None
+        times = self._queues.get(queue_id)
+        if times is None:
+            times = await self._load(db, queue_id)
+        else:
+            self._queues.move_to_end(queue_id)
+        return self.learned_minutes(times)
+
+    async def minutes_per_entry(
+        self, db: AsyncSession, queue_id: int, static_minutes: Optional[int]
+    ) -> float:
+        """Minutes each entry ahead adds to a wait in the queue.
+
+        Loads the queue's statistics if needed, and falls back to the queue's
+        static ``estimated_wait_minutes``.
+        """
+        minutes = await self.queue_learned_minutes(db, queue_id)
+        if minutes is None:
+            self.stats.static_estimates += 1
+            return float(static_minutes or 0)
+        self.stats.learned_estimates += 1
+        return minutes
+
+    async def estimate_wait(
+        self,
+        db: AsyncSession,
+        queue_id: int,
+        entries_ahead: int,
+        static_minutes: Optional[int],
+    ) -> int:
+        """Estimated wait in whole minutes behind ``entries_ahead`` entries."""
+        if entries_ahead <= 0:
+            return 0
+        minutes = await self.minutes_per_entry(db, queue_id, static_minutes)
+        return round(entries_ahead * minutes)
+
+    def apply_event(self, event: QueueEvent) -> None:
+        """Learn from serves in loaded queues; listens on the event hub."""
+        if event.type == "queue_deleted":
+            self._queues.pop(event.queue_id, None)
+            return
+        times = self._queues.get(event.queue_id)
+        if (
+            times is None
+            or event.type != "entry_updated"
+            or event.status != EntryStatus.SERVED
+            or event.data is None
+            or event.data.get("served_at") is None
+        ):
+            return
+        times.observe(
+            _parse_timestamp(event.data["joined_at"]),
+            _parse_timestamp(event.data["served_at"]),
+            event.data.get("party_size") or 1,
+        )
+        self.stats.samples += 1
+
+    def clear(self) -> None:
+        self._queues.clear()
+
+    def cache_stats(self) -> dict[str, Any]:
+        return {
+            **self.stats.as_dict(),
+            "statistic": self.statistic,
+            "queues": len(self._queues),
+        }
+
+    async def _load(self, db: AsyncSession, queue_id: int) -> ServiceTimes:
+        # The index on (queue_id, status, position) finds the latest serves
+        rows = (
+            await db.execute(
+                select(
+                    QueueEntry.joined_at, QueueEntry.served_at, QueueEntry.party_size
+                )
+                .where(
+                    QueueEntry.queue_id == queue_id,
+                    QueueEntry.status == EntryStatus.SERVED,
+                    QueueEntry.served_at.is_not(None),
+                )
+                .order_by(QueueEntry.position.desc())
+                .limit(self.window + 1)
+            )
+        ).all()
+        rows = sorted(rows, key=lambda row: row[1])
+        times = self.service_times()
+        if rows:
+            # The oldest serve only marks where the next one's sample starts
+            times.last_served_at = _naive_utc(rows.pop(0)[1])
+        for joined_at, served_at, party_size in rows:
+            times.observe(joined_at, served_at, party_size or 1)
+        self.stats.loads += 1
+
+        self._queues[queue_id] = times
+        self._queues.move_to_end(queue_id)
+        while len(self._queues) > self.max_queues:
+            self._queues.popitem(last=False)
+        return times
+
+
+# Global instance
+wait_estimator = WaitEstimator(
+    max_queues=settings.wait_estimate_max_queues,
+    statistic=settings.wait_estimate_statistic,
+    alpha=settings.wait_estimate_alpha,
+    window=settings.wait_estimate_window,
+    min_samples=settings.wait_estimate_min_samples,
+    max_sample_minutes=settings.wait_estimate_max_sample_minutes,
+)
+event_hub.add_listener(wait_estimator.apply_event)
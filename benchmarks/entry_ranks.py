@@ -0,0 +1,177 @@
+"""Measure entry status and listing reads on a long queue.
+
+Fills a fresh SQLite database in a temporary directory with one queue of
+``--entries`` active entries (the first ``--called`` of them called, the rest
+waiting), then times the customer status read and the entry listing through
+the app, printing the mean latency and the number of SQL statements per
+request::
+
+    python -m benchmarks.entry_ranks --entries 10000 --requests 200
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+
+# The app reads its settings at import time
+_DB_DIR = tempfile.mkdtemp(prefix="queue-rank-benchmark-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'benchmark.db')}"
+os.environ.setdefault("DEBUG", "false")
+
+import httpx  # noqa: E402
+from sqlalchemy import create_engine, event, insert  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.db.base import engine as app_engine  # noqa: E402
+from app.db.base import read_engine as app_read_engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.queue import EntryStatus, Queue, QueueEntry  # noqa: E402
+
+
+def populate(entries: int, called: int) -> tuple[int, list[int]]:
+    """Create the queue and its entries; return its id and the entry ids."""
+    engine = create_engine(os.environ["DATABASE_URL"])
+    with Session(engine) as session:
+        queue = Queue(
+            name="benchmark",
+            business_name="Benchmark",
+            next_position=entries + 1,
+            waiting_count=entries - called,
+            called_count=called,
+        )
+        session.add(queue)
+        session.flush()
+        session.execute(
+            insert(QueueEntry),
+            [
+                {
+                    "queue_id": queue.id,
+                    "customer_name": f"Customer {i}",
+                    "phone_number": f"+1555{i:07d}",
+                    "position": i + 1,
+                    "status": EntryStatus.CALLED if i < called else EntryStatus.WAITING,
+                }
+                for i in range(entries)
+            ],
+        )
+        session.commit()
+        queue_id = int(queue.id)
+        entry_ids = [
+            entry_id
+            for (entry_id,) in session.query(QueueEntry.id).order_by(
+                QueueEntry.position
+            )
+        ]
+    engine.dispose()
+    return queue_id, entry_ids
+
+
+class StatementCounter:
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, *args: object) -> None:
+        self.count += 1
+
+
+async def measure(
+    label: str,
+    requests: int,
+    counter: StatementCounter,
+    request: Callable[[], Awaitable[httpx.Response]],
+) -> None:
+    # Warm the connection pool and SQLite's page cache
+    (await request()).raise_for_status()
+    counter.count = 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        (await request()).raise_for_status()
+    elapsed = time.perf_counter() - started
+    print(
+        f"{label:<40} {elapsed / requests * 1000:8.2f} ms/request "
+        f"{counter.count / requests:5.1f} statements/request"
+    )
+
+
+async def run_requests(
+    client: httpx.AsyncClient,
+    queue_id: int,
+    entry_ids: list[int],
+    requests: int,
+    counter: StatementCounter,
+) -> None:
+    for label, index in [
+        ("get entry at the front", 0),
+        ("get entry in the middle", len(entry_ids) // 2),
+        ("get entry at the back", len(entry_ids) - 1),
+    ]:
+        url = f"/api/entries/{entry_ids[index]}"
+        await measure(label, requests, counter, lambda url=url: client.get(url))
+
+    url = f"/api/entries/queue/{queue_id}"
+    await measure("list first page", requests, counter, lambda: client.get(url))
+
+    # Follow the cursors to the one leading to the last page
+    cursor = (await client.get(url)).headers["x-next-cursor"]
+    while True:
+        response = await client.get(url, params={"cursor": cursor})
+        next_cursor = response.headers.get("x-next-cursor")
+        if next_cursor is None:
+            break
+        cursor = next_cursor
+    await measure(
+        "list last page by cursor",
+        requests,
+        counter,
+        lambda: client.get(url, params={"cursor": cursor}),
+    )
+    await measure(
+        "list last waiting page by cursor",
+        requests,
+        counter,
+        lambda: client.get(url, params={"cursor": cursor, "status": "waiting"}),
+    )
+    skip = max(len(entry_ids) - 100, 0)
+    await measure(
+        "list last page by skip (deprecated)",
+        requests,
+        counter,
+        lambda: client.get(url, params={"skip": skip}),
+    )
+
+
+async def run(entries: int, called: int, requests: int) -> None:
+    queue_id, entry_ids = populate(entries, called)
+    counter = StatementCounter()
+    for engine in (app_engine.sync_engine, app_read_engine.sync_engine):
+        event.listen(engine, "before_cursor_execute", counter)
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            await run_requests(client, queue_id, entry_ids, requests, counter)
+    finally:
+        await app_engine.dispose()
+        await app_read_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Entry rank read latency")
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--called", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.entries, args.called, args.requests))
+    finally:
+        shutil.rmtree(_DB_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""A local stand-in for the Twilio Messages API.
+
+Accepts the same ``POST /2010-04-01/Accounts/{sid}/Messages.json`` requests as
+Twilio and answers with Twilio-shaped JSON after a configurable delay, failing
+a configurable share of them with 429 or 500. It lets the SMS providers be
+benchmarked without network access or a Twilio account.
+
+Run it standalone with::
+
+    python -m benchmarks.fake_twilio --port 8081 --latency-ms 150 --error-rate 0.05
+"""
+
+import argparse
+import asyncio
+import random
+import uuid
+from dataclasses import dataclass
+
+from fastapi import FastAPI, Form, Request
+from fastapi.responses import JSONResponse
+
+
+@dataclass
+class FakeTwilioStats:
+    """Counters describing the traffic the fake server has seen."""
+
+    requests: int = 0
+    accepted: int = 0
+    failed: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+
+
+def create_fake_twilio_app(
+    latency_ms: float = 100.0,
+    jitter_ms: float = 0.0,
+    error_rate: float = 0.0,
+    seed: int = 0,
+) -> FastAPI:
+    """Build the fake API. Its counters are available as ``app.state.stats``."""
+    app = FastAPI(title="Fake Twilio")
+    stats = FakeTwilioStats()
+    rng = random.Random(seed)
+    app.state.stats = stats
+
+    @app.post("/2010-04-01/Accounts/{account_sid}/Messages.json")
+    async def create_message(
+        account_sid: str,
+        request: Request,
+        to: str = Form(..., alias="To"),
+        from_: str = Form(..., alias="From"),
+        body: str = Form(..., alias="Body"),
+    ) -> JSONResponse:
+        stats.requests += 1
+        stats.in_flight += 1
+        stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+        try:
+            delay_ms = latency_ms + rng.uniform(-jitter_ms, jitter_ms)
+            await asyncio.sleep(max(delay_ms, 0.0) / 1000)
+
+            if rng.random() < error_rate:
+                stats.failed += 1
+                if rng.random() < 0.5:
+                    return JSONResponse(
+                        status_code=429,
+                        content={
+                            "code": 20429,
+                            "message": "Too Many Requests",
+                            "status": 429,
+                        },
+                    )
+                return JSONResponse(
+                    status_code=500,
+                    content={
+                        "code": 20500,
+                        "message": "Internal Server Error",
+                        "status": 500,
+                    },
+                )
+
+            stats.accepted += 1
+            return JSONResponse(
+                status_code=201,
+                content={
+                    "sid": f"SM{uuid.uuid4().hex}",
+                    "account_sid": account_sid,
+                    "to": to,
+                    "from": from_,
+                    "body": body,
+                    "status": "queued",
+                },
+            )
+        finally:
+            stats.in_flight -= 1
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    app = create_fake_twilio_app(args.latency_ms, args.jitter_ms, args.error_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
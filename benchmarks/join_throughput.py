@@ -0,0 +1,141 @@
+"""Stress concurrent joins and measure join throughput.
+
+Serves the app with uvicorn on a local port, against a fresh SQLite database
+in a temporary directory, and fires ``--joins`` joins at one queue with
+``--concurrency`` requests in flight at a time. Afterwards it checks that the
+positions handed out are unique and contiguous and that the queue counters
+agree with the entries, and prints joins per second::
+
+    python -m benchmarks.join_throughput --joins 5000 --concurrency 1 16 64
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+
+# The app reads its settings at import time
+_DB_DIR = tempfile.mkdtemp(prefix="queue-join-benchmark-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'benchmark.db')}"
+os.environ.setdefault("DEBUG", "false")
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from sqlalchemy import create_engine, func, select  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.models.queue import Queue, QueueEntry  # noqa: E402
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def start_app() -> tuple[uvicorn.Server, str]:
+    """Run the app in a background thread and return its base URL."""
+    port = _free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def create_queue(session: Session, name: str) -> int:
+    queue = Queue(name=name, business_name=name)
+    session.add(queue)
+    session.commit()
+    return int(queue.id)
+
+
+async def run_joins(base_url: str, queue_id: int, joins: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def join(client: httpx.AsyncClient, i: int) -> None:
+        nonlocal failures
+        async with semaphore:
+            response = await client.post(
+                "/api/entries/join",
+                json={
+                    "queue_id": queue_id,
+                    "customer_name": f"Customer {i}",
+                    "phone_number": f"+1555{i:07d}",
+                },
+            )
+        if response.status_code != 200:
+            failures += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=60.0
+    ) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(join(client, i) for i in range(joins)))
+        elapsed = time.perf_counter() - started
+    return elapsed, failures
+
+
+def check_queue(session: Session, queue_id: int, joins: int) -> list[str]:
+    """Describe everything wrong with the queue's positions and counters."""
+    problems = []
+    positions = session.scalars(
+        select(QueueEntry.position)
+        .where(QueueEntry.queue_id == queue_id)
+        .order_by(QueueEntry.position)
+    ).all()
+    if len(set(positions)) != len(positions):
+        problems.append(f"{len(positions) - len(set(positions))} duplicate positions")
+    if positions != list(range(1, len(positions) + 1)):
+        problems.append("positions have gaps")
+    if len(positions) != joins:
+        problems.append(f"{len(positions)} entries for {joins} joins")
+    queue = session.get(Queue, queue_id)
+    waiting = session.scalar(
+        select(func.count()).where(QueueEntry.queue_id == queue_id)
+    )
+    if queue is None or queue.waiting_count != waiting:
+        problems.append("waiting_count does not match the entries")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent join throughput")
+    parser.add_argument("--joins", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    args = parser.parse_args()
+
+    server, base_url = start_app()
+    engine = create_engine(os.environ["DATABASE_URL"])
+    try:
+        for concurrency in args.concurrency:
+            with Session(engine) as session:
+                queue_id = create_queue(session, f"benchmark-{concurrency}")
+            elapsed, failures = asyncio.run(
+                run_joins(base_url, queue_id, args.joins, concurrency)
+            )
+            with Session(engine) as session:
+                problems = check_queue(session, queue_id, args.joins - failures)
+            print(
+                f"concurrency={concurrency:<4} joins={args.joins:<6} "
+                f"elapsed={elapsed:7.2f}s throughput={args.joins / elapsed:8.1f} "
+                f"joins/s failed={failures} "
+                f"check={'ok' if not problems else '; '.join(problems)}"
+            )
+    finally:
+        server.should_exit = True
+        engine.dispose()
+        shutil.rmtree(_DB_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
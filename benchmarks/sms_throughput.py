@@ -0,0 +1,88 @@
+"""Measure SMS send throughput against the fake Twilio server.
+
+Starts ``benchmarks.fake_twilio`` on a local port and sends the same batch
+through ``AsyncTwilioSMSProvider`` at several concurrency limits, printing
+messages per second and error counts for each run::
+
+    python -m benchmarks.sms_throughput --messages 500 --latency-ms 150 \\
+        --concurrency 1 10 50
+"""
+
+import argparse
+import asyncio
+import socket
+import threading
+import time
+
+import uvicorn
+
+from app.services.sms import AsyncTwilioSMSProvider
+from benchmarks.fake_twilio import create_fake_twilio_app
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def start_fake_twilio(
+    latency_ms: float, jitter_ms: float, error_rate: float
+) -> tuple[uvicorn.Server, str]:
+    """Run the fake server in a background thread and return its base URL."""
+    port = _free_port()
+    app = create_fake_twilio_app(latency_ms, jitter_ms, error_rate)
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def run_batch(base_url: str, messages: int, concurrency: int) -> None:
+    provider = AsyncTwilioSMSProvider(
+        "ACbenchmark",
+        "token",
+        "+15550000000",
+        base_url=base_url,
+        max_concurrency=concurrency,
+    )
+    batch = [(f"+1555{i:07d}", f"Benchmark message {i}") for i in range(messages)]
+    try:
+        started = time.perf_counter()
+        results = await provider.send_batch(batch)
+        elapsed = time.perf_counter() - started
+    finally:
+        await provider.aclose()
+
+    failed = sum(1 for result in results if not result["success"])
+    print(
+        f"concurrency={concurrency:<4} messages={messages:<6} "
+        f"elapsed={elapsed:7.2f}s throughput={messages / elapsed:8.1f} msg/s "
+        f"failed={failed}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SMS provider throughput")
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    args = parser.parse_args()
+
+    server, base_url = start_fake_twilio(
+        args.latency_ms, args.jitter_ms, args.error_rate
+    )
+    try:
+        for concurrency in args.concurrency:
+            asyncio.run(run_batch(base_url, args.messages, concurrency))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
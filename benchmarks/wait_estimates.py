@@ -0,0 +1,214 @@
+"""Backtest wait estimates against historic entries.
+
+Replays each queue's serves through the wait estimator's statistics, then
+scores, for every finished entry, the wait each statistic would have
+estimated when the entry joined against the wait the customer really had:
+from joining until being called, or served if never called. Reads the
+database at ``--database-url`` (the app's by default), or with ``--simulate``
+a synthetic history of busy days at a two-counter shop::
+
+    python -m benchmarks.wait_estimates
+    python -m benchmarks.wait_estimates --simulate 20000
+
+Scoring works on whole columns at a time: the entries ahead at each join and
+the statistic in force come from binary searches over the sorted join, serve
+and statistic series, so only the replay of the serves runs entry by entry.
+"""
+
+import argparse
+import heapq
+import math
+import random
+import statistics
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from sqlalchemy import create_engine, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.queue import Queue, QueueEntry
+from app.services.wait_estimator import STATISTICS, ServiceTimes, WaitEstimator
+
+
+class HistoricEntry(NamedTuple):
+    queue_id: int
+    joined_at: datetime
+    called_at: Optional[datetime]
+    served_at: Optional[datetime]
+    party_size: int
+    # The queue's static estimated_wait_minutes
+    static_minutes: int
+
+
+def load_history(database_url: str) -> list[HistoricEntry]:
+    engine = create_engine(database_url)
+    with Session(engine) as session:
+        rows = session.execute(
+            select(
+                QueueEntry.queue_id,
+                QueueEntry.joined_at,
+                QueueEntry.called_at,
+                QueueEntry.served_at,
+                QueueEntry.party_size,
+                Queue.estimated_wait_minutes,
+            )
+            .join(QueueEntry.queue)
+            .where(
+                QueueEntry.joined_at.is_not(None),
+                or_(
+                    QueueEntry.called_at.is_not(None), QueueEntry.served_at.is_not(None)
+                ),
+            )
+        ).all()
+    engine.dispose()
+    return [
+        HistoricEntry(
+            queue_id, joined_at, called_at, served_at, party_size or 1, static or 0
+        )
+        for queue_id, joined_at, called_at, served_at, party_size, static in rows
+    ]
+
+
+def simulate(entries: int, seed: int, counters: int = 2) -> list[HistoricEntry]:
+    """Days from 9:00 to 19:00 with a lunchtime rush, served first come first."""
+    rng = random.Random(seed)
+    history = []
+    day = datetime(2026, 1, 5, 9, 0)
+    while len(history) < entries:
+        now = day
+        free_at = [now] * counters
+        while now < day + timedelta(hours=10) and len(history) < entries:
+            rush = 2 <= (now - day).total_seconds() / 3600 < 5
+            now += timedelta(minutes=rng.expovariate(1 / (1.5 if rush else 4.0)))
+            party_size = rng.choices([1, 2, 3, 4, 6], [50, 25, 12, 10, 3])[0]
+            service = rng.lognormvariate(math.log(3.0), 0.5) * math.sqrt(party_size)
+            called_at = max(now, heapq.heappop(free_at))
+            served_at = called_at + timedelta(minutes=service)
+            heapq.heappush(free_at, served_at)
+            history.append(HistoricEntry(1, now, called_at, served_at, party_size, 5))
+        day += timedelta(days=1)
+    return history
+
+
+def _minutes(delta: timedelta) -> float:
+    return delta.total_seconds() / 60
+
+
+def backtest_queue(
+    entries: Sequence[HistoricEntry], estimator: WaitEstimator
+) -> dict[str, list[float]]:
+    """Estimate minus actual wait, in minutes, of each entry per statistic."""
+    served = sorted(
+        (entry for entry in entries if entry.served_at is not None),
+        key=lambda entry: entry.served_at or entry.joined_at,
+    )
+
+    # The replay: each statistic as it stood after each serve
+    times: ServiceTimes = estimator.service_times()
+    series: dict[str, list[Optional[float]]] = defaultdict(list)
+    for entry in served:
+        assert entry.served_at is not None
+        times.observe(entry.joined_at, entry.served_at, entry.party_size)
+        for name in STATISTICS:
+            learned = times.count >= estimator.min_samples
+            series[name].append(times.statistic(name) if learned else None)
+
+    # Columns of the entries being scored
+    joined = [entry.joined_at for entry in entries]
+    actual = [
+        _minutes(
+            (entry.called_at or entry.served_at or entry.joined_at) - entry.joined_at
+        )
+        for entry in entries
+    ]
+    static = [float(entry.static_minutes) for entry in entries]
+    # Waiting and called entries at each join: those that joined before it and
+    # hadn't been served yet
+    join_order = sorted(joined)
+    serve_order = [entry.served_at for entry in served]
+    ahead = [bisect_left(join_order, t) - bisect_right(serve_order, t) for t in joined]
+    serves_before = [bisect_right(serve_order, t) for t in joined]
+
+    errors = {}
+    for name in STATISTICS:
+        values = series[name]
+        per_entry = [
+            value if value is not None else fallback
+            for value, fallback in zip(
+                (values[k - 1] if k else None for k in serves_before), static
+            )
+        ]
+        errors[name] = [
+            round(a * minutes) - wait
+            for a, minutes, wait in zip(ahead, per_entry, actual)
+        ]
+    return errors
+
+
+def backtest(
+    history: Sequence[HistoricEntry], estimator: WaitEstimator
+) -> dict[str, list[float]]:
+    by_queue: defaultdict[int, list[HistoricEntry]] = defaultdict(list)
+    for entry in history:
+        by_queue[entry.queue_id].append(entry)
+    errors: defaultdict[str, list[float]] = defaultdict(list)
+    for entries in by_queue.values():
+        for name, queue_errors in backtest_queue(entries, estimator).items():
+            errors[name].extend(queue_errors)
+    return errors
+
+
+def report(errors: dict[str, list[float]], configured: str) -> None:
+    print(
+        f"{'statistic':<10} {'entries':>8} {'MAE':>8} {'bias':>8} "
+        f"{'p90 |err|':>10} {'within 5':>9}"
+    )
+    for name, values in errors.items():
+        if not values:
+            continue
+        absolute = sorted(abs(value) for value in values)
+        p90 = absolute[min(int(0.9 * len(absolute)), len(absolute) - 1)]
+        within = sum(value <= 5 for value in absolute) / len(absolute)
+        marker = " (configured)" if name == configured else ""
+        print(
+            f"{name:<10} {len(values):>8} {statistics.fmean(absolute):>8.2f} "
+            f"{statistics.fmean(values):>8.2f} {p90:>10.2f} {within:>9.1%}{marker}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backtest wait estimates")
+    parser.add_argument("--database-url", default=settings.database_url)
+    parser.add_argument("--simulate", type=int, metavar="ENTRIES")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--alpha", type=float, default=settings.wait_estimate_alpha)
+    parser.add_argument("--window", type=int, default=settings.wait_estimate_window)
+    parser.add_argument(
+        "--min-samples", type=int, default=settings.wait_estimate_min_samples
+    )
+    args = parser.parse_args()
+
+    estimator = WaitEstimator(
+        max_queues=0,
+        statistic=settings.wait_estimate_statistic,
+        alpha=args.alpha,
+        window=args.window,
+        min_samples=args.min_samples,
+        max_sample_minutes=settings.wait_estimate_max_sample_minutes,
+    )
+    if args.simulate:
+        history = simulate(args.simulate, args.seed)
+    else:
+        history = load_history(args.database_url)
+    if not history:
+        print("No finished entries to backtest")
+        return
+    report(backtest(history, estimator), estimator.statistic)
+
+
+if __name__ == "__main__":
+    main()
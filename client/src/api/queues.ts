@@ -1,5 +1,5 @@
-import apiClient from './client';
-import type { Queue, QueueEntry, QueueEntryCreate } from '../types';
+import apiClient, { API_BASE_URL } from './client';
+import type { Queue, QueueEntry, QueueEntryCreate, QueueEntryUpdate } from '../types';
 
 export const queuesApi = {
   // List all active queues
@@ -32,6 +32,18 @@ export const queuesApi = {
     return response.data;
   },
 
+  // Stream entry status updates; close the returned EventSource to stop
+  subscribeToEntry: (
+    entryId: number,
+    onUpdate: (update: QueueEntryUpdate) => void
+  ): EventSource => {
+    const events = new EventSource(`${API_BASE_URL}/entries/${entryId}/events`);
+    events.addEventListener('entry', (event) => {
+      onUpdate(JSON.parse((event as MessageEvent).data));
+    });
+    return events;
+  },
+
   // Cancel entry
   cancelEntry: async (entryId: number): Promise<QueueEntry> => {
     const response = await apiClient.patch<QueueEntry>(`/entries/${entryId}/cancel`);
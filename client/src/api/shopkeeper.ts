@@ -1,6 +1,18 @@
-import apiClient from './client';
+import apiClient, { API_BASE_URL } from './client';
 import type { Queue, QueueEntry } from '../types';
 
+// Messages sent over WS /api/queues/{id}/ws
+export type QueueUpdateMessage =
+  | { type: 'snapshot'; version: number; queue: Queue; entries: QueueEntry[] }
+  | {
+      type: 'entry_joined' | 'entry_called' | 'entry_served' | 'entry_cancelled';
+      version: number;
+      entry: QueueEntry;
+    }
+  | { type: 'queue_updated'; queue: Queue }
+  | { type: 'queue_deleted' }
+  | { type: 'ping' };
+
 export interface CreateQueueData {
   name: string;
   business_name: string;
@@ -22,7 +34,11 @@ export const shopkeeperApi = {
   // Get queues I manage - workaround: get all queues and filter by admin status
   getMyQueues: async (): Promise<Queue[]> => {
     // For now, get all queues - in a real implementation, backend should filter
-    const response = await apiClient.get<Queue[]>('/queues/');
+    // Revalidate: the listing may be cached for a few seconds, but the
+    // dashboard reloads it right after its own changes
+    const response = await apiClient.get<Queue[]>('/queues/', {
+      headers: { 'Cache-Control': 'no-cache' },
+    });
     return response.data;
   },
 
@@ -49,19 +65,24 @@ export const shopkeeperApi = {
     return response.data;
   },
 
-  // Call next customer - workaround: find first waiting entry and call it
-  callNext: async (queueId: number): Promise<QueueEntry | null> => {
-    const entries = await apiClient.get<QueueEntry[]>(`/entries/queue/${queueId}`);
-    const waitingEntries = entries.data.filter(e => e.status === 'waiting');
-    
-    if (waitingEntries.length === 0) {
-      return null;
-    }
+  // Follow a queue's entries and status; close the returned socket to stop
+  subscribeToQueue: (
+    queueId: number,
+    onMessage: (message: QueueUpdateMessage) => void
+  ): WebSocket => {
+    const token = encodeURIComponent(localStorage.getItem('auth_token') ?? '');
+    const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+    const socket = new WebSocket(
+      `${protocol}://${window.location.host}${API_BASE_URL}/queues/${queueId}/ws?token=${token}`
+    );
+    socket.onmessage = (event) => onMessage(JSON.parse(event.data));
+    return socket;
+  },
 
-    // Call the first waiting entry
-    const firstWaiting = waitingEntries.sort((a, b) => a.position - b.position)[0];
-    const response = await apiClient.patch<QueueEntry>(`/entries/${firstWaiting.id}/call`);
-    return response.data;
+  // Call the next waiting customer; null if nobody is waiting
+  callNext: async (queueId: number): Promise<QueueEntry | null> => {
+    const response = await apiClient.post<QueueEntry[]>(`/queues/${queueId}/call-next`);
+    return response.data[0] ?? null;
   },
 
   // Mark customer as served
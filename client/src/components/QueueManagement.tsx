@@ -27,17 +27,40 @@ export const QueueManagement: React.FC<QueueManagementProps> = ({
 
   useEffect(() => {
     setQueue(initialQueue);
-    loadEntries();
   }, [initialQueue]);
 
-  const loadEntries = async () => {
-    try {
-      const entriesData = await shopkeeperApi.getQueueEntries(initialQueue.id);
-      setEntries(entriesData);
-    } catch (error) {
-      console.error('Failed to load entries:', error);
-    }
-  };
+  // Keyed on the id, so the socket stays open when the parent reloads its
+  // queue list after a local edit
+  useEffect(() => {
+    // The server sends a snapshot, then one message per change to the queue
+    const socket = shopkeeperApi.subscribeToQueue(initialQueue.id, (message) => {
+      switch (message.type) {
+        case 'snapshot':
+          setQueue(message.queue);
+          setEntries(message.entries);
+          break;
+        case 'entry_joined':
+        case 'entry_called':
+          setEntries((current) =>
+            [...current.filter((e) => e.id !== message.entry.id), message.entry].sort(
+              (a, b) => a.position - b.position
+            )
+          );
+          break;
+        case 'entry_served':
+        case 'entry_cancelled':
+          setEntries((current) => current.filter((e) => e.id !== message.entry.id));
+          break;
+        case 'queue_updated':
+          setQueue(message.queue);
+          break;
+        case 'queue_deleted':
+          onQueueUpdate();
+          break;
+      }
+    });
+    return () => socket.close();
+  }, [initialQueue.id]);
 
   const handleStatusChange = async (newStatus: 'active' | 'paused' | 'closed') => {
     setLoading(true);
@@ -56,7 +79,6 @@ export const QueueManagement: React.FC<QueueManagementProps> = ({
     setLoading(true);
     try {
       await shopkeeperApi.callNext(queue.id);
-      await loadEntries();
       onQueueUpdate();
     } catch (error: any) {
       alert(error.response?.data?.detail || 'Failed to call next customer');
@@ -68,7 +90,6 @@ export const QueueManagement: React.FC<QueueManagementProps> = ({
   const handleMarkServed = async (entryId: number) => {
     try {
       await shopkeeperApi.markServed(entryId);
-      await loadEntries();
       onQueueUpdate();
     } catch (error: any) {
       alert(error.response?.data?.detail || 'Failed to mark as served');
@@ -80,7 +101,6 @@ export const QueueManagement: React.FC<QueueManagementProps> = ({
     
     try {
       await shopkeeperApi.cancelEntry(entryId);
-      await loadEntries();
       onQueueUpdate();
     } catch (error: any) {
       alert(error.response?.data?.detail || 'Failed to cancel entry');
@@ -128,7 +148,7 @@ export const QueueManagement: React.FC<QueueManagementProps> = ({
         <div className="flex items-center space-x-6 mt-4 text-sm text-gray-600">
           <div className="flex items-center">
             <UsersIcon className="h-4 w-4 mr-1" />
-            {queue.current_size} in queue
+            {entries.length} in queue
           </div>
           <div className="flex items-center">
             <ClockIcon className="h-4 w-4 mr-1" />
@@ -27,9 +27,11 @@ export const QueueStatus: React.FC = () => {
     };
 
     fetchEntry();
-    // Poll for updates every 30 seconds
-    const interval = setInterval(fetchEntry, 30000);
-    return () => clearInterval(interval);
+    // The server pushes status, position and wait changes as they happen
+    const events = queuesApi.subscribeToEntry(parseInt(entryId), (update) => {
+      setEntry((current) => (current ? { ...current, ...update } : current));
+    });
+    return () => events.close();
   }, [entryId]);
 
   const handleCancel = async () => {
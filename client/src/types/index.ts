@@ -23,6 +23,14 @@ export interface QueueEntry {
   called_at?: string;
   served_at?: string;
   estimated_wait_minutes: number;
+  // Place among waiting and called entries, starting at 1
+  rank?: number;
+}
+
+// Pushed by GET /api/entries/{id}/events
+export interface QueueEntryUpdate
+  extends Pick<QueueEntry, 'id' | 'status' | 'position' | 'estimated_wait_minutes'> {
+  entries_ahead: number;
 }
 
 export interface QueueEntryCreate {
@@ -13,6 +13,7 @@ from app.core.config import settings
 from app.db.base import Base
 from app.models.queue import EntryStatus, Queue, QueueEntry, QueueStatus
 from app.models.user import User
+from app.services.queue_counters import repair_queue_counters
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -182,6 +183,8 @@ def create_dummy_data():
         for entry in all_entries:
             session.add(entry)
 
+        # Entries were inserted directly, so bring the queue counters in line
+        repair_queue_counters(session)
         session.commit()
 
         print("✅ Dummy data created successfully!")
@@ -0,0 +1,115 @@
+"""Initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-06-01 00:00:00
+
+Matches the tables previously created by ``Base.metadata.create_all``.
+Databases created that way are stamped at this revision on first upgrade.
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("phone_number", sa.String(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=True,
+        ),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_id", "users", ["id"], unique=False)
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    op.create_table(
+        "queues",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("business_name", sa.String(), nullable=False),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("address", sa.String(), nullable=True),
+        sa.Column(
+            "status",
+            sa.Enum("ACTIVE", "PAUSED", "CLOSED", name="queuestatus"),
+            nullable=True,
+        ),
+        sa.Column("estimated_wait_minutes", sa.Integer(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=True,
+        ),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("name"),
+    )
+    op.create_index("ix_queues_id", "queues", ["id"], unique=False)
+
+    op.create_table(
+        "queue_admins",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("queue_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["queue_id"], ["queues.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id", "queue_id"),
+    )
+
+    op.create_table(
+        "queue_entries",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("queue_id", sa.Integer(), nullable=False),
+        sa.Column("customer_name", sa.String(), nullable=False),
+        sa.Column("phone_number", sa.String(), nullable=False),
+        sa.Column("party_size", sa.Integer(), nullable=True),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("WAITING", "CALLED", "SERVED", "CANCELLED", name="entrystatus"),
+            nullable=True,
+        ),
+        sa.Column(
+            "joined_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=True,
+        ),
+        sa.Column("called_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("served_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["queue_id"], ["queues.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_queue_entries_id", "queue_entries", ["id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_queue_entries_id", table_name="queue_entries")
+    op.drop_table("queue_entries")
+    op.drop_table("queue_admins")
+    op.drop_index("ix_queues_id", table_name="queues")
+    op.drop_table("queues")
+    op.drop_index("ix_users_username", table_name="users")
+    op.drop_index("ix_users_id", table_name="users")
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_table("users")
@@ -0,0 +1,55 @@
+"""Add denormalized queue counters
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-06-08 00:00:00
+
+Adds next_position, waiting_count and called_count to queues and backfills
+them from the existing entries.
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("queues") as batch_op:
+        batch_op.add_column(
+            sa.Column("next_position", sa.Integer(), server_default="1", nullable=False)
+        )
+        batch_op.add_column(
+            sa.Column("waiting_count", sa.Integer(), server_default="0", nullable=False)
+        )
+        batch_op.add_column(
+            sa.Column("called_count", sa.Integer(), server_default="0", nullable=False)
+        )
+
+    op.execute(
+        """
+        UPDATE queues SET
+            next_position = COALESCE(
+                (SELECT MAX(position) FROM queue_entries
+                 WHERE queue_entries.queue_id = queues.id), 0) + 1,
+            waiting_count = (SELECT COUNT(*) FROM queue_entries
+                WHERE queue_entries.queue_id = queues.id
+                AND queue_entries.status = 'WAITING'),
+            called_count = (SELECT COUNT(*) FROM queue_entries
+                WHERE queue_entries.queue_id = queues.id
+                AND queue_entries.status = 'CALLED')
+        """
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("queues") as batch_op:
+        batch_op.drop_column("called_count")
+        batch_op.drop_column("waiting_count")
+        batch_op.drop_column("next_position")
@@ -0,0 +1,47 @@
+"""Add indexes for the hot entry, queue and admin queries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-06-15 00:00:00
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_queue_entries_queue_id_status_position",
+        "queue_entries",
+        ["queue_id", "status", "position"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_queue_entries_queue_id_position",
+        "queue_entries",
+        ["queue_id", "position"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_queue_admins_queue_id_user_id",
+        "queue_admins",
+        ["queue_id", "user_id"],
+        unique=False,
+    )
+    op.create_index("ix_queues_status_id", "queues", ["status", "id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_queues_status_id", table_name="queues")
+    op.drop_index("ix_queue_admins_queue_id_user_id", table_name="queue_admins")
+    op.drop_index("ix_queue_entries_queue_id_position", table_name="queue_entries")
+    op.drop_index(
+        "ix_queue_entries_queue_id_status_position", table_name="queue_entries"
+    )
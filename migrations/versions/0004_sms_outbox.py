@@ -0,0 +1,57 @@
+"""Add the SMS outbox table
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-06-22 00:00:00
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sms_outbox",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("to_number", sa.String(), nullable=False),
+        sa.Column("body", sa.String(), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("PENDING", "SENDING", "SENT", "DEAD", name="outboxstatus"),
+            nullable=False,
+        ),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("locked_until", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_error", sa.String(), nullable=True),
+        sa.Column("provider_message_id", sa.String(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("(CURRENT_TIMESTAMP)"),
+            nullable=True,
+        ),
+        sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_sms_outbox_id", "sms_outbox", ["id"], unique=False)
+    op.create_index(
+        "ix_sms_outbox_status_next_attempt_at",
+        "sms_outbox",
+        ["status", "next_attempt_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_sms_outbox_status_next_attempt_at", table_name="sms_outbox")
+    op.drop_index("ix_sms_outbox_id", table_name="sms_outbox")
+    op.drop_table("sms_outbox")
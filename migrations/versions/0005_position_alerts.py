@@ -0,0 +1,29 @@
+"""Track position alerts sent to each entry
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-06-29 00:00:00
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("queue_entries") as batch_op:
+        batch_op.add_column(
+            sa.Column("last_notified_threshold", sa.Integer(), nullable=True)
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("queue_entries") as batch_op:
+        batch_op.drop_column("last_notified_threshold")
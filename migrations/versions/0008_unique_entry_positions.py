@@ -0,0 +1,79 @@
+"""Make entry positions unique within a queue
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2025-08-03 00:00:00
+
+Before positions came from the queue counters, concurrent joins could read
+the same maximum and share a position. Such entries are moved back just
+enough to make every position unique, keeping their order, and the queue's
+next_position moves past them, before the index is made unique.
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _renumber_duplicate_positions() -> None:
+    connection = op.get_bind()
+    queue_ids = connection.execute(
+        sa.text(
+            "SELECT DISTINCT queue_id FROM queue_entries "
+            "GROUP BY queue_id, position HAVING COUNT(*) > 1"
+        )
+    ).scalars()
+    for queue_id in list(queue_ids):
+        entries = connection.execute(
+            sa.text(
+                "SELECT id, position FROM queue_entries WHERE queue_id = :queue_id "
+                "ORDER BY position, id"
+            ),
+            {"queue_id": queue_id},
+        ).all()
+        last_position = 0
+        for entry_id, position in entries:
+            new_position = max(position, last_position + 1)
+            if new_position != position:
+                connection.execute(
+                    sa.text(
+                        "UPDATE queue_entries SET position = :position WHERE id = :id"
+                    ),
+                    {"position": new_position, "id": entry_id},
+                )
+            last_position = new_position
+        connection.execute(
+            sa.text(
+                "UPDATE queues SET next_position = MAX(next_position, :next) "
+                "WHERE id = :queue_id"
+            ),
+            {"next": last_position + 1, "queue_id": queue_id},
+        )
+
+
+def upgrade() -> None:
+    _renumber_duplicate_positions()
+    op.drop_index("ix_queue_entries_queue_id_position", table_name="queue_entries")
+    op.create_index(
+        "ix_queue_entries_queue_id_position",
+        "queue_entries",
+        ["queue_id", "position"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_queue_entries_queue_id_position", table_name="queue_entries")
+    op.create_index(
+        "ix_queue_entries_queue_id_position",
+        "queue_entries",
+        ["queue_id", "position"],
+        unique=False,
+    )
@@ -0,0 +1,35 @@
+"""Never reuse the ids of deleted queues
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2025-08-10 00:00:00
+
+SQLite hands out the highest id plus one, so a queue created after the newest
+one was deleted got its id back, and at version 0 could match the ETags the
+deleted queue was served with. AUTOINCREMENT ids only ever go up. SQLite can
+only set it when creating a table, so the table is rebuilt.
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table(
+        "queues", recreate="always", table_kwargs={"sqlite_autoincrement": True}
+    ):
+        pass
+
+
+def downgrade() -> None:
+    with op.batch_alter_table(
+        "queues", recreate="always", table_kwargs={"sqlite_autoincrement": False}
+    ):
+        pass
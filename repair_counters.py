@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Script to recompute the denormalized queue counters from queue_entries.
+
+Run this after importing or editing entries outside the API.
+"""
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.services.queue_counters import repair_queue_counters
+
+
+def repair_counters():
+    """Recompute next_position, waiting_count and called_count for all queues."""
+    engine = create_engine(settings.database_url)
+    SessionLocal = sessionmaker(bind=engine)
+
+    with SessionLocal() as session:
+        repaired = repair_queue_counters(session)
+        session.commit()
+
+    if repaired:
+        print(f"🔧 Repaired counters for {len(repaired)} queue(s): {repaired}")
+    else:
+        print("✅ All queue counters are consistent")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    repair_counters()
@@ -1,38 +1,46 @@
 """Pytest configuration and fixtures."""
 
+import os
+import shutil
+import tempfile
 from collections.abc import Generator
 
-import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session, sessionmaker
-from sqlalchemy.pool import StaticPool
-
-from app.api.dependencies.database import get_db
-from app.core.security import get_password_hash
-from app.db.base import Base
-from app.main import app
-from app.models.queue import Queue
-from app.models.user import User
-
-# Use in-memory SQLite for tests
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
+# The app's async engine and the synchronous fixtures below share one SQLite
+# file, which must be configured before the app is imported.
+_TEST_DB_DIR = tempfile.mkdtemp(prefix="queue-tests-")
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{os.path.join(_TEST_DB_DIR, 'test.db')}"
+os.environ["DATABASE_URL"] = SQLALCHEMY_DATABASE_URL
+# The lowest bcrypt cost, to keep password hashing in fixtures fast
+os.environ["BCRYPT_ROUNDS"] = "4"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import Session, sessionmaker  # noqa: E402
+
+from app.core.security import get_password_hash  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.base import engine as app_engine  # noqa: E402
+from app.db.base import read_engine as app_read_engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.queue import Queue  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.auth_cache import admin_membership_cache, auth_cache  # noqa: E402
+from app.services.rank_index import rank_index  # noqa: E402
+from app.services.response_cache import response_cache  # noqa: E402
+from app.services.wait_estimator import wait_estimator  # noqa: E402
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Synchronous views of the engines the app runs its queries on
+app_sync_engines = [app_engine.sync_engine, app_read_engine.sync_engine]
 
-def override_get_db() -> Generator[Session, None, None]:
-    """Override the get_db dependency for tests."""
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
+
+def pytest_sessionfinish(session, exitstatus):
+    """Remove the temporary test database."""
+    engine.dispose()
+    shutil.rmtree(_TEST_DB_DIR, ignore_errors=True)
 
 
 @pytest.fixture(scope="function")
@@ -43,15 +51,19 @@ def db() -> Generator[Session, None, None]:
     yield db
     db.close()
     Base.metadata.drop_all(bind=engine)
+    # The next test's rows reuse the same ids and versions
+    response_cache.clear()
+    auth_cache.clear()
+    admin_membership_cache.clear()
+    rank_index.clear()
+    wait_estimator.clear()
 
 
 @pytest.fixture(scope="function")
 def client(db: Session) -> Generator[TestClient, None, None]:
-    """Create a test client with database override."""
-    app.dependency_overrides[get_db] = lambda: db
+    """Create a test client against the shared test database."""
     with TestClient(app) as test_client:
         yield test_client
-    app.dependency_overrides.clear()
 
 
 @pytest.fixture
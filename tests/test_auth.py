@@ -1,8 +1,56 @@
 """Tests for authentication endpoints."""
 
+import asyncio
+import threading
+import time
+
+import pytest
 from fastapi.testclient import TestClient
+from jose import jwt
+from passlib.context import CryptContext
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 
+from app.core.config import settings
+from app.core.security import QueueClaims, verify_password
+from app.models.queue import Queue, queue_admins
 from app.models.user import User
+from app.services.auth_cache import (
+    AdminMembershipCache,
+    AuthCache,
+    admin_membership_cache,
+    auth_cache,
+)
+from app.services.broker import event_broker
+from app.services.events import QueueEvent
+from app.services.password_hashing import (
+    PasswordHashExecutor,
+    PasswordHashingBusy,
+    password_hasher,
+)
+from tests.conftest import app_sync_engines
+
+
+def _update_queue(client: TestClient, queue: Queue, headers) -> list[str]:
+    """Update a queue, returning the SQL statements the request ran."""
+    statements: list[str] = []
+
+    def record_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    for app_engine in app_sync_engines:
+        event.listen(app_engine, "before_cursor_execute", record_statement)
+    try:
+        response = client.patch(
+            f"/api/queues/{queue.id}",
+            json={"description": "Updated"},
+            headers=headers,
+        )
+    finally:
+        for app_engine in app_sync_engines:
+            event.remove(app_engine, "before_cursor_execute", record_statement)
+    assert response.status_code == 200
+    return statements
 
 
 class TestRegistration:
@@ -84,6 +132,68 @@ class TestLogin:
         assert response.status_code == 401
         assert "Incorrect username or password" in response.json()["detail"]
 
+    def test_login_rehashes_outdated_hash(
+        self, client: TestClient, db: Session, test_user: User
+    ):
+        """Test a hash made at another cost is replaced on the next login."""
+        old_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5)
+        test_user.hashed_password = old_context.hash("testpass123")
+        db.commit()
+
+        response = client.post(
+            "/api/auth/token",
+            data={"username": test_user.username, "password": "testpass123"},
+        )
+        assert response.status_code == 200
+
+        db.refresh(test_user)
+        rounds = f"${settings.bcrypt_rounds:02d}$"
+        assert str(test_user.hashed_password)[3:7] == rounds
+        assert verify_password("testpass123", str(test_user.hashed_password))
+
+    def test_saturated_hashing_pool_returns_503(
+        self, client: TestClient, test_user: User, monkeypatch
+    ):
+        """Test logins are refused, not queued, once the hashing pool is full."""
+        monkeypatch.setattr(password_hasher, "max_pending", 0)
+        response = client.post(
+            "/api/auth/token",
+            data={"username": test_user.username, "password": "testpass123"},
+        )
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        assert password_hasher.stats.rejected >= 1
+
+
+class TestPasswordHashExecutor:
+    """Test the dedicated password hashing pool."""
+
+    @pytest.mark.asyncio
+    async def test_bounds_pending_calls(self):
+        """Test calls beyond max_pending are rejected and queued ones counted."""
+        hasher = PasswordHashExecutor(max_workers=1, max_pending=2)
+        release = threading.Event()
+        try:
+            first = asyncio.create_task(hasher.run(release.wait, 5))
+            second = asyncio.create_task(hasher.run(lambda: "done"))
+            await asyncio.sleep(0.05)
+
+            assert hasher.queue_depth == 1
+            with pytest.raises(PasswordHashingBusy):
+                await hasher.run(lambda: "rejected")
+
+            release.set()
+            assert await first is True
+            assert await second == "done"
+            stats = hasher.executor_stats()
+            assert stats["completed"] == 2
+            assert stats["rejected"] == 1
+            assert stats["max_queue_depth"] == 1
+            assert stats["queue_depth"] == 0
+        finally:
+            release.set()
+            hasher.shutdown()
+
 
 class TestAuthentication:
     """Test authentication requirements."""
@@ -115,3 +225,150 @@ class TestAuthentication:
             headers=auth_headers,
         )
         assert response.status_code == 200
+
+
+class TestAuthCache:
+    """Test cached token authentication."""
+
+    def test_repeat_requests_skip_user_lookup(
+        self, client: TestClient, test_queue: Queue, admin_auth_headers
+    ):
+        """Test a token seen before is resolved without querying users."""
+        first = _update_queue(client, test_queue, admin_auth_headers)
+        second = _update_queue(client, test_queue, admin_auth_headers)
+
+        assert any("WHERE users.username" in s for s in first)
+        # The admin check still recognises the cached user
+        assert not any("WHERE users.username" in s for s in second)
+        assert auth_cache.stats.hits == 1
+
+    def test_deactivating_a_user_invalidates(
+        self, client: TestClient, db: Session, test_admin: User, admin_auth_headers
+    ):
+        """Test a deactivated user is refused even with a cached token."""
+        headers = admin_auth_headers
+        response = client.post(
+            "/api/queues/",
+            json={"name": "first", "business_name": "First"},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        assert len(auth_cache) == 1
+
+        test_admin.is_active = False
+        db.commit()
+
+        assert len(auth_cache) == 0
+        response = client.post(
+            "/api/queues/",
+            json={"name": "second", "business_name": "Second"},
+            headers=headers,
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Inactive user"
+
+    def test_committed_changes_are_broadcast(
+        self, db: Session, test_user: User, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test other workers hear of a user change once it commits, not before."""
+        published: list[QueueEvent] = []
+        monkeypatch.setattr(event_broker, "publish", published.append)
+
+        test_user.is_active = False
+        db.flush()
+        db.rollback()
+        assert published == []
+
+        test_user.is_active = False
+        db.commit()
+        assert published == [
+            QueueEvent(queue_id=0, type="user_changed", user_id=test_user.id)
+        ]
+
+    def test_entries_never_outlive_the_token(self, test_user: User):
+        """Test an expired token is not cached."""
+        cache = AuthCache(max_entries=10, ttl_seconds=60)
+        cache.set("expired", test_user, time.time() - 1)
+        cache.set("valid", test_user, time.time() + 3600)
+
+        assert cache.get("expired") is None
+        cached = cache.get("valid")
+        assert cached is not None and cached is not test_user
+        assert cached.username == test_user.username
+
+
+class TestQueueClaims:
+    """Test queue claims embedded in access tokens."""
+
+    def test_login_embeds_managed_queues(
+        self, client: TestClient, test_queue: Queue, admin_auth_headers
+    ):
+        """Test the token lists the queues its user manages."""
+        token = admin_auth_headers["Authorization"].removeprefix("Bearer ")
+        payload = jwt.decode(
+            token, settings.secret_key, algorithms=[settings.algorithm]
+        )
+        claims = QueueClaims.from_payload(payload)
+        assert claims is not None
+        assert claims.queue_ids == {test_queue.id}
+        assert claims.version == 0
+        assert claims.expires_at <= payload["exp"]
+
+    def test_claims_skip_admin_lookup(
+        self, client: TestClient, test_queue: Queue, admin_auth_headers
+    ):
+        """Test admin routes authorize from the claims without a query."""
+        statements = _update_queue(client, test_queue, admin_auth_headers)
+        assert not any("queue_admins.user_id =" in s for s in statements)
+
+    def test_expired_claims_fall_back_to_lookup(self, test_queue: Queue):
+        """Test claims are only trusted until they expire, at their version."""
+        claims = QueueClaims(frozenset({test_queue.id}), 1, time.time() + 60)
+        assert claims.grants(test_queue.id, 1)
+        assert not claims.grants(test_queue.id + 1, 1)
+        assert not claims.grants(test_queue.id, 2)
+
+        expired = QueueClaims(frozenset({test_queue.id}), 1, time.time() - 1)
+        assert not expired.grants(test_queue.id, 1)
+
+
+class TestAdminMembership:
+    """Test the queue admin check used when token claims don't apply."""
+
+    def test_check_is_memoized(
+        self,
+        client: TestClient,
+        db: Session,
+        test_queue: Queue,
+        test_user: User,
+        auth_headers: dict[str, str],
+    ):
+        """Test a token without claims for the queue checks membership once."""
+        # Made an admin after logging in, so the token doesn't claim the queue
+        db.execute(
+            queue_admins.insert().values(user_id=test_user.id, queue_id=test_queue.id)
+        )
+        db.commit()
+
+        first = _update_queue(client, test_queue, auth_headers)
+        second = _update_queue(client, test_queue, auth_headers)
+
+        checks = [s for s in first if "EXISTS" in s and "queue_admins" in s]
+        assert len(checks) == 1
+        assert not any("EXISTS" in s for s in second)
+        assert admin_membership_cache.stats.hits == 1
+
+    def test_removal_invalidates(self):
+        """Test invalidation drops a pair, or every pair for a queue."""
+        cache = AdminMembershipCache(max_entries=10, ttl_seconds=60)
+        cache.set(1, 10, True)
+        cache.set(2, 10, True)
+        cache.set(1, 20, False)
+
+        cache.invalidate(1, 10)
+        assert cache.get(1, 10) is None
+        assert cache.get(2, 10) is True
+
+        cache.invalidate_queue(10)
+        assert cache.get(2, 10) is None
+        assert cache.get(1, 20) is False
@@ -0,0 +1,189 @@
+"""Tests for the cross-worker event brokers."""
+
+import asyncio
+import os
+import tempfile
+from collections.abc import AsyncGenerator
+
+import pytest
+import pytest_asyncio
+
+from app.models.queue import EntryStatus
+from app.models.user import User
+from app.services.auth_cache import AdminMembershipCache, AuthCache
+from app.services.broker import InProcessBroker, UnixSocketBroker
+from app.services.events import EventHub, QueueEvent
+
+EVENT = QueueEvent(
+    queue_id=1,
+    type="entry_updated",
+    version=3,
+    entry_id=7,
+    position=2,
+    status=EntryStatus.CALLED,
+    old_status=EntryStatus.WAITING,
+    data={"id": 7, "status": "called"},
+)
+
+
+@pytest_asyncio.fixture
+async def socket_path() -> AsyncGenerator[str, None]:
+    # Unix socket paths are limited to about 100 bytes, so keep this short
+    directory = tempfile.mkdtemp(prefix="qev-")
+    yield os.path.join(directory, "events.sock")
+    for name in os.listdir(directory):
+        os.unlink(os.path.join(directory, name))
+    os.rmdir(directory)
+
+
+async def _start_worker(
+    path: str, max_message_bytes: int = 1024 * 1024
+) -> tuple[UnixSocketBroker, EventHub]:
+    hub = EventHub()
+    broker = UnixSocketBroker(
+        hub, path, reconnect_seconds=0.05, max_message_bytes=max_message_bytes
+    )
+    await broker.start()
+    await broker.wait_connected()
+    return broker, hub
+
+
+@pytest.mark.asyncio
+async def test_in_process_broker_delivers_locally():
+    """Test the single-worker backend publishes straight to the hub."""
+    hub = EventHub()
+    broker = InProcessBroker(hub)
+    with hub.subscribe(1) as subscription:
+        broker.publish(EVENT)
+        assert await subscription.get(timeout=1) == EVENT
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_broker_fans_out_between_workers(socket_path: str):
+    """Test an event published in one worker reaches every other worker once."""
+    workers = [await _start_worker(socket_path) for _ in range(3)]
+    try:
+        assert sum(broker.is_relay for broker, _ in workers) == 1
+        subscriptions = [hub.subscribe(1) for _, hub in workers]
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        workers[2][0].publish(EVENT)
+        received = [await s.get(timeout=1) for s in subscriptions]
+        elapsed = loop.time() - started
+
+        assert received == [EVENT, EVENT, EVENT]
+        assert received[0].status == EntryStatus.CALLED
+        assert elapsed < 0.5
+        # The publisher's own copy isn't echoed back to it
+        assert all([await s.get(timeout=0.05) is None for s in subscriptions])
+    finally:
+        for broker, _ in workers:
+            await broker.stop()
+
+
+@pytest.mark.asyncio
+async def test_another_worker_takes_over_the_relay(socket_path: str):
+    """Test that workers keep exchanging events after the relay's worker exits."""
+    workers = [await _start_worker(socket_path) for _ in range(3)]
+    relay = next(broker for broker, _ in workers if broker.is_relay)
+    survivors = [(broker, hub) for broker, hub in workers if broker is not relay]
+    try:
+        with survivors[1][1].subscribe(1) as subscription:
+            await relay.stop()
+
+            # The survivors reconnect, and their subscribers are told to reload
+            reload = await subscription.get(timeout=2)
+            assert reload is not None and reload.type == "reload"
+            assert subscription.overflowed is True
+            subscription.reset()
+
+            for broker, _ in survivors:
+                await broker.wait_connected()
+            assert sum(broker.is_relay for broker, _ in survivors) == 1
+
+            survivors[0][0].publish(EVENT)
+            assert await subscription.get(timeout=1) == EVENT
+    finally:
+        for broker, _ in workers:
+            await broker.stop()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("relay_limit, worker_limit", [(65536, 1024), (1024, 65536)])
+async def test_oversized_event_reconnects_instead_of_stopping(
+    socket_path: str, relay_limit: int, worker_limit: int
+):
+    """Test a line over the read limit, at either end, only costs a reconnect."""
+    relay, relay_hub = await _start_worker(socket_path, relay_limit)
+    worker, hub = await _start_worker(socket_path, worker_limit)
+    try:
+        assert relay.is_relay
+        with hub.subscribe(1) as subscription:
+            # Too long for the worker to read, or for the relay when it sent it
+            oversized = QueueEvent(
+                queue_id=1, type="queue_updated", data={"x": "x" * 4096}
+            )
+            (relay if relay_limit > worker_limit else worker).publish(oversized)
+
+            event = await subscription.get(timeout=2)
+            if event == oversized:
+                # The publisher's own hub still gets its copy
+                event = await subscription.get(timeout=2)
+            assert event is not None and event.type == "reload"
+            subscription.reset()
+
+            await worker.wait_connected()
+            relay.publish(EVENT)
+            assert await subscription.get(timeout=1) == EVENT
+    finally:
+        await worker.stop()
+        await relay.stop()
+
+
+@pytest.mark.asyncio
+async def test_admin_changes_reach_other_workers_caches(socket_path: str):
+    """Test admin membership caches drop pairs changed in another worker."""
+    workers = [await _start_worker(socket_path) for _ in range(2)]
+    try:
+        cache = AdminMembershipCache(max_entries=10, ttl_seconds=60)
+        cache.set(5, 1, False)
+        cache.set(6, 2, True)
+        workers[1][1].add_listener(cache.apply_event)
+
+        with workers[1][1].subscribe(1) as subscription:
+            workers[0][0].publish(
+                QueueEvent(queue_id=1, type="admins_changed", user_id=5)
+            )
+            workers[0][0].publish(QueueEvent(queue_id=2, type="queue_deleted"))
+            workers[0][0].publish(EVENT)
+            # Events arrive in order, and subscribers never see admin changes
+            assert await subscription.get(timeout=1) == EVENT
+
+        assert cache.get(5, 1) is None
+        assert cache.get(6, 2) is None
+    finally:
+        for broker, _ in workers:
+            await broker.stop()
+
+
+@pytest.mark.asyncio
+async def test_user_changes_reach_other_workers_caches(socket_path: str):
+    """Test cached tokens of a user changed in another worker are dropped."""
+    workers = [await _start_worker(socket_path) for _ in range(2)]
+    try:
+        cache = AuthCache(max_entries=10, ttl_seconds=60)
+        cache.set("token", User(id=5, username="changed"), None)
+        workers[1][1].add_listener(cache.apply_event)
+
+        with workers[1][1].subscribe(1) as subscription:
+            workers[0][0].publish(
+                QueueEvent(queue_id=0, type="user_changed", user_id=5)
+            )
+            workers[0][0].publish(EVENT)
+            assert await subscription.get(timeout=1) == EVENT
+
+        assert cache.get("token") is None
+    finally:
+        for broker, _ in workers:
+            await broker.stop()
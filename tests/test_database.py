@@ -0,0 +1,45 @@
+"""Tests for the database engines and the SQLite tuning profile."""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+
+from app.db.base import engine, read_engine
+
+
+async def _pragma(async_engine: AsyncEngine, name: str):
+    async with async_engine.connect() as connection:
+        return (await connection.execute(text(f"PRAGMA {name}"))).scalar()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("async_engine", [engine, read_engine])
+async def test_sqlite_profile_applied(async_engine: AsyncEngine):
+    """Test every connection gets the configured pragmas."""
+    try:
+        assert await _pragma(async_engine, "journal_mode") == "wal"
+        assert await _pragma(async_engine, "busy_timeout") == 5000
+        assert await _pragma(async_engine, "synchronous") == 1  # NORMAL
+        assert await _pragma(async_engine, "cache_size") == -64 * 1024
+        assert await _pragma(async_engine, "temp_store") == 2  # MEMORY
+    finally:
+        await async_engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_read_engine_rejects_writes(db: Session):
+    """Test the engine behind GET routes cannot write."""
+    try:
+        assert await _pragma(read_engine, "query_only") == 1
+        assert await _pragma(engine, "query_only") == 0
+
+        async with read_engine.connect() as connection:
+            with pytest.raises(OperationalError, match="readonly"):
+                await connection.execute(
+                    text("UPDATE queues SET description = 'x' WHERE id = 0")
+                )
+    finally:
+        await read_engine.dispose()
+        await engine.dispose()
@@ -1,9 +1,28 @@
 """Tests for queue entry endpoints."""
 
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import event, insert
 from sqlalchemy.orm import Session
 
-from app.models.queue import EntryStatus, Queue, QueueEntry, QueueStatus
+from app.core.config import settings
+from app.models.queue import (
+    EntryStatus,
+    Queue,
+    QueueEntry,
+    QueueStatus,
+    queue_admins,
+)
+from app.models.user import User
+from app.services.broker import event_broker
+from app.services.events import QueueEvent
+from app.services.queue_counters import repair_queue_counters
+from app.services.rank_index import rank_index
+from app.services.sms import MockSMSProvider, sms_service
+from tests.conftest import app_sync_engines
 
 
 class TestJoinQueue:
@@ -89,6 +108,145 @@ class TestJoinQueue:
         assert "not accepting new entries" in response.json()["detail"]
 
 
+class TestBulkJoin:
+    """Test joining many customers at once."""
+
+    def test_bulk_join_across_queues(
+        self,
+        client: TestClient,
+        db: Session,
+        test_queue: Queue,
+        test_admin: User,
+        admin_auth_headers: dict[str, str],
+    ):
+        """Test contiguous positions per queue and per-item results in order."""
+        other = Queue(name="other", business_name="Other", estimated_wait_minutes=10)
+        closed = Queue(name="closed", business_name="Closed", status=QueueStatus.CLOSED)
+        db.add_all([other, closed])
+        db.flush()
+        db.execute(
+            insert(queue_admins),
+            [
+                {"user_id": test_admin.id, "queue_id": queue.id}
+                for queue in (other, closed)
+            ],
+        )
+        db.commit()
+        client.post(
+            "/api/entries/join",
+            json={
+                "queue_id": test_queue.id,
+                "customer_name": "Already here",
+                "phone_number": "+1000000000",
+            },
+        ).raise_for_status()
+
+        items = [
+            (test_queue.id, "A"),
+            (other.id, "B"),
+            (999, "Missing"),
+            (test_queue.id, "C"),
+            (closed.id, "Closed"),
+            (other.id, "D"),
+        ]
+        statements: list[str] = []
+
+        def record_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        for app_engine in app_sync_engines:
+            event.listen(app_engine, "before_cursor_execute", record_statement)
+        try:
+            with patch.object(sms_service, "provider", MockSMSProvider()) as provider:
+                response = client.post(
+                    "/api/entries/join/bulk",
+                    json={
+                        "entries": [
+                            {
+                                "queue_id": queue_id,
+                                "customer_name": name,
+                                "phone_number": "+1234567890",
+                            }
+                            for queue_id, name in items
+                        ]
+                    },
+                    headers=admin_auth_headers,
+                )
+                sent = provider.get_sent_messages()
+        finally:
+            for app_engine in app_sync_engines:
+                event.remove(app_engine, "before_cursor_execute", record_statement)
+
+        assert response.status_code == 200
+        results = response.json()
+        assert [r["index"] for r in results] == list(range(6))
+        entries = [r["entry"] for r in results]
+        assert [(e["customer_name"], e["position"]) for e in entries if e] == [
+            ("A", 2),
+            ("B", 1),
+            ("C", 3),
+            ("D", 2),
+        ]
+        assert [e["estimated_wait_minutes"] for e in entries if e] == [5, 0, 10, 10]
+        assert results[2]["error"] == "Queue not found"
+        assert results[4]["error"] == "Queue is not accepting new entries"
+
+        # One counter update per queue and one insert for all the entries
+        entry_inserts = [s for s in statements if "INSERT INTO queue_entries" in s]
+        queue_updates = [s for s in statements if s.startswith("UPDATE queues")]
+        assert len(entry_inserts) == 1
+        assert len(queue_updates) == 2
+        assert len(sent) == 4
+
+        db.expire_all()
+        assert repair_queue_counters(db) == []
+        assert client.get(f"/api/queues/{test_queue.id}").json()["current_size"] == 3
+
+    def test_bulk_join_validates_size(
+        self, client: TestClient, admin_auth_headers: dict[str, str]
+    ):
+        """Test an empty request is rejected."""
+        response = client.post(
+            "/api/entries/join/bulk", json={"entries": []}, headers=admin_auth_headers
+        )
+        assert response.status_code == 422
+
+    def test_bulk_join_requires_admin_of_every_queue(
+        self,
+        client: TestClient,
+        db: Session,
+        test_queue: Queue,
+        admin_auth_headers: dict[str, str],
+    ):
+        """Test a bulk join is refused unless signed in as every queue's admin."""
+        other = Queue(name="other", business_name="Other")
+        db.add(other)
+        db.commit()
+        body = {
+            "entries": [
+                {
+                    "queue_id": queue_id,
+                    "customer_name": "Bulk",
+                    "phone_number": "+1234567890",
+                }
+                for queue_id in (test_queue.id, other.id)
+            ]
+        }
+
+        with patch.object(sms_service, "provider", MockSMSProvider()) as provider:
+            anonymous = client.post("/api/entries/join/bulk", json=body)
+            not_admin = client.post(
+                "/api/entries/join/bulk", json=body, headers=admin_auth_headers
+            )
+            sent = provider.get_sent_messages()
+
+        assert anonymous.status_code == 401
+        assert not_admin.status_code == 403
+        assert sent == []
+        db.refresh(test_queue)
+        assert test_queue.waiting_count == 0
+
+
 class TestListQueueEntries:
     """Test listing queue entries."""
 
@@ -144,6 +302,140 @@ class TestListQueueEntries:
         assert len(data) == 1
         assert data[0]["customer_name"] == "Waiting"
 
+    def _add_entries(
+        self, db: Session, queue: Queue, statuses: list[EntryStatus]
+    ) -> list[QueueEntry]:
+        entries = [
+            QueueEntry(
+                queue_id=queue.id,
+                customer_name=f"Customer {i + 1}",
+                phone_number="+1234567890",
+                position=i + 1,
+                status=status,
+            )
+            for i, status in enumerate(statuses)
+        ]
+        db.add_all(entries)
+        db.commit()
+        return entries
+
+    def _pages(self, client: TestClient, url: str, **params) -> list[list[dict]]:
+        pages = []
+        cursor = None
+        while True:
+            response = client.get(
+                url, params={**params, **({"cursor": cursor} if cursor else {})}
+            )
+            assert response.status_code == 200
+            pages.append(response.json())
+            cursor = response.headers.get("x-next-cursor")
+            if cursor is None:
+                return pages
+
+    def test_cursor_pages_carry_absolute_ranks(
+        self, client: TestClient, db: Session, test_queue: Queue
+    ):
+        """Test later pages report ranks and waits for the whole queue."""
+        statuses = [
+            EntryStatus.SERVED,
+            EntryStatus.CALLED,
+            EntryStatus.WAITING,
+            EntryStatus.CANCELLED,
+            EntryStatus.WAITING,
+            EntryStatus.CALLED,
+            EntryStatus.WAITING,
+        ]
+        self._add_entries(db, test_queue, statuses)
+        url = f"/api/entries/queue/{test_queue.id}"
+
+        pages = self._pages(client, url, limit=2)
+        assert [len(page) for page in pages] == [2, 2, 1]
+        entries = [entry for page in pages for entry in page]
+        assert [entry["position"] for entry in entries] == [2, 3, 5, 6, 7]
+        assert [entry["rank"] for entry in entries] == [1, 2, 3, 4, 5]
+        assert [entry["estimated_wait_minutes"] for entry in entries] == [
+            0,
+            5,
+            10,
+            15,
+            20,
+        ]
+
+        # Filtered listings still rank among all waiting and called entries
+        waiting = [
+            entry
+            for page in self._pages(client, url, limit=1, status="waiting")
+            for entry in page
+        ]
+        assert [entry["rank"] for entry in waiting] == [2, 3, 5]
+        served = client.get(url, params={"status": "served"}).json()
+        assert [(e["rank"], e["estimated_wait_minutes"]) for e in served] == [(None, 0)]
+
+    def test_page_is_one_statement(
+        self, client: TestClient, db: Session, test_queue: Queue
+    ):
+        """Test a page and its ranks come from one query after the queue lookup."""
+        entries = self._add_entries(
+            db, test_queue, [EntryStatus.CALLED, EntryStatus.WAITING] * 3
+        )
+        url = f"/api/entries/queue/{test_queue.id}"
+        cursor = client.get(url, params={"limit": 2}).headers["x-next-cursor"]
+        entries[0].status = EntryStatus.SERVED
+        test_queue.version += 1
+        db.commit()
+
+        statements: list[str] = []
+
+        def record_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        for app_engine in app_sync_engines:
+            event.listen(app_engine, "before_cursor_execute", record_statement)
+        try:
+            # A stale cursor and a filter: the hardest case
+            data = client.get(
+                url, params={"limit": 2, "cursor": cursor, "status": "waiting"}
+            ).json()
+        finally:
+            for app_engine in app_sync_engines:
+                event.remove(app_engine, "before_cursor_execute", record_statement)
+
+        assert [(e["position"], e["rank"]) for e in data] == [(4, 3), (6, 5)]
+        assert len(statements) == 2
+
+    def test_stale_cursor_recounts_rank(
+        self, client: TestClient, db: Session, test_queue: Queue
+    ):
+        """Test a cursor from before the queue moved still gives correct ranks."""
+        entries = self._add_entries(db, test_queue, [EntryStatus.WAITING] * 4)
+        url = f"/api/entries/queue/{test_queue.id}"
+        response = client.get(url, params={"limit": 2})
+        cursor = response.headers["x-next-cursor"]
+
+        entries[0].status = EntryStatus.SERVED
+        test_queue.version += 1
+        db.commit()
+
+        data = client.get(url, params={"limit": 2, "cursor": cursor}).json()
+        assert [(e["position"], e["rank"]) for e in data] == [(3, 2), (4, 3)]
+
+    def test_skip_still_reports_absolute_ranks(
+        self, client: TestClient, db: Session, test_queue: Queue
+    ):
+        """Test the deprecated skip parameter no longer restarts ranks at 1."""
+        self._add_entries(db, test_queue, [EntryStatus.WAITING] * 3)
+        data = client.get(
+            f"/api/entries/queue/{test_queue.id}", params={"skip": 2}
+        ).json()
+        assert [(e["rank"], e["estimated_wait_minutes"]) for e in data] == [(3, 10)]
+
+    def test_rejects_bad_cursor(self, client: TestClient, test_queue: Queue):
+        """Test a malformed cursor is a client error."""
+        response = client.get(
+            f"/api/entries/queue/{test_queue.id}", params={"cursor": "e30"}
+        )
+        assert response.status_code == 400
+
 
 class TestGetEntry:
     """Test getting a specific entry."""
@@ -167,6 +459,53 @@ class TestGetEntry:
         assert data["customer_name"] == "John Doe"
         assert data["estimated_wait_minutes"] == 0
 
+    @pytest.mark.parametrize("max_queues", [0, 256])
+    def test_rank_costs_no_extra_statements(
+        self,
+        client: TestClient,
+        db: Session,
+        test_queue: Queue,
+        monkeypatch: pytest.MonkeyPatch,
+        max_queues: int,
+    ):
+        """Test ranks come from the rank index or with the entry itself."""
+        monkeypatch.setattr(rank_index, "max_queues", max_queues)
+        statuses = [EntryStatus.SERVED, EntryStatus.CALLED, EntryStatus.WAITING]
+        entries = [
+            QueueEntry(
+                queue_id=test_queue.id,
+                customer_name=f"Customer {i}",
+                phone_number="+1234567890",
+                position=i + 1,
+                status=status,
+            )
+            for i, status in enumerate(statuses)
+        ]
+        db.add_all(entries)
+        db.commit()
+
+        statements: list[str] = []
+
+        def record_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        for app_engine in app_sync_engines:
+            event.listen(app_engine, "before_cursor_execute", record_statement)
+        try:
+            data = [client.get(f"/api/entries/{entry.id}").json() for entry in entries]
+        finally:
+            for app_engine in app_sync_engines:
+                event.remove(app_engine, "before_cursor_execute", record_statement)
+
+        assert [(e["rank"], e["estimated_wait_minutes"]) for e in data] == [
+            (None, 0),
+            (1, 0),
+            (2, 5),
+        ]
+        # The ETag lookup, then the entry with its rank, plus loading the
+        # queue's rank index once if it is enabled and its service times once
+        assert len(statements) == 2 * len(entries) + (1 if max_queues else 0) + 1
+
     def test_get_nonexistent_entry(self, client: TestClient):
         """Test getting non-existent entry."""
         response = client.get("/api/entries/999")
@@ -248,6 +587,117 @@ class TestCallEntry:
         assert "already" in response.json()["detail"]
 
 
+class TestCallNext:
+    """Test calling the next customers of a queue in one request."""
+
+    def _add_waiting(self, db: Session, queue: Queue, count: int) -> list[int]:
+        entries = [
+            QueueEntry(
+                queue_id=queue.id,
+                customer_name=f"Customer {i}",
+                phone_number=f"+12345678{i:02d}",
+                position=i + 1,
+                status=EntryStatus.WAITING,
+            )
+            for i in range(count)
+        ]
+        db.add_all(entries)
+        queue.waiting_count = count
+        queue.next_position = count + 1
+        db.commit()
+        return [entry.id for entry in entries]
+
+    def test_calls_front_of_queue(
+        self,
+        client: TestClient,
+        db: Session,
+        admin_auth_headers: dict[str, str],
+        test_queue: Queue,
+    ):
+        """Test the first waiting entries are called, in position order."""
+        ids = self._add_waiting(db, test_queue, 5)
+
+        with patch.object(sms_service, "provider", MockSMSProvider()) as provider:
+            response = client.post(
+                f"/api/queues/{test_queue.id}/call-next",
+                params={"count": 3},
+                headers=admin_auth_headers,
+            )
+            sent = provider.get_sent_messages()
+        assert response.status_code == 200
+        data = response.json()
+        assert [entry["id"] for entry in data] == ids[:3]
+        assert all(entry["status"] == "called" for entry in data)
+        assert all(entry["called_at"] is not None for entry in data)
+
+        # Each called customer is texted
+        called_texts = [m["to"] for m in sent if "Your turn is ready" in m["body"]]
+        assert sorted(called_texts) == sorted(entry["phone_number"] for entry in data)
+
+        db.refresh(test_queue)
+        assert (test_queue.waiting_count, test_queue.called_count) == (2, 3)
+
+        # Fewer waiting than asked for
+        response = client.post(
+            f"/api/queues/{test_queue.id}/call-next",
+            params={"count": 5},
+            headers=admin_auth_headers,
+        )
+        assert [entry["id"] for entry in response.json()] == ids[3:]
+        response = client.post(
+            f"/api/queues/{test_queue.id}/call-next", headers=admin_auth_headers
+        )
+        assert response.json() == []
+
+    def test_concurrent_callers_get_different_entries(
+        self,
+        client: TestClient,
+        db: Session,
+        admin_auth_headers: dict[str, str],
+        test_queue: Queue,
+    ):
+        """Test no entry is called twice when admins call at the same time."""
+        ids = self._add_waiting(db, test_queue, 12)
+
+        def call_next(_) -> list[int]:
+            response = client.post(
+                f"/api/queues/{test_queue.id}/call-next",
+                params={"count": 2},
+                headers=admin_auth_headers,
+            )
+            assert response.status_code == 200
+            return [entry["id"] for entry in response.json()]
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            called = [i for batch in pool.map(call_next, range(8)) for i in batch]
+
+        assert sorted(called) == ids
+        db.refresh(test_queue)
+        assert (test_queue.waiting_count, test_queue.called_count) == (0, 12)
+        assert repair_queue_counters(db) == []
+
+    def test_call_next_non_admin(
+        self, client: TestClient, auth_headers: dict[str, str], test_queue: Queue
+    ):
+        """Test only queue admins can call the next customers."""
+        response = client.post(
+            f"/api/queues/{test_queue.id}/call-next", headers=auth_headers
+        )
+        assert response.status_code == 403
+
+    def test_call_next_validates_count(
+        self, client: TestClient, admin_auth_headers: dict[str, str], test_queue: Queue
+    ):
+        """Test count must be between 1 and 50."""
+        for count in (0, 51):
+            response = client.post(
+                f"/api/queues/{test_queue.id}/call-next",
+                params={"count": count},
+                headers=admin_auth_headers,
+            )
+            assert response.status_code == 422
+
+
 class TestServeEntry:
     """Test serving customers."""
 
@@ -315,3 +765,203 @@ class TestCancelEntry:
         response = client.patch(f"/api/entries/{entry.id}/cancel")
         assert response.status_code == 400
         assert "already" in response.json()["detail"]
+
+
+class TestQueueCounters:
+    """Test the denormalized queue counters."""
+
+    def _join(self, client: TestClient, queue: Queue, name: str) -> dict:
+        response = client.post(
+            "/api/entries/join",
+            json={
+                "queue_id": queue.id,
+                "customer_name": name,
+                "phone_number": "+1234567890",
+                "party_size": 1,
+            },
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    def test_counters_follow_entry_lifecycle(
+        self,
+        client: TestClient,
+        db: Session,
+        admin_auth_headers: dict[str, str],
+        test_queue: Queue,
+    ):
+        """Test join, call, serve and cancel keep the counters in step."""
+        first = self._join(client, test_queue, "First")
+        second = self._join(client, test_queue, "Second")
+        third = self._join(client, test_queue, "Third")
+        assert [first["position"], second["position"], third["position"]] == [
+            1,
+            2,
+            3,
+        ]
+        assert third["estimated_wait_minutes"] == 10
+
+        client.patch(f"/api/entries/{first['id']}/call", headers=admin_auth_headers)
+        db.refresh(test_queue)
+        assert (test_queue.waiting_count, test_queue.called_count) == (2, 1)
+
+        client.patch(f"/api/entries/{first['id']}/serve", headers=admin_auth_headers)
+        client.patch(f"/api/entries/{second['id']}/cancel")
+        db.refresh(test_queue)
+        assert (test_queue.waiting_count, test_queue.called_count) == (1, 0)
+        assert test_queue.next_position == 4
+
+        response = client.get(f"/api/queues/{test_queue.id}")
+        assert response.json()["current_size"] == 1
+
+        # Positions are never reused, even after entries leave
+        assert self._join(client, test_queue, "Fourth")["position"] == 4
+
+    def test_join_skips_taken_positions(
+        self,
+        client: TestClient,
+        db: Session,
+        test_queue: Queue,
+        admin_auth_headers: dict[str, str],
+    ):
+        """Test a join retries past positions taken by entries written directly."""
+        for position in (1, 2):
+            db.add(
+                QueueEntry(
+                    queue_id=test_queue.id,
+                    customer_name=f"Imported {position}",
+                    phone_number="+1234567890",
+                    position=position,
+                    status=EntryStatus.WAITING,
+                )
+            )
+        db.commit()
+
+        assert self._join(client, test_queue, "Single")["position"] == 3
+        response = client.post(
+            "/api/entries/join/bulk",
+            json={
+                "entries": [
+                    {
+                        "queue_id": test_queue.id,
+                        "customer_name": "Bulk",
+                        "phone_number": "+1234567890",
+                    }
+                ]
+            },
+            headers=admin_auth_headers,
+        )
+        assert response.json()[0]["entry"]["position"] == 4
+
+        # The failed attempt's counter update was rolled back with it
+        db.refresh(test_queue)
+        assert test_queue.waiting_count == 2
+        assert test_queue.next_position == 5
+
+    def test_join_gives_up_after_bounded_attempts(
+        self, client: TestClient, db: Session, test_queue: Queue
+    ):
+        """Test a join that keeps clashing answers 503 and changes nothing."""
+        db.add(
+            QueueEntry(
+                queue_id=test_queue.id,
+                customer_name="Imported",
+                phone_number="+1234567890",
+                position=1,
+                status=EntryStatus.WAITING,
+            )
+        )
+        db.commit()
+
+        with patch("app.api.routes.entries.resync_next_position") as resync:
+            response = client.post(
+                "/api/entries/join",
+                json={
+                    "queue_id": test_queue.id,
+                    "customer_name": "Customer",
+                    "phone_number": "+1234567890",
+                },
+            )
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        assert resync.call_count == settings.join_max_attempts
+
+        db.refresh(test_queue)
+        assert (test_queue.next_position, test_queue.waiting_count) == (1, 0)
+        assert db.query(QueueEntry).count() == 1
+
+    def test_concurrent_joins_get_unique_contiguous_positions(
+        self, client: TestClient, db: Session, test_queue: Queue
+    ):
+        """Test parallel joins never share a position or leave a gap."""
+        joins = 100
+
+        def join(i: int) -> int:
+            return self._join(client, test_queue, f"Customer {i}")["position"]
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            positions = list(pool.map(join, range(joins)))
+
+        assert sorted(positions) == list(range(1, joins + 1))
+        db.refresh(test_queue)
+        assert test_queue.waiting_count == joins
+        assert repair_queue_counters(db) == []
+
+    def test_repair_counters(self, db: Session, test_queue: Queue):
+        """Test counters are recomputed from entries inserted directly."""
+        for i, status in enumerate(
+            [EntryStatus.SERVED, EntryStatus.CALLED, EntryStatus.WAITING]
+        ):
+            db.add(
+                QueueEntry(
+                    queue_id=test_queue.id,
+                    customer_name=f"Customer {i}",
+                    phone_number="+1234567890",
+                    position=i + 1,
+                    status=status,
+                )
+            )
+        db.commit()
+
+        assert repair_queue_counters(db) == [test_queue.id]
+        db.commit()
+        db.refresh(test_queue)
+        assert test_queue.waiting_count == 1
+        assert test_queue.called_count == 1
+        assert test_queue.next_position == 4
+
+        # A second pass finds nothing to fix
+        assert repair_queue_counters(db) == []
+
+    def test_repair_bumps_version_and_announces_it(
+        self, db: Session, test_queue: Queue, monkeypatch: pytest.MonkeyPatch
+    ):
+        """Test a repair raises the queue's version and is broadcast once committed."""
+        published: list[QueueEvent] = []
+        monkeypatch.setattr(event_broker, "publish", published.append)
+        version = test_queue.version
+        db.add(
+            QueueEntry(
+                queue_id=test_queue.id,
+                customer_name="Customer",
+                phone_number="+1234567890",
+                position=1,
+                status=EntryStatus.WAITING,
+            )
+        )
+        db.commit()
+
+        assert repair_queue_counters(db) == [test_queue.id]
+        db.rollback()
+        assert published == []
+
+        assert repair_queue_counters(db) == [test_queue.id]
+        db.commit()
+        db.refresh(test_queue)
+        assert test_queue.version == version + 1
+        assert published == [
+            QueueEvent(
+                queue_id=test_queue.id, type="queue_updated", version=version + 1
+            )
+        ]
+        assert published[0].requires_reload
@@ -0,0 +1,378 @@
+"""Tests for queue events and the entry status stream."""
+
+import asyncio
+import json
+from collections.abc import AsyncGenerator
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.security import create_access_token
+from app.db.base import engine, read_engine
+from app.main import app
+from app.models.queue import EntryStatus, Queue, QueueEntry
+from app.models.user import User
+from app.services.events import EntryTracker, EventHub, QueueEvent
+
+
+def _entry_event(
+    version: int,
+    entry_id: int,
+    position: int,
+    status: EntryStatus,
+    old_status: EntryStatus,
+) -> QueueEvent:
+    return QueueEvent(
+        queue_id=1,
+        type="entry_updated",
+        version=version,
+        entry_id=entry_id,
+        position=position,
+        status=status,
+        old_status=old_status,
+    )
+
+
+def _tracker(**values: Any) -> EntryTracker:
+    fields: dict[str, Any] = {
+        "entry_id": 10,
+        "status": EntryStatus.WAITING,
+        "position": 5,
+        "entries_ahead": 3,
+        "wait_minutes_per_entry": 5,
+        "version": 7,
+    }
+    fields.update(values)
+    return EntryTracker(**fields)
+
+
+class TestEntryTracker:
+    """Test applying queue events to a snapshot of an entry."""
+
+    def test_entry_ahead_leaving_moves_entry_up(self):
+        """Test that serving an entry ahead reduces the wait."""
+        tracker = _tracker()
+
+        changed = tracker.apply(
+            _entry_event(8, 1, 2, EntryStatus.SERVED, EntryStatus.CALLED)
+        )
+
+        assert changed is True
+        assert tracker.entries_ahead == 2
+        assert tracker.estimated_wait_minutes == 10
+
+    def test_events_in_snapshot_are_ignored(self):
+        """Test that events at or below the snapshot version change nothing."""
+        tracker = _tracker()
+
+        changed = tracker.apply(
+            _entry_event(7, 1, 2, EntryStatus.SERVED, EntryStatus.CALLED)
+        )
+
+        assert changed is False
+        assert tracker.entries_ahead == 3
+
+    def test_changes_that_do_not_move_the_line(self):
+        """Test that calls, entries behind and late joins don't change the rank."""
+        tracker = _tracker()
+
+        assert not tracker.apply(
+            _entry_event(8, 1, 2, EntryStatus.CALLED, EntryStatus.WAITING)
+        )
+        assert not tracker.apply(
+            _entry_event(9, 2, 8, EntryStatus.CANCELLED, EntryStatus.WAITING)
+        )
+        assert not tracker.apply(
+            QueueEvent(1, "entry_joined", 10, 3, 9, EntryStatus.WAITING)
+        )
+        assert tracker.entries_ahead == 3
+
+    def test_own_status_ignores_out_of_order_events(self):
+        """Test that a late event can't roll the entry's status back."""
+        tracker = _tracker()
+
+        tracker.apply(_entry_event(9, 10, 5, EntryStatus.SERVED, EntryStatus.CALLED))
+        tracker.apply(_entry_event(8, 10, 5, EntryStatus.CALLED, EntryStatus.WAITING))
+
+        assert tracker.status == EntryStatus.SERVED
+        assert tracker.finished is True
+        assert tracker.estimated_wait_minutes == 0
+
+    def test_queue_update_changes_estimate(self):
+        """Test that a new per-entry estimate is applied."""
+        tracker = _tracker()
+
+        assert tracker.apply(
+            QueueEvent(queue_id=1, type="queue_updated", estimated_wait_minutes=2)
+        )
+        assert tracker.estimated_wait_minutes == 6
+
+    def test_learned_minutes_override_the_queue_setting(self):
+        """Test waits follow learned minutes, and queue updates then don't."""
+        tracker = _tracker()
+
+        assert tracker.set_learned_minutes(2.4)
+        assert tracker.estimated_wait_minutes == 7
+        assert not tracker.apply(
+            QueueEvent(queue_id=1, type="queue_updated", estimated_wait_minutes=2)
+        )
+        assert tracker.set_learned_minutes(None)
+        assert tracker.estimated_wait_minutes == 6
+
+
+class TestEventHub:
+    """Test fanning events out to subscribers."""
+
+    @pytest.mark.asyncio
+    async def test_publish_reaches_only_that_queues_subscribers(self):
+        """Test that subscribers only see events for their queue."""
+        hub = EventHub()
+        with hub.subscribe(1) as first, hub.subscribe(2) as second:
+            hub.publish(QueueEvent(queue_id=1, type="queue_deleted"))
+
+            assert (await first.get(timeout=1)) is not None
+            assert (await second.get(timeout=0.01)) is None
+
+        assert hub.subscriber_count() == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_overflows_instead_of_blocking(self):
+        """Test that a full buffer marks the subscriber for a reload."""
+        hub = EventHub(max_pending=2)
+        with hub.subscribe(1) as subscription:
+            for _ in range(3):
+                hub.publish(QueueEvent(queue_id=1, type="queue_deleted"))
+
+            assert subscription.overflowed is True
+            subscription.reset()
+            assert subscription.overflowed is False
+            assert (await subscription.get(timeout=0.01)) is None
+
+    @pytest.mark.asyncio
+    async def test_repaired_queue_marks_subscribers_for_reload(self):
+        """Test a queue update without data makes its subscribers reload."""
+        hub = EventHub()
+        with hub.subscribe(1) as repaired, hub.subscribe(2) as other:
+            hub.publish(QueueEvent(queue_id=1, type="queue_updated", version=3))
+
+            assert repaired.overflowed is True
+            assert other.overflowed is False
+
+
+class SSEStream:
+    """Drives an SSE endpoint directly over ASGI and parses its events."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.status: int = 0
+        self._chunks: asyncio.Queue[bytes] = asyncio.Queue()
+        self._buffer = ""
+        self._disconnected = asyncio.Event()
+        self._task: asyncio.Task
+
+    async def __aenter__(self) -> "SSEStream":
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": self.path,
+            "raw_path": self.path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"host", b"test")],
+            "server": ("test", 80),
+            "client": ("test", 1234),
+        }
+        started = asyncio.Event()
+
+        async def receive() -> dict[str, Any]:
+            await self._disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                self.status = message["status"]
+                started.set()
+            elif message["type"] == "http.response.body":
+                await self._chunks.put(message.get("body", b""))
+                if not message.get("more_body", False):
+                    await self._chunks.put(b"")
+
+        self._task = asyncio.create_task(app(scope, receive, send))
+        await asyncio.wait_for(started.wait(), timeout=5)
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self._disconnected.set()
+        await asyncio.wait_for(self._task, timeout=5)
+
+    async def next_event(self) -> dict[str, Any]:
+        """Return the next event's data, skipping comments and retry hints."""
+        while True:
+            if "\n\n" in self._buffer:
+                message, self._buffer = self._buffer.split("\n\n", 1)
+                for line in message.splitlines():
+                    if line.startswith("data: "):
+                        return json.loads(line[len("data: ") :])
+                continue
+            chunk = await asyncio.wait_for(self._chunks.get(), timeout=5)
+            if not chunk:
+                raise EOFError("stream closed")
+            self._buffer += chunk.decode()
+
+    async def closed(self) -> bool:
+        chunk = await asyncio.wait_for(self._chunks.get(), timeout=5)
+        return chunk == b""
+
+
+@pytest_asyncio.fixture
+async def api(db: Session) -> AsyncGenerator[httpx.AsyncClient, None]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+    # Connections are bound to this test's event loop
+    await engine.dispose()
+    await read_engine.dispose()
+
+
+class TestEntryEventStream:
+    """Test GET /api/entries/{id}/events."""
+
+    @pytest.mark.asyncio
+    async def test_stream_follows_queue_changes(
+        self, api: httpx.AsyncClient, test_queue: Queue, test_admin: User
+    ):
+        """Test that position and status are pushed as the queue moves."""
+        token = create_access_token({"sub": test_admin.username})
+        headers = {"Authorization": f"Bearer {token}"}
+        ids = []
+        for name in ["First", "Second", "Third"]:
+            response = await api.post(
+                "/api/entries/join",
+                json={
+                    "queue_id": test_queue.id,
+                    "customer_name": name,
+                    "phone_number": "+1234567890",
+                },
+            )
+            ids.append(response.json()["id"])
+
+        async with SSEStream(f"/api/entries/{ids[2]}/events") as stream:
+            assert stream.status == 200
+            first = await stream.next_event()
+            assert first["status"] == "waiting"
+            assert first["entries_ahead"] == 2
+            assert first["estimated_wait_minutes"] == 10
+
+            # Calling keeps the first entry active; serving it moves us up
+            await api.patch(f"/api/entries/{ids[0]}/call", headers=headers)
+            await api.patch(f"/api/entries/{ids[0]}/serve", headers=headers)
+            assert (await stream.next_event())["entries_ahead"] == 1
+
+            await api.patch(f"/api/entries/{ids[1]}/cancel")
+            assert (await stream.next_event())["entries_ahead"] == 0
+
+            await api.patch(f"/api/entries/{ids[2]}/call", headers=headers)
+            assert (await stream.next_event())["status"] == "called"
+
+            await api.patch(f"/api/entries/{ids[2]}/serve", headers=headers)
+            last = await stream.next_event()
+            assert last["status"] == "served"
+            assert last["estimated_wait_minutes"] == 0
+            assert await stream.closed()
+
+    @pytest.mark.asyncio
+    async def test_stream_does_not_poll_the_database(
+        self, api: httpx.AsyncClient, db: Session, test_queue: Queue
+    ):
+        """Test that an idle stream runs no queries after its snapshot."""
+        entry = QueueEntry(
+            queue_id=test_queue.id,
+            customer_name="Idle",
+            phone_number="+1234567890",
+            position=1,
+            status=EntryStatus.WAITING,
+        )
+        db.add(entry)
+        db.commit()
+
+        statements: list[str] = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        async with SSEStream(f"/api/entries/{entry.id}/events") as stream:
+            await stream.next_event()
+            event.listen(read_engine.sync_engine, "before_cursor_execute", record)
+            try:
+                await asyncio.sleep(0.2)
+            finally:
+                event.remove(read_engine.sync_engine, "before_cursor_execute", record)
+
+        assert statements == []
+
+    @pytest.mark.asyncio
+    async def test_stream_uses_learned_waits(
+        self,
+        api: httpx.AsyncClient,
+        db: Session,
+        test_queue: Queue,
+        test_admin: User,
+    ):
+        """Test the stream agrees with GET, before and after a serve."""
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        # Serves 8 minutes apart, the last one just now
+        db.add_all(
+            QueueEntry(
+                queue_id=test_queue.id,
+                customer_name="Earlier",
+                phone_number="+1234567890",
+                position=i + 1,
+                status=EntryStatus.SERVED,
+                joined_at=now - timedelta(hours=3),
+                served_at=now - timedelta(minutes=8 * (10 - i)),
+            )
+            for i in range(11)
+        )
+        test_queue.next_position = 12
+        db.commit()
+        token = create_access_token({"sub": test_admin.username})
+        headers = {"Authorization": f"Bearer {token}"}
+        ids = []
+        for name in ["First", "Second", "Third"]:
+            response = await api.post(
+                "/api/entries/join",
+                json={
+                    "queue_id": test_queue.id,
+                    "customer_name": name,
+                    "phone_number": "+1234567890",
+                },
+            )
+            ids.append(response.json()["id"])
+
+        async with SSEStream(f"/api/entries/{ids[2]}/events") as stream:
+            first = await stream.next_event()
+            status = (await api.get(f"/api/entries/{ids[2]}")).json()
+            assert first["estimated_wait_minutes"] == 16
+            assert status["estimated_wait_minutes"] == 16
+
+            # Served right away, so the average drops by alpha
+            await api.patch(f"/api/entries/{ids[0]}/call", headers=headers)
+            await api.patch(f"/api/entries/{ids[0]}/serve", headers=headers)
+            served = await stream.next_event()
+            status = (await api.get(f"/api/entries/{ids[2]}")).json()
+            assert served["estimated_wait_minutes"] == round(8 * 0.8)
+            assert status["estimated_wait_minutes"] == round(8 * 0.8)
+
+    @pytest.mark.asyncio
+    async def test_unknown_entry_is_404(self, api: httpx.AsyncClient):
+        """Test that streaming a missing entry fails before streaming starts."""
+        response = await api.get("/api/entries/999/events")
+        assert response.status_code == 404
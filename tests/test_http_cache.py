@@ -0,0 +1,177 @@
+"""Tests for ETags and Cache-Control on the read endpoints."""
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.queue import Queue, QueueStatus
+from tests.conftest import app_sync_engines
+
+
+def _join(client: TestClient, queue: Queue, name: str = "Customer") -> dict:
+    response = client.post(
+        "/api/entries/join",
+        json={
+            "queue_id": queue.id,
+            "customer_name": name,
+            "phone_number": "+1234567890",
+        },
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+class TestQueueCaching:
+    """Test conditional GETs of queues."""
+
+    def test_get_queue_returns_etag_and_public_cache_control(
+        self, client: TestClient, test_queue: Queue
+    ):
+        """Test queue reads may be briefly reused and served stale by caches."""
+        response = client.get(f"/api/queues/{test_queue.id}")
+        assert response.status_code == 200
+        assert response.headers["etag"].startswith('W/"')
+        cache_control = response.headers["cache-control"]
+        assert cache_control.startswith("public, max-age=")
+        assert "stale-while-revalidate=" in cache_control
+
+    def test_get_queue_not_modified(self, client: TestClient, test_queue: Queue):
+        """Test a matching If-None-Match gets an empty 304."""
+        etag = client.get(f"/api/queues/{test_queue.id}").headers["etag"]
+
+        response = client.get(
+            f"/api/queues/{test_queue.id}", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    def test_queue_etag_changes_on_mutation(
+        self,
+        client: TestClient,
+        test_queue: Queue,
+        test_user,
+        admin_auth_headers: dict[str, str],
+    ):
+        """Test updates, new admins and joins each change the ETag."""
+        url = f"/api/queues/{test_queue.id}"
+        etags = [client.get(url).headers["etag"]]
+
+        client.patch(
+            url, json={"description": "Updated"}, headers=admin_auth_headers
+        ).raise_for_status()
+        etags.append(client.get(url).headers["etag"])
+
+        client.post(
+            f"{url}/admins/{test_user.id}", headers=admin_auth_headers
+        ).raise_for_status()
+        etags.append(client.get(url).headers["etag"])
+
+        _join(client, test_queue)
+        etags.append(client.get(url).headers["etag"])
+
+        assert len(set(etags)) == 4
+        response = client.get(url, headers={"If-None-Match": etags[0]})
+        assert response.status_code == 200
+        assert response.json()["current_size"] == 1
+
+    def test_list_queues_not_modified(
+        self, client: TestClient, test_queue: Queue, admin_auth_headers
+    ):
+        """Test the listing ETag covers new queues and changes to listed ones."""
+        etag = client.get("/api/queues/").headers["etag"]
+        assert (
+            client.get("/api/queues/", headers={"If-None-Match": etag}).status_code
+            == 304
+        )
+
+        _join(client, test_queue)
+        response = client.get("/api/queues/", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+
+        client.post(
+            "/api/queues/",
+            json={"name": "another-queue", "business_name": "Another"},
+            headers=admin_auth_headers,
+        ).raise_for_status()
+        response = client.get("/api/queues/", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert len(response.json()) == 2
+
+    def test_list_etag_changes_when_queues_swap_status(
+        self, client: TestClient, db: Session
+    ):
+        """Test one queue leaving the listing as another joins it changes the ETag."""
+        a = Queue(name="a", business_name="A", version=6)
+        b = Queue(name="b", business_name="B", status=QueueStatus.PAUSED, version=5)
+        c = Queue(name="c", business_name="C")
+        db.add_all([a, b, c])
+        db.commit()
+        etag = client.get("/api/queues/").headers["etag"]
+
+        a.status, a.version = QueueStatus.PAUSED, a.version + 1
+        b.status, b.version = QueueStatus.ACTIVE, b.version + 1
+        db.commit()
+
+        response = client.get("/api/queues/", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert [queue["name"] for queue in response.json()] == ["b", "c"]
+
+
+class TestEntryCaching:
+    """Test conditional GETs of entries."""
+
+    def test_get_entry_is_privately_cached(self, client: TestClient, test_queue: Queue):
+        """Test entries, which carry phone numbers, are never shared."""
+        entry = _join(client, test_queue)
+        response = client.get(f"/api/entries/{entry['id']}")
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == "private, no-cache"
+
+    def test_entry_etag_changes_when_queue_moves(
+        self, client: TestClient, test_queue: Queue, admin_auth_headers
+    ):
+        """Test an entry's ETag changes when an entry ahead of it is served."""
+        first = _join(client, test_queue, "First")
+        second = _join(client, test_queue, "Second")
+        url = f"/api/entries/{second['id']}"
+        etag = client.get(url).headers["etag"]
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+        client.patch(
+            f"/api/entries/{first['id']}/serve", headers=admin_auth_headers
+        ).raise_for_status()
+
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["estimated_wait_minutes"] == 0
+
+    def test_not_modified_skips_entry_queries(
+        self, client: TestClient, test_queue: Queue
+    ):
+        """Test a 304 costs one version lookup and never touches the entries."""
+        entry = _join(client, test_queue)
+        urls = [
+            f"/api/entries/{entry['id']}",
+            f"/api/entries/queue/{test_queue.id}",
+        ]
+        etags = {url: client.get(url).headers["etag"] for url in urls}
+
+        statements: list[str] = []
+
+        def record_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        for app_engine in app_sync_engines:
+            event.listen(app_engine, "before_cursor_execute", record_statement)
+        try:
+            for url in urls:
+                response = client.get(url, headers={"If-None-Match": etags[url]})
+                assert response.status_code == 304
+        finally:
+            for app_engine in app_sync_engines:
+                event.remove(app_engine, "before_cursor_execute", record_statement)
+
+        assert len(statements) == 2
+        assert not any("FROM queue_entries" in s for s in statements)
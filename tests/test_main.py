@@ -1,7 +1,12 @@
 """Tests for main app endpoints."""
 
+import inspect
+
+from fastapi.routing import APIRoute
 from fastapi.testclient import TestClient
 
+from app.main import app
+
 
 def test_root(client: TestClient):
     """Test root endpoint."""
@@ -18,3 +23,22 @@ def test_health_check(client: TestClient):
     assert response.status_code == 200
     data = response.json()
     assert data["status"] == "healthy"
+
+
+def test_api_routes_are_async():
+    """Test API routes run on the event loop rather than the threadpool."""
+    api_routes = [
+        route
+        for route in app.routes
+        if isinstance(route, APIRoute) and route.path.startswith("/api/")
+    ]
+    assert api_routes
+    for route in api_routes:
+        assert inspect.iscoroutinefunction(route.endpoint), route.path
+
+
+def test_metrics(client: TestClient):
+    """Test the metrics endpoint reports SMS pacing."""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "sms_pacing" in response.json()
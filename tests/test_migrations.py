@@ -0,0 +1,135 @@
+"""Tests for the Alembic migrations."""
+
+from pathlib import Path
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, text
+
+import app.models  # noqa: F401
+from app.db.base import Base
+from app.db.migrations import get_alembic_config, run_migrations
+
+
+def _database_url(tmp_path: Path) -> str:
+    return f"sqlite:///{tmp_path / 'migrations.db'}"
+
+
+def test_migrations_match_models(tmp_path: Path):
+    """Test upgrading to head yields exactly the schema the models describe."""
+    url = _database_url(tmp_path)
+    run_migrations(url)
+
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        context = MigrationContext.configure(connection)
+        assert compare_metadata(context, Base.metadata) == []
+    engine.dispose()
+
+
+def test_legacy_database_is_stamped_and_backfilled(tmp_path: Path):
+    """Test a database built before migrations existed is upgraded in place."""
+    url = _database_url(tmp_path)
+    config = get_alembic_config(url)
+    command.upgrade(config, "0001")
+
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        # create_all never wrote a version table
+        connection.execute(text("DROP TABLE alembic_version"))
+        connection.execute(
+            text("INSERT INTO queues (id, name, business_name) VALUES (1, 'q', 'Q')")
+        )
+        for position, status in [(1, "SERVED"), (2, "CALLED"), (3, "WAITING")]:
+            connection.execute(
+                text(
+                    "INSERT INTO queue_entries "
+                    "(queue_id, customer_name, phone_number, position, status) "
+                    "VALUES (1, 'c', '+1234567890', :position, :status)"
+                ),
+                {"position": position, "status": status},
+            )
+
+    run_migrations(url)
+
+    with engine.connect() as connection:
+        counters = connection.execute(
+            text("SELECT next_position, waiting_count, called_count FROM queues")
+        ).one()
+    assert tuple(counters) == (4, 1, 1)
+    engine.dispose()
+
+
+def test_duplicate_positions_are_renumbered(tmp_path: Path):
+    """Test entries sharing a position are moved back, in order, before 0008."""
+    url = _database_url(tmp_path)
+    command.upgrade(get_alembic_config(url), "0007")
+
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO queues (id, name, business_name, next_position) "
+                "VALUES (1, 'q', 'Q', 4)"
+            )
+        )
+        for entry_id, position in [(1, 1), (2, 2), (3, 2), (4, 3)]:
+            connection.execute(
+                text(
+                    "INSERT INTO queue_entries "
+                    "(id, queue_id, customer_name, phone_number, position, status) "
+                    "VALUES (:id, 1, 'c', '+1234567890', :position, 'WAITING')"
+                ),
+                {"id": entry_id, "position": position},
+            )
+
+    run_migrations(url)
+
+    with engine.connect() as connection:
+        positions = connection.execute(
+            text("SELECT id, position FROM queue_entries ORDER BY id")
+        ).all()
+        next_position = connection.execute(
+            text("SELECT next_position FROM queues")
+        ).scalar_one()
+    assert [tuple(row) for row in positions] == [(1, 1), (2, 2), (3, 3), (4, 4)]
+    assert next_position == 5
+    engine.dispose()
+
+
+def test_queue_ids_are_not_reused(tmp_path: Path):
+    """Test the rebuilt queues table keeps its rows and never reuses an id."""
+    url = _database_url(tmp_path)
+    command.upgrade(get_alembic_config(url), "0008")
+
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO queues (id, name, business_name) "
+                "VALUES (1, 'a', 'A'), (2, 'b', 'B')"
+            )
+        )
+
+    run_migrations(url)
+
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM queues WHERE id = 2"))
+        connection.execute(
+            text("INSERT INTO queues (name, business_name) VALUES ('c', 'C')")
+        )
+        ids = connection.execute(text("SELECT id FROM queues ORDER BY id")).scalars()
+        assert list(ids) == [1, 3]
+    engine.dispose()
+
+
+def test_downgrade_to_base(tmp_path: Path):
+    """Test every migration can be reverted."""
+    url = _database_url(tmp_path)
+    run_migrations(url)
+    command.downgrade(get_alembic_config(url), "base")
+
+    engine = create_engine(url)
+    assert set(inspect(engine).get_table_names()) == {"alembic_version"}
+    engine.dispose()
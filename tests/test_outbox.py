@@ -0,0 +1,200 @@
+"""Tests for the SMS outbox and its dispatcher."""
+
+import asyncio
+from collections.abc import AsyncGenerator
+from datetime import datetime, timedelta
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.db.base import engine
+from app.models.outbox import OutboxStatus, SMSOutboxMessage
+from app.models.queue import Queue
+from app.services.outbox import OutboxDispatcher
+from app.services.sms import MockSMSProvider, SMSService, sms_service
+
+
+class FailingSMSProvider(MockSMSProvider):
+    """Mock provider whose sends fail, as a throttled or unreachable API would."""
+
+    def send_sms(self, to: str, body: str) -> dict[str, Any]:
+        super().send_sms(to, body)
+        return {"success": False, "error": "429 Too Many Requests", "to": to}
+
+
+def _add_message(db: Session, **values: Any) -> SMSOutboxMessage:
+    message = SMSOutboxMessage(
+        to_number="+1234567890",
+        body="Hello",
+        status=OutboxStatus.PENDING,
+        attempts=0,
+        next_attempt_at=datetime.utcnow() - timedelta(seconds=1),
+    )
+    for field, value in values.items():
+        setattr(message, field, value)
+    db.add(message)
+    db.commit()
+    return message
+
+
+@pytest_asyncio.fixture
+async def mock_provider() -> AsyncGenerator[MockSMSProvider, None]:
+    provider = MockSMSProvider()
+    yield provider
+    # Connections are bound to this test's event loop
+    await engine.dispose()
+
+
+class TestOutboxRoutes:
+    """Test routes write notifications through the outbox."""
+
+    def test_join_records_sent_message(
+        self, client: TestClient, db: Session, test_queue: Queue
+    ):
+        """Test the welcome SMS is stored and marked sent after the response."""
+        with patch.object(sms_service, "provider", MockSMSProvider()):
+            response = client.post(
+                "/api/entries/join",
+                json={
+                    "queue_id": test_queue.id,
+                    "customer_name": "John",
+                    "phone_number": "+1234567890",
+                },
+            )
+        assert response.status_code == 200
+
+        message = db.query(SMSOutboxMessage).one()
+        assert message.status == OutboxStatus.SENT
+        assert message.attempts == 1
+        assert message.provider_message_id.startswith("mock_")
+        assert "position 1" in message.body
+
+    def test_provider_failure_does_not_fail_request(
+        self, client: TestClient, db: Session, test_queue: Queue
+    ):
+        """Test a failed send is kept for retry instead of being dropped."""
+        with patch.object(sms_service, "provider", FailingSMSProvider()):
+            response = client.post(
+                "/api/entries/join",
+                json={
+                    "queue_id": test_queue.id,
+                    "customer_name": "John",
+                    "phone_number": "+1234567890",
+                },
+            )
+        assert response.status_code == 200
+
+        message = db.query(SMSOutboxMessage).one()
+        assert message.status == OutboxStatus.PENDING
+        assert message.attempts == 1
+        assert message.last_error == "429 Too Many Requests"
+        assert message.next_attempt_at > datetime.utcnow()
+
+
+class TestOutboxDispatcher:
+    """Test the dispatcher's batching, retries and shutdown drain."""
+
+    def test_retry_delay_backs_off_exponentially(self):
+        dispatcher = OutboxDispatcher(
+            SMSService(provider=MockSMSProvider()),
+            retry_base_seconds=2,
+            retry_max_seconds=10,
+        )
+        assert [dispatcher.retry_delay(n) for n in range(1, 5)] == [2, 4, 8, 10]
+
+    @pytest.mark.asyncio
+    async def test_dispatch_due_sends_in_batches(
+        self, db: Session, mock_provider: MockSMSProvider
+    ):
+        for i in range(5):
+            _add_message(db, body=f"Message {i}")
+        dispatcher = OutboxDispatcher(SMSService(provider=mock_provider), batch_size=3)
+
+        assert await dispatcher.dispatch_due() == 3
+        assert await dispatcher.dispatch_due() == 2
+        assert await dispatcher.dispatch_due() == 0
+
+        assert len(mock_provider.get_sent_messages()) == 5
+        statuses = {message.status for message in db.query(SMSOutboxMessage)}
+        assert statuses == {OutboxStatus.SENT}
+
+    @pytest.mark.asyncio
+    async def test_failures_are_dead_lettered(
+        self, db: Session, mock_provider: MockSMSProvider
+    ):
+        message = _add_message(db)
+        dispatcher = OutboxDispatcher(
+            SMSService(provider=FailingSMSProvider()), max_attempts=2
+        )
+
+        assert await dispatcher.dispatch_due() == 1
+        db.refresh(message)
+        assert (message.status, message.attempts) == (OutboxStatus.PENDING, 1)
+
+        # Not due again until the backoff has passed
+        assert await dispatcher.dispatch_due() == 0
+        message.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+
+        assert await dispatcher.dispatch_due() == 1
+        db.refresh(message)
+        assert (message.status, message.attempts) == (OutboxStatus.DEAD, 2)
+        assert await dispatcher.dispatch_due() == 0
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_is_reclaimed(
+        self, db: Session, mock_provider: MockSMSProvider
+    ):
+        """Test a message abandoned mid-send by a dead worker is sent again."""
+        _add_message(
+            db,
+            status=OutboxStatus.SENDING,
+            locked_until=datetime.utcnow() - timedelta(seconds=1),
+        )
+        _add_message(
+            db,
+            status=OutboxStatus.SENDING,
+            locked_until=datetime.utcnow() + timedelta(minutes=1),
+        )
+        dispatcher = OutboxDispatcher(SMSService(provider=mock_provider))
+
+        assert await dispatcher.dispatch_due() == 1
+
+    @pytest.mark.asyncio
+    async def test_paced_batch_keeps_its_lease(
+        self, db: Session, mock_provider: MockSMSProvider
+    ):
+        """Test a batch paced past its lease isn't taken over and sent twice."""
+        for i in range(20):
+            _add_message(db, body=f"Message {i}")
+        sms = SMSService(provider=mock_provider, provider_rate=10, provider_burst=1)
+        first = OutboxDispatcher(sms, lease_seconds=0.5)
+        second = OutboxDispatcher(sms, lease_seconds=0.5)
+
+        sending = asyncio.create_task(first.dispatch_due())
+        await asyncio.sleep(0.8)
+        assert await second.dispatch_due() == 0
+        assert await sending == 20
+
+        bodies = [message["body"] for message in mock_provider.get_sent_messages()]
+        assert sorted(bodies) == sorted(f"Message {i}" for i in range(20))
+
+    @pytest.mark.asyncio
+    async def test_stop_drains_pending_messages(
+        self, db: Session, mock_provider: MockSMSProvider
+    ):
+        """Test shutdown sends messages still waiting for their handoff."""
+        _add_message(db, next_attempt_at=datetime.utcnow() + timedelta(minutes=1))
+        dispatcher = OutboxDispatcher(
+            SMSService(provider=mock_provider), poll_interval_seconds=60
+        )
+
+        await dispatcher.start()
+        await dispatcher.stop(timeout=5)
+
+        assert len(mock_provider.get_sent_messages()) == 1
+        assert db.query(SMSOutboxMessage).one().status == OutboxStatus.SENT
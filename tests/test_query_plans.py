@@ -0,0 +1,276 @@
+"""Query-plan regression tests: route queries must not fall back to table scans."""
+
+import re
+from collections.abc import Generator
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+from app.models.queue import EntryStatus, Queue, QueueEntry
+from app.models.user import User
+from tests.conftest import app_sync_engines, engine
+
+# "SCAN <table>" with nothing after it is a full table scan; index scans read
+# "SCAN <table> USING [COVERING] INDEX ..." and lookups read "SEARCH ...".
+# Scans of a subquery's rows ("SCAN anon_1") are bounded by the subquery.
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+TABLES = set(Base.metadata.tables)
+
+
+class StatementRecorder:
+    """Collect the SQL statements run by the app's engines."""
+
+    def __init__(self):
+        self.statements: list[tuple[str, object]] = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(
+            ("SELECT", "UPDATE", "DELETE")
+        ):
+            self.statements.append((statement, parameters))
+
+    def full_scans(self) -> list[tuple[str, str]]:
+        """Run EXPLAIN QUERY PLAN on every recorded statement."""
+        scans = []
+        with engine.connect() as connection:
+            for statement, parameters in self.statements:
+                plan = connection.exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN {statement}", parameters
+                ).all()
+                for row in plan:
+                    detail = row[-1]
+                    match = FULL_SCAN.match(detail)
+                    if match and match.group(1) in TABLES:
+                        scans.append((detail, statement))
+        return scans
+
+
+@pytest.fixture
+def recorder() -> Generator[StatementRecorder, None, None]:
+    """Record statements while the test drives the API."""
+    statement_recorder = StatementRecorder()
+    for app_engine in app_sync_engines:
+        event.listen(app_engine, "before_cursor_execute", statement_recorder)
+    yield statement_recorder
+    for app_engine in app_sync_engines:
+        event.remove(app_engine, "before_cursor_execute", statement_recorder)
+
+
+@pytest.fixture
+def populated_queue(db: Session, test_queue: Queue) -> Queue:
+    """A queue with entries in every status."""
+    statuses = [
+        EntryStatus.SERVED,
+        EntryStatus.CANCELLED,
+        EntryStatus.CALLED,
+        EntryStatus.WAITING,
+        EntryStatus.WAITING,
+    ]
+    for i, status in enumerate(statuses):
+        db.add(
+            QueueEntry(
+                queue_id=test_queue.id,
+                customer_name=f"Customer {i}",
+                phone_number="+1234567890",
+                position=i + 1,
+                status=status,
+            )
+        )
+    test_queue.next_position = len(statuses) + 1
+    test_queue.waiting_count = 2
+    test_queue.called_count = 1
+    db.commit()
+    return test_queue
+
+
+def _assert_no_full_scans(recorder: StatementRecorder):
+    assert recorder.statements, "no statements were recorded"
+    assert recorder.full_scans() == []
+
+
+def _waiting_entry(db: Session, queue: Queue) -> QueueEntry:
+    entry = (
+        db.query(QueueEntry)
+        .filter_by(queue_id=queue.id, status=EntryStatus.WAITING)
+        .order_by(QueueEntry.position)
+        .first()
+    )
+    assert entry is not None
+    return entry
+
+
+class TestQueueRoutePlans:
+    """Query plans for the queue routes."""
+
+    def test_list_queues(
+        self,
+        client: TestClient,
+        db: Session,
+        populated_queue: Queue,
+        recorder: StatementRecorder,
+    ):
+        db.add(Queue(name="second", business_name="Second"))
+        db.commit()
+        cursor = client.get("/api/queues/?limit=1").headers["x-next-cursor"]
+        client.get("/api/queues/", params={"limit": 1, "cursor": cursor})
+        client.get("/api/queues/?status=closed")
+        _assert_no_full_scans(recorder)
+
+    def test_get_queue(
+        self, client: TestClient, populated_queue: Queue, recorder: StatementRecorder
+    ):
+        client.get(f"/api/queues/{populated_queue.id}")
+        _assert_no_full_scans(recorder)
+
+    def test_create_and_update_queue(
+        self,
+        client: TestClient,
+        admin_auth_headers: dict[str, str],
+        populated_queue: Queue,
+        recorder: StatementRecorder,
+    ):
+        client.post(
+            "/api/queues/",
+            json={"name": "another-queue", "business_name": "Another"},
+            headers=admin_auth_headers,
+        )
+        client.patch(
+            f"/api/queues/{populated_queue.id}",
+            json={"description": "Updated"},
+            headers=admin_auth_headers,
+        )
+        _assert_no_full_scans(recorder)
+
+    def test_manage_admins_and_delete_queue(
+        self,
+        client: TestClient,
+        admin_auth_headers: dict[str, str],
+        populated_queue: Queue,
+        test_user: User,
+        recorder: StatementRecorder,
+    ):
+        client.post(
+            f"/api/queues/{populated_queue.id}/admins/{test_user.id}",
+            headers=admin_auth_headers,
+        )
+        client.delete(
+            f"/api/queues/{populated_queue.id}/admins/{test_user.id}",
+            headers=admin_auth_headers,
+        )
+        client.delete(f"/api/queues/{populated_queue.id}", headers=admin_auth_headers)
+        _assert_no_full_scans(recorder)
+
+
+class TestEntryRoutePlans:
+    """Query plans for the entry routes."""
+
+    def test_join_queue(
+        self, client: TestClient, populated_queue: Queue, recorder: StatementRecorder
+    ):
+        client.post(
+            "/api/entries/join",
+            json={
+                "queue_id": populated_queue.id,
+                "customer_name": "New",
+                "phone_number": "+1234567890",
+            },
+        )
+        _assert_no_full_scans(recorder)
+
+    def test_bulk_join(
+        self,
+        client: TestClient,
+        populated_queue: Queue,
+        admin_auth_headers: dict[str, str],
+        recorder: StatementRecorder,
+    ):
+        client.post(
+            "/api/entries/join/bulk",
+            json={
+                "entries": [
+                    {
+                        "queue_id": populated_queue.id,
+                        "customer_name": f"New {i}",
+                        "phone_number": "+1234567890",
+                    }
+                    for i in range(3)
+                ]
+            },
+            headers=admin_auth_headers,
+        )
+        _assert_no_full_scans(recorder)
+
+    def test_list_queue_entries(
+        self, client: TestClient, populated_queue: Queue, recorder: StatementRecorder
+    ):
+        url = f"/api/entries/queue/{populated_queue.id}"
+        cursor = client.get(url, params={"limit": 1}).headers["x-next-cursor"]
+        client.get(url, params={"limit": 1, "cursor": cursor})
+        client.get(url, params={"limit": 1, "cursor": cursor, "status": "waiting"})
+        client.get(url, params={"status": "served"})
+        _assert_no_full_scans(recorder)
+
+    def test_get_entry(
+        self,
+        client: TestClient,
+        db: Session,
+        populated_queue: Queue,
+        recorder: StatementRecorder,
+    ):
+        entry = _waiting_entry(db, populated_queue)
+        client.get(f"/api/entries/{entry.id}")
+        _assert_no_full_scans(recorder)
+
+    def test_call_serve_cancel(
+        self,
+        client: TestClient,
+        db: Session,
+        admin_auth_headers: dict[str, str],
+        populated_queue: Queue,
+        recorder: StatementRecorder,
+    ):
+        entry = _waiting_entry(db, populated_queue)
+        client.patch(f"/api/entries/{entry.id}/call", headers=admin_auth_headers)
+        client.patch(f"/api/entries/{entry.id}/serve", headers=admin_auth_headers)
+        entry = _waiting_entry(db, populated_queue)
+        client.patch(f"/api/entries/{entry.id}/cancel")
+        _assert_no_full_scans(recorder)
+
+    def test_call_next(
+        self,
+        client: TestClient,
+        admin_auth_headers: dict[str, str],
+        populated_queue: Queue,
+        recorder: StatementRecorder,
+    ):
+        response = client.post(
+            f"/api/queues/{populated_queue.id}/call-next",
+            params={"count": 2},
+            headers=admin_auth_headers,
+        )
+        assert len(response.json()) == 2
+        _assert_no_full_scans(recorder)
+
+
+class TestAuthRoutePlans:
+    """Query plans for the auth routes."""
+
+    def test_register_and_login(
+        self, client: TestClient, test_user: User, recorder: StatementRecorder
+    ):
+        client.post(
+            "/api/auth/register",
+            json={
+                "email": "plan@example.com",
+                "username": "planuser",
+                "password": "planpass123",
+            },
+        )
+        client.post(
+            "/api/auth/token",
+            data={"username": test_user.username, "password": "testpass123"},
+        )
+        _assert_no_full_scans(recorder)
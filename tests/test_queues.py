@@ -1,10 +1,23 @@
 """Tests for queue management endpoints."""
 
+from contextlib import ExitStack
+
+import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 from sqlalchemy.orm import Session
+from starlette.websockets import WebSocketDisconnect
 
-from app.models.queue import Queue, QueueStatus
+from app.models.queue import (
+    EntryStatus,
+    Queue,
+    QueueEntry,
+    QueueStatus,
+    queue_admins,
+)
 from app.models.user import User
+from app.services.queue_counters import repair_queue_counters
+from tests.conftest import app_sync_engines
 
 
 class TestCreateQueue:
@@ -97,6 +110,87 @@ class TestListQueues:
         assert len(data) == 1
         assert data[0]["name"] == "closed-queue"
 
+    def test_list_queues_batches_computed_fields(
+        self, client: TestClient, db: Session, test_admin: User, test_user: User
+    ):
+        """Test sizes and admin ids are loaded without a query per queue."""
+        for i in range(5):
+            queue = Queue(name=f"queue-{i}", business_name=f"Business {i}")
+            db.add(queue)
+            db.flush()
+            admin_ids = [test_admin.id, test_user.id] if i % 2 == 0 else [test_admin.id]
+            for admin_id in admin_ids:
+                db.execute(
+                    queue_admins.insert().values(user_id=admin_id, queue_id=queue.id)
+                )
+            for j in range(i):
+                db.add(
+                    QueueEntry(
+                        queue_id=queue.id,
+                        customer_name=f"Customer {j}",
+                        phone_number="+1234567890",
+                        position=j + 1,
+                        status=EntryStatus.WAITING,
+                    )
+                )
+        repair_queue_counters(db)
+        db.commit()
+
+        statements: list[str] = []
+
+        def count_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        for app_engine in app_sync_engines:
+            event.listen(app_engine, "before_cursor_execute", count_statement)
+        try:
+            response = client.get("/api/queues/")
+        finally:
+            for app_engine in app_sync_engines:
+                event.remove(app_engine, "before_cursor_execute", count_statement)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [queue["current_size"] for queue in data] == [0, 1, 2, 3, 4]
+        assert data[0]["admin_ids"] == sorted([test_admin.id, test_user.id])
+        assert data[1]["admin_ids"] == [test_admin.id]
+        # One query for the ETag, one for the page and one for admin ids
+        assert len(statements) == 3
+
+    def test_list_queues_cursor_pagination(
+        self, client: TestClient, db: Session, test_queue: Queue
+    ):
+        """Test following next cursors visits every queue once, in id order."""
+        for i in range(4):
+            db.add(Queue(name=f"queue-{i}", business_name=f"Business {i}"))
+        db.add(Queue(name="closed", business_name="Closed", status=QueueStatus.CLOSED))
+        db.commit()
+
+        pages = []
+        cursor = None
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            response = client.get("/api/queues/", params=params)
+            assert response.status_code == 200
+            pages.append([queue["id"] for queue in response.json()])
+            cursor = response.headers.get("x-next-cursor")
+            if cursor is None:
+                break
+
+        assert [len(page) for page in pages] == [2, 2, 1]
+        ids = [queue_id for page in pages for queue_id in page]
+        assert ids == sorted(ids)
+        assert len(ids) == 5
+
+        # Cached pages keep their cursors
+        response = client.get("/api/queues/", params={"limit": 2})
+        assert response.headers["x-next-cursor"]
+
+    def test_list_queues_rejects_bad_cursor(self, client: TestClient):
+        """Test a cursor that was not issued by the API is refused."""
+        response = client.get("/api/queues/", params={"cursor": "not-a-cursor"})
+        assert response.status_code == 400
+
 
 class TestGetQueue:
     """Test getting a specific queue."""
@@ -176,6 +270,27 @@ class TestDeleteQueue:
         response = client.delete(f"/api/queues/{test_queue.id}", headers=auth_headers)
         assert response.status_code == 403
 
+    def test_recreated_queue_gets_new_etag(
+        self, client: TestClient, admin_auth_headers: dict[str, str], test_queue: Queue
+    ):
+        """Test a queue created after a delete doesn't reuse the id or ETags."""
+        old_etag = client.get(f"/api/queues/{test_queue.id}").headers["ETag"]
+        old_list_etag = client.get("/api/queues/").headers["ETag"]
+        client.delete(f"/api/queues/{test_queue.id}", headers=admin_auth_headers)
+
+        created = client.post(
+            "/api/queues/",
+            json={"name": "recreated", "business_name": "Recreated"},
+            headers=admin_auth_headers,
+        ).json()
+
+        assert created["id"] != test_queue.id
+        response = client.get(f"/api/queues/{created['id']}")
+        assert response.headers["ETag"] != old_etag
+        listing = client.get("/api/queues/", headers={"If-None-Match": old_list_etag})
+        assert listing.status_code == 200
+        assert [queue["name"] for queue in listing.json()] == ["recreated"]
+
 
 class TestQueueAdmins:
     """Test queue admin management."""
@@ -213,3 +328,207 @@ class TestQueueAdmins:
             f"/api/queues/{test_queue.id}/admins/{test_admin.id}", headers=auth_headers
         )
         assert response.status_code == 403
+
+    def test_added_admin_can_manage_without_new_token(
+        self,
+        client: TestClient,
+        admin_auth_headers: dict[str, str],
+        auth_headers: dict[str, str],
+        test_queue: Queue,
+        test_user: User,
+    ):
+        """Test a token issued before the user became admin is accepted."""
+        url = f"/api/queues/{test_queue.id}"
+        assert client.patch(url, json={}, headers=auth_headers).status_code == 403
+
+        client.post(
+            f"/api/queues/{test_queue.id}/admins/{test_user.id}",
+            headers=admin_auth_headers,
+        ).raise_for_status()
+
+        response = client.patch(
+            f"/api/queues/{test_queue.id}",
+            json={"description": "Updated"},
+            headers=auth_headers,
+        )
+        assert response.status_code == 200
+
+    def test_remove_admin_revokes_token_claims(
+        self,
+        client: TestClient,
+        db: Session,
+        admin_auth_headers: dict[str, str],
+        test_queue: Queue,
+        test_user: User,
+    ):
+        """Test a removed admin's token stops granting access straight away."""
+        client.post(
+            f"/api/queues/{test_queue.id}/admins/{test_user.id}",
+            headers=admin_auth_headers,
+        ).raise_for_status()
+        # Logged in as an admin, so the token claims the queue
+        token = client.post(
+            "/api/auth/token",
+            data={"username": test_user.username, "password": "testpass123"},
+        ).json()["access_token"]
+        user_headers = {"Authorization": f"Bearer {token}"}
+        url = f"/api/queues/{test_queue.id}"
+        assert client.patch(url, json={}, headers=user_headers).status_code == 200
+
+        response = client.delete(
+            f"{url}/admins/{test_user.id}", headers=admin_auth_headers
+        )
+        assert response.status_code == 200
+
+        assert client.patch(url, json={}, headers=user_headers).status_code == 403
+        db.refresh(test_queue)
+        assert test_user not in test_queue.admins
+
+    def test_cannot_remove_last_admin(
+        self,
+        client: TestClient,
+        admin_auth_headers: dict[str, str],
+        test_queue: Queue,
+        test_admin: User,
+    ):
+        """Test a queue always keeps an admin."""
+        response = client.delete(
+            f"/api/queues/{test_queue.id}/admins/{test_admin.id}",
+            headers=admin_auth_headers,
+        )
+        assert response.status_code == 400
+
+
+class TestQueueWebSocket:
+    """Test the queue dashboard WebSocket."""
+
+    def _join(self, client: TestClient, queue: Queue, name: str) -> int:
+        response = client.post(
+            "/api/entries/join",
+            json={
+                "queue_id": queue.id,
+                "customer_name": name,
+                "phone_number": "+1234567890",
+            },
+        )
+        return response.json()["id"]
+
+    def test_requires_queue_admin(
+        self,
+        client: TestClient,
+        auth_headers: dict[str, str],
+        test_queue: Queue,
+    ):
+        """Test that anonymous users and non-admins are refused."""
+        token = auth_headers["Authorization"].split()[1]
+        for url in [
+            f"/api/queues/{test_queue.id}/ws",
+            f"/api/queues/{test_queue.id}/ws?token=invalid",
+            f"/api/queues/{test_queue.id}/ws?token={token}",
+        ]:
+            with pytest.raises(WebSocketDisconnect):
+                with client.websocket_connect(url):
+                    pass
+
+    def test_refuses_inactive_admin(
+        self,
+        client: TestClient,
+        db: Session,
+        admin_auth_headers: dict[str, str],
+        test_admin: User,
+        test_queue: Queue,
+    ):
+        """Test a deactivated admin's token no longer opens the stream."""
+        token = admin_auth_headers["Authorization"].split()[1]
+        test_admin.is_active = False
+        db.commit()
+
+        with pytest.raises(WebSocketDisconnect) as refused:
+            with client.websocket_connect(
+                f"/api/queues/{test_queue.id}/ws?token={token}"
+            ):
+                pass
+        assert refused.value.code == 1008
+
+    def test_snapshot_then_deltas(
+        self,
+        client: TestClient,
+        admin_auth_headers: dict[str, str],
+        test_queue: Queue,
+    ):
+        """Test that the dashboard gets a snapshot and then one event per change."""
+        first_id = self._join(client, test_queue, "First")
+        token = admin_auth_headers["Authorization"].split()[1]
+
+        with client.websocket_connect(
+            f"/api/queues/{test_queue.id}/ws?token={token}"
+        ) as websocket:
+            snapshot = websocket.receive_json()
+            assert snapshot["type"] == "snapshot"
+            assert snapshot["queue"]["id"] == test_queue.id
+            assert [e["id"] for e in snapshot["entries"]] == [first_id]
+
+            second_id = self._join(client, test_queue, "Second")
+            joined = websocket.receive_json()
+            assert joined["type"] == "entry_joined"
+            assert joined["entry"]["id"] == second_id
+            assert joined["entry"]["customer_name"] == "Second"
+            assert joined["version"] > snapshot["version"]
+
+            client.patch(f"/api/entries/{first_id}/call", headers=admin_auth_headers)
+            called = websocket.receive_json()
+            assert called["type"] == "entry_called"
+            assert called["entry"]["status"] == "called"
+
+            client.patch(f"/api/entries/{second_id}/cancel")
+            assert websocket.receive_json()["type"] == "entry_cancelled"
+
+            client.patch(
+                f"/api/queues/{test_queue.id}",
+                json={"status": "paused"},
+                headers=admin_auth_headers,
+            )
+            updated = websocket.receive_json()
+            assert updated["type"] == "queue_updated"
+            assert updated["queue"]["status"] == "paused"
+
+            client.delete(f"/api/queues/{test_queue.id}", headers=admin_auth_headers)
+            assert websocket.receive_json()["type"] == "queue_deleted"
+            with pytest.raises(WebSocketDisconnect):
+                websocket.receive_json()
+
+    def test_deltas_run_no_queries_per_subscriber(
+        self,
+        client: TestClient,
+        admin_auth_headers: dict[str, str],
+        test_queue: Queue,
+    ):
+        """Test that fanning a change out to many dashboards reads nothing."""
+        token = admin_auth_headers["Authorization"].split()[1]
+        url = f"/api/queues/{test_queue.id}/ws?token={token}"
+
+        with ExitStack() as stack:
+            websockets = [
+                stack.enter_context(client.websocket_connect(url)) for _ in range(5)
+            ]
+            for websocket in websockets:
+                assert websocket.receive_json()["type"] == "snapshot"
+
+            statements: list[str] = []
+
+            def record(conn, cursor, statement, *args):
+                if statement.lstrip().upper().startswith("SELECT"):
+                    statements.append(statement)
+
+            for sync_engine in app_sync_engines:
+                event.listen(sync_engine, "before_cursor_execute", record)
+            try:
+                self._join(client, test_queue, "Someone")
+                for websocket in websockets:
+                    assert websocket.receive_json()["type"] == "entry_joined"
+            finally:
+                for sync_engine in app_sync_engines:
+                    event.remove(sync_engine, "before_cursor_execute", record)
+
+        # Only the join itself reads (loading the queue and refreshing the entry)
+        assert len(statements) <= 2
@@ -0,0 +1,294 @@
+"""Tests for the in-process rank index."""
+
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.db.base import ReadSessionLocal, read_engine
+from app.models.queue import EntryStatus, Queue, QueueEntry
+from app.models.user import User
+from app.services.events import QueueEvent
+from app.services.rank_index import (
+    FenwickTree,
+    QueueRankIndex,
+    RankIndex,
+    rank_index,
+)
+
+
+def _joined(version: int, position: int) -> QueueEvent:
+    return QueueEvent(
+        queue_id=1, type="entry_joined", version=version, position=position
+    )
+
+
+def _left(version: int, position: int) -> QueueEvent:
+    return QueueEvent(
+        queue_id=1,
+        type="entry_updated",
+        version=version,
+        position=position,
+        status=EntryStatus.SERVED,
+        old_status=EntryStatus.CALLED,
+    )
+
+
+class TestFenwickTree:
+    def test_prefix_sums(self):
+        """Test prefix sums follow updates, from a bulk build or not."""
+        rng = random.Random(1)
+        counts = [rng.randint(0, 3) for _ in range(100)]
+        built = FenwickTree.from_counts(counts)
+        added = FenwickTree(len(counts))
+        for index, count in enumerate(counts, start=1):
+            added.add(index, count)
+
+        for tree in (built, added):
+            for index in range(len(counts) + 2):
+                assert tree.prefix_sum(index) == sum(counts[:index])
+
+        built.add(10, -counts[9])
+        assert built.prefix_sum(100) == sum(counts) - counts[9]
+
+
+class TestQueueRankIndex:
+    def test_matches_counting(self):
+        """Test ranks agree with counting through joins and exits."""
+        rng = random.Random(2)
+        active = set(range(1, 21))
+        index = QueueRankIndex(active, version=1)
+        next_position = 21
+        for _ in range(2000):
+            if active and rng.random() < 0.5:
+                position = rng.choice(sorted(active))
+                active.discard(position)
+                index.remove(position)
+            else:
+                active.add(next_position)
+                index.add(next_position)
+                next_position += 1
+            position = rng.randint(1, next_position)
+            assert index.entries_ahead(position) == sum(p < position for p in active)
+        assert index.positions() == sorted(active)
+
+    def test_position_below_the_front(self):
+        """Test a position below the ones loaded is still counted."""
+        index = QueueRankIndex([10, 11], version=1)
+        index.add(3)
+
+        assert index.entries_ahead(11) == 2
+        assert index.entries_ahead(4) == 1
+        assert 3 in index
+
+
+class TestRankIndex:
+    """Test event handling and the version checks without a database."""
+
+    def _rank_index(self) -> RankIndex:
+        ranks = RankIndex(max_queues=2, check_every=0)
+        ranks._store(1, QueueRankIndex([1, 2], version=5))
+        return ranks
+
+    def test_applies_next_version(self):
+        ranks = self._rank_index()
+        ranks.apply_event(_joined(6, 3))
+        ranks.apply_event(_left(7, 1))
+
+        index = ranks.get(1, 7)
+        assert index is not None
+        assert index.positions() == [2, 3]
+
+    def test_ignores_events_in_the_index(self):
+        ranks = self._rank_index()
+        ranks.apply_event(_left(5, 1))
+
+        index = ranks.get(1, 5)
+        assert index is not None
+        assert index.positions() == [1, 2]
+
+    def test_drops_index_that_missed_an_event(self):
+        """Test an event after a gap drops the index rather than guessing."""
+        ranks = self._rank_index()
+        ranks.apply_event(_joined(7, 4))
+
+        assert len(ranks) == 0
+        assert ranks.stats.dropped == 1
+
+    def test_drops_index_behind_the_database(self):
+        """Test a version the index hasn't seen drops it."""
+        ranks = self._rank_index()
+
+        assert ranks.get(1, 6) is None
+        assert len(ranks) == 0
+
+    def test_drops_deleted_queue(self):
+        ranks = self._rank_index()
+        ranks.apply_event(QueueEvent(queue_id=1, type="queue_deleted"))
+
+        assert len(ranks) == 0
+
+    def test_drops_repaired_queue(self):
+        """Test a counter repair drops the index even at the next version."""
+        ranks = self._rank_index()
+        ranks.apply_event(QueueEvent(queue_id=1, type="queue_updated", version=6))
+
+        assert len(ranks) == 0
+
+    def test_keeps_newest_snapshot(self):
+        """Test a slower load can't replace a newer index."""
+        ranks = self._rank_index()
+        ranks._store(1, QueueRankIndex([1], version=4))
+
+        assert ranks.get(1, 5) is not None
+
+
+def _add_entries(db: Session, queue: Queue, count: int) -> list[QueueEntry]:
+    entries = [
+        QueueEntry(
+            queue_id=queue.id,
+            customer_name=f"Customer {i}",
+            phone_number="+1234567890",
+            position=i + 1,
+        )
+        for i in range(count)
+    ]
+    db.add_all(entries)
+    queue.next_position = count + 1
+    queue.waiting_count = count
+    db.commit()
+    return entries
+
+
+def _ranks(client: TestClient, entries: list[QueueEntry]) -> list[int]:
+    return [client.get(f"/api/entries/{entry.id}").json()["rank"] for entry in entries]
+
+
+class TestRankedReads:
+    """Test GET /api/entries/{id} with the rank index."""
+
+    def test_kept_current_by_queue_changes(
+        self,
+        client: TestClient,
+        db: Session,
+        test_queue: Queue,
+        admin_auth_headers: dict[str, str],
+    ):
+        """Test joins, calls, serves and cancels update the loaded index."""
+        entries = _add_entries(db, test_queue, 5)
+        loads = rank_index.stats.loads
+        applied = rank_index.stats.events_applied
+        assert _ranks(client, entries) == [1, 2, 3, 4, 5]
+        assert rank_index.stats.loads == loads + 1
+
+        client.patch(f"/api/entries/{entries[0].id}/call", headers=admin_auth_headers)
+        client.patch(f"/api/entries/{entries[0].id}/serve", headers=admin_auth_headers)
+        client.patch(f"/api/entries/{entries[2].id}/cancel")
+        joined = client.post(
+            "/api/entries/join",
+            json={
+                "queue_id": test_queue.id,
+                "customer_name": "Late",
+                "phone_number": "+1234567899",
+            },
+        ).json()
+
+        assert _ranks(client, entries) == [None, 1, None, 2, 3]
+        assert client.get(f"/api/entries/{joined['id']}").json()["rank"] == 4
+        # Served from the index the events kept current, without reloading
+        assert rank_index.stats.loads == loads + 1
+        assert rank_index.stats.events_applied == applied + 4
+
+    def test_kept_by_queue_edits_and_admin_changes(
+        self,
+        client: TestClient,
+        db: Session,
+        test_queue: Queue,
+        test_user: User,
+        admin_auth_headers: dict[str, str],
+    ):
+        """Test changes that only bump the version keep the loaded index."""
+        entries = _add_entries(db, test_queue, 3)
+        loads = rank_index.stats.loads
+        dropped = rank_index.stats.dropped
+        assert _ranks(client, entries) == [1, 2, 3]
+
+        url = f"/api/queues/{test_queue.id}"
+        client.patch(
+            url, json={"name": "Renamed"}, headers=admin_auth_headers
+        ).raise_for_status()
+        admin_url = f"{url}/admins/{test_user.id}"
+        client.post(admin_url, headers=admin_auth_headers).raise_for_status()
+        client.delete(admin_url, headers=admin_auth_headers).raise_for_status()
+
+        assert _ranks(client, entries) == [1, 2, 3]
+        assert rank_index.stats.loads == loads + 1
+        assert rank_index.stats.dropped == dropped
+
+    def test_change_without_event_reloads(
+        self, client: TestClient, db: Session, test_queue: Queue
+    ):
+        """Test a version bump the index never heard about is picked up."""
+        entries = _add_entries(db, test_queue, 3)
+        loads = rank_index.stats.loads
+        assert _ranks(client, entries) == [1, 2, 3]
+
+        db.execute(
+            update(QueueEntry)
+            .where(QueueEntry.id == entries[0].id)
+            .values(status=EntryStatus.CANCELLED)
+        )
+        db.execute(
+            update(Queue)
+            .where(Queue.id == test_queue.id)
+            .values(version=Queue.version + 1)
+        )
+        db.commit()
+
+        assert _ranks(client, entries) == [None, 1, 2]
+        assert rank_index.stats.loads == loads + 2
+
+    def test_disagreement_falls_back_to_the_database(
+        self,
+        client: TestClient,
+        db: Session,
+        test_queue: Queue,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        """Test a checked answer that disagrees is replaced and the index dropped."""
+        monkeypatch.setattr(rank_index, "check_every", 1)
+        entries = _add_entries(db, test_queue, 3)
+        mismatches = rank_index.stats.mismatches
+        assert _ranks(client, entries) == [1, 2, 3]
+
+        # Corrupt the index behind the version checks' back
+        index = rank_index.get(test_queue.id, test_queue.version)
+        assert index is not None
+        index.remove(1)
+
+        assert _ranks(client, entries[2:]) == [3]
+        assert rank_index.stats.mismatches == mismatches + 1
+        assert rank_index.get(test_queue.id, test_queue.version) is None
+
+    @pytest.mark.asyncio
+    async def test_verify(self, client: TestClient, db: Session, test_queue: Queue):
+        """Test verify reports a corrupt index and replaces it."""
+        entries = _add_entries(db, test_queue, 3)
+        assert _ranks(client, entries) == [1, 2, 3]
+
+        try:
+            async with ReadSessionLocal() as session:
+                assert await rank_index.verify(session, test_queue.id)
+                index = rank_index.get(test_queue.id, test_queue.version)
+                assert index is not None
+                index.remove(2)
+                assert not await rank_index.verify(session, test_queue.id)
+        finally:
+            # Connections are bound to this test's event loop
+            await read_engine.dispose()
+
+        current = rank_index.get(test_queue.id, test_queue.version)
+        assert current is not None
+        assert current.positions() == [1, 2, 3]
@@ -0,0 +1,185 @@
+"""Tests for the serialized queue response cache."""
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.queue import Queue, QueueStatus
+from app.services.response_cache import (
+    ResponseCache,
+    queue_key,
+    queues_key,
+    response_cache,
+)
+from tests.conftest import app_sync_engines
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestResponseCache:
+    """Test the cache on its own."""
+
+    def test_hit_requires_matching_etag(self):
+        """Test a body built for an older ETag is never served."""
+        cache = ResponseCache(max_entries=10, ttl_seconds=60)
+        cache.set(queue_key(1), 'W/"1"', b"old", [1])
+
+        assert cache.get(queue_key(1), 'W/"1"') == b"old"
+        assert cache.get(queue_key(1), 'W/"2"') is None
+        # The outdated body is dropped
+        assert len(cache) == 0
+        assert cache.stats.hits == 1
+        assert cache.stats.misses == 1
+
+    def test_entries_expire(self):
+        """Test entries are only served for ttl_seconds."""
+        clock = FakeClock()
+        cache = ResponseCache(max_entries=10, ttl_seconds=5, clock=clock)
+        cache.set(queue_key(1), "etag", b"body", [1])
+
+        clock.now = 4.9
+        assert cache.get(queue_key(1), "etag") == b"body"
+        clock.now = 5.0
+        assert cache.get(queue_key(1), "etag") is None
+
+    def test_evicts_least_recently_used(self):
+        """Test the cache keeps at most max_entries, dropping the coldest."""
+        cache = ResponseCache(max_entries=2, ttl_seconds=60)
+        cache.set(queue_key(1), "etag", b"1", [1])
+        cache.set(queue_key(2), "etag", b"2", [2])
+        cache.get(queue_key(1), "etag")
+        cache.set(queue_key(3), "etag", b"3", [3])
+
+        assert cache.get(queue_key(2), "etag") is None
+        assert cache.get(queue_key(1), "etag") == b"1"
+        assert cache.get(queue_key(3), "etag") == b"3"
+        assert cache.stats.evictions == 1
+
+    def test_invalidation_is_precise(self):
+        """Test a queue change only drops the responses containing that queue."""
+        cache = ResponseCache(max_entries=10, ttl_seconds=60)
+        cache.set(queue_key(1), "etag", b"1", [1])
+        cache.set(queue_key(2), "etag", b"2", [2])
+        cache.set(queues_key("ACTIVE", 0, 1), "etag", b"[1]", [1])
+        cache.set(queues_key("ACTIVE", 1, 1), "etag", b"[2]", [2])
+
+        cache.invalidate_queue(1)
+        assert cache.get(queue_key(1), "etag") is None
+        assert cache.get(queues_key("ACTIVE", 0, 1), "etag") is None
+        assert cache.get(queue_key(2), "etag") == b"2"
+        assert cache.get(queues_key("ACTIVE", 1, 1), "etag") == b"[2]"
+
+        cache.invalidate_listings()
+        assert cache.get(queues_key("ACTIVE", 1, 1), "etag") is None
+        assert cache.get(queue_key(2), "etag") == b"2"
+        assert cache.stats.invalidations == 3
+
+    def test_disabled_with_no_entries(self):
+        """Test max_entries=0 turns the cache off."""
+        cache = ResponseCache(max_entries=0, ttl_seconds=60)
+        cache.set(queue_key(1), "etag", b"1", [1])
+        assert cache.get(queue_key(1), "etag") is None
+
+
+class TestCachedRoutes:
+    """Test the queue routes serve and invalidate cached bodies."""
+
+    def _count_statements(self, client: TestClient, url: str) -> tuple[dict, int]:
+        statements: list[str] = []
+
+        def record_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        for app_engine in app_sync_engines:
+            event.listen(app_engine, "before_cursor_execute", record_statement)
+        try:
+            response = client.get(url)
+        finally:
+            for app_engine in app_sync_engines:
+                event.remove(app_engine, "before_cursor_execute", record_statement)
+        assert response.status_code == 200
+        return response.json(), len(statements)
+
+    def test_hit_matches_miss_and_skips_queries(
+        self, client: TestClient, test_queue: Queue
+    ):
+        """Test a cached read returns the same JSON after only the ETag lookup."""
+        for url in [f"/api/queues/{test_queue.id}", "/api/queues/"]:
+            miss, miss_statements = self._count_statements(client, url)
+            hit, hit_statements = self._count_statements(client, url)
+
+            assert hit == miss
+            assert miss_statements > 1
+            assert hit_statements == 1
+        assert response_cache.stats.hits >= 2
+
+    def test_join_invalidates(self, client: TestClient, test_queue: Queue):
+        """Test joining a queue refreshes its cached size."""
+        url = f"/api/queues/{test_queue.id}"
+        assert client.get(url).json()["current_size"] == 0
+        assert client.get("/api/queues/").json()[0]["current_size"] == 0
+
+        client.post(
+            "/api/entries/join",
+            json={
+                "queue_id": test_queue.id,
+                "customer_name": "Customer",
+                "phone_number": "+1234567890",
+            },
+        ).raise_for_status()
+
+        assert len(response_cache) == 0
+        assert client.get(url).json()["current_size"] == 1
+        assert client.get("/api/queues/").json()[0]["current_size"] == 1
+
+    def test_status_update_invalidates_listings(
+        self, client: TestClient, test_queue: Queue, admin_auth_headers
+    ):
+        """Test pausing a queue removes it from the cached active listing."""
+        assert len(client.get("/api/queues/").json()) == 1
+
+        client.patch(
+            f"/api/queues/{test_queue.id}",
+            json={"status": "paused"},
+            headers=admin_auth_headers,
+        ).raise_for_status()
+
+        assert client.get("/api/queues/").json() == []
+        paused = client.get("/api/queues/", params={"status": "paused"}).json()
+        assert [queue["id"] for queue in paused] == [test_queue.id]
+
+    def test_listing_dropped_after_status_swap_elsewhere(
+        self, client: TestClient, db: Session
+    ):
+        """Test a cached listing is rebuilt when another worker swaps statuses."""
+        a = Queue(name="a", business_name="A", version=6)
+        b = Queue(name="b", business_name="B", status=QueueStatus.PAUSED, version=5)
+        c = Queue(name="c", business_name="C")
+        db.add_all([a, b, c])
+        db.commit()
+        assert [q["name"] for q in client.get("/api/queues/").json()] == ["a", "c"]
+
+        # Written straight to the database, so no route invalidates the entry
+        a.status, a.version = QueueStatus.PAUSED, a.version + 1
+        b.status, b.version = QueueStatus.ACTIVE, b.version + 1
+        db.commit()
+        misses = response_cache.stats.misses
+
+        assert [q["name"] for q in client.get("/api/queues/").json()] == ["b", "c"]
+        assert response_cache.stats.misses == misses + 1
+
+    def test_metrics_report_counters(self, client: TestClient, test_queue: Queue):
+        """Test hit and miss counters are exposed on /metrics."""
+        client.get(f"/api/queues/{test_queue.id}")
+        client.get(f"/api/queues/{test_queue.id}")
+
+        stats = client.get("/metrics").json()["response_cache"]
+        assert stats["hits"] >= 1
+        assert stats["misses"] >= 1
+        assert stats["entries"] >= 1
@@ -124,8 +124,58 @@ class TestSMSIntegration:
             response = client.patch(f"/api/entries/{entry1.id}/cancel")
             assert response.status_code == 200
 
-            # Check if position update SMS was sent to second customer
+            # Second customer is now first in line
             messages = mock_provider.get_sent_messages()
-            # For now, we don't send position updates automatically
-            # This is a future enhancement
-            assert len(messages) == 0  # No automatic updates yet
+            assert len(messages) == 1
+            assert messages[0]["to"] == "+2222222222"
+            assert "position 1" in messages[0]["body"]
+
+    def test_position_alerts_fire_once_per_threshold(
+        self,
+        client: TestClient,
+        admin_auth_headers: dict[str, str],
+        test_queue: Queue,
+    ):
+        """Test customers are texted once as they reach each threshold."""
+        mock_provider = MockSMSProvider()
+        with patch.object(sms_service, "provider", mock_provider):
+            entry_ids = []
+            for i in range(5):
+                response = client.post(
+                    "/api/entries/join",
+                    json={
+                        "queue_id": test_queue.id,
+                        "customer_name": f"Customer {i}",
+                        "phone_number": f"+155500000{i}",
+                    },
+                )
+                entry_ids.append(response.json()["id"])
+            mock_provider.clear_messages()
+
+            # Everyone moves up one: the 2nd customer reaches position 1 and
+            # the 4th reaches position 3; the 3rd stays behind threshold 1
+            client.patch(
+                f"/api/entries/{entry_ids[0]}/call", headers=admin_auth_headers
+            )
+            alerts = {
+                m["to"]: m["body"]
+                for m in mock_provider.get_sent_messages()
+                if "now in position" in m["body"]
+            }
+            assert set(alerts) == {"+1555000001", "+1555000003"}
+            assert "position 1" in alerts["+1555000001"]
+            assert "position 3" in alerts["+1555000003"]
+            mock_provider.clear_messages()
+
+            # Serving a called customer doesn't move the waiting line
+            client.patch(
+                f"/api/entries/{entry_ids[0]}/serve", headers=admin_auth_headers
+            )
+            assert mock_provider.get_sent_messages() == []
+
+            # The 5th customer reaches position 3; the 4th moves to position 2,
+            # which crosses no new threshold
+            client.patch(f"/api/entries/{entry_ids[2]}/cancel")
+            assert [m["to"] for m in mock_provider.get_sent_messages()] == [
+                "+1555000004"
+            ]
@@ -1,8 +1,14 @@
 """Tests for SMS notification service."""
 
+import time
 from unittest.mock import MagicMock, patch
 
-from app.services.sms import MockSMSProvider, SMSService
+import httpx
+import pytest
+
+from app.services.rate_limit import TokenBucket
+from app.services.sms import AsyncTwilioSMSProvider, MockSMSProvider, SMSService
+from benchmarks.fake_twilio import create_fake_twilio_app
 
 
 class TestMockSMSProvider:
@@ -126,3 +132,123 @@ class TestSMSService:
         with patch("app.core.config.settings.environment", "development"):
             service = SMSService()
             assert isinstance(service.provider, MockSMSProvider)
+
+
+def _fake_twilio_provider(app, **kwargs) -> AsyncTwilioSMSProvider:
+    return AsyncTwilioSMSProvider(
+        "ACtest",
+        "token",
+        "+15550000000",
+        base_url="http://fake-twilio",
+        transport=httpx.ASGITransport(app=app),
+        **kwargs,
+    )
+
+
+class TestAsyncTwilioSMSProvider:
+    """Test the httpx-based Twilio provider against the fake Twilio API."""
+
+    @pytest.mark.asyncio
+    async def test_send_sms_success(self):
+        """Test that a 201 response is reported with the message sid."""
+        provider = _fake_twilio_provider(create_fake_twilio_app(latency_ms=0))
+        try:
+            result = await provider.send_sms_async("+1234567890", "Hello")
+        finally:
+            await provider.aclose()
+
+        assert result["success"] is True
+        assert result["message_id"].startswith("SM")
+        assert result["to"] == "+1234567890"
+
+    @pytest.mark.asyncio
+    async def test_send_sms_error(self):
+        """Test that API errors are reported with their status code."""
+        provider = _fake_twilio_provider(
+            create_fake_twilio_app(latency_ms=0, error_rate=1.0)
+        )
+        try:
+            result = await provider.send_sms_async("+1234567890", "Hello")
+        finally:
+            await provider.aclose()
+
+        assert result["success"] is False
+        assert result["status_code"] in (429, 500)
+
+    @pytest.mark.asyncio
+    async def test_send_batch_bounds_concurrency(self):
+        """Test that a batch is sent in parallel but never above the limit."""
+        app = create_fake_twilio_app(latency_ms=20)
+        provider = _fake_twilio_provider(app, max_concurrency=4)
+        messages = [(f"+1555000{i:04d}", f"Message {i}") for i in range(20)]
+        try:
+            results = await provider.send_batch(messages)
+        finally:
+            await provider.aclose()
+
+        assert [r["to"] for r in results] == [to for to, _ in messages]
+        assert all(r["success"] for r in results)
+        assert app.state.stats.requests == 20
+        assert app.state.stats.max_in_flight == 4
+
+    @pytest.mark.asyncio
+    async def test_service_send_batch_skips_invalid_numbers(self):
+        """Test that invalid numbers fail in place without being sent."""
+        provider = MockSMSProvider()
+        service = SMSService(provider=provider)
+
+        results = await service.send_batch(
+            [("+1111111111", "First"), ("invalid", "Second"), ("+2222222222", "Third")]
+        )
+
+        assert [r["success"] for r in results] == [True, False, True]
+        assert [m["to"] for m in provider.get_sent_messages()] == [
+            "+1111111111",
+            "+2222222222",
+        ]
+
+
+class TestSMSPacing:
+    """Test token-bucket pacing inside the SMS service."""
+
+    def test_token_bucket_allows_burst_then_paces(self):
+        """Test that a bucket hands out its burst immediately, then queues."""
+        bucket = TokenBucket(rate=10, burst=3)
+
+        delays = [bucket.reserve() for _ in range(5)]
+
+        assert delays[:3] == [0, 0, 0]
+        assert delays[3] == pytest.approx(0.1, abs=0.01)
+        assert delays[4] == pytest.approx(0.2, abs=0.01)
+
+    @pytest.mark.asyncio
+    async def test_batch_over_burst_is_paced_not_rejected(self):
+        """Test that a burst above the per-number limit is delayed and sent."""
+        provider = MockSMSProvider()
+        provider.from_number = "+15550000000"
+        service = SMSService(
+            provider=provider, provider_rate=0, number_rate=50, number_burst=2
+        )
+        messages = [(f"+1555000{i:04d}", f"Message {i}") for i in range(6)]
+
+        started = time.monotonic()
+        results = await service.send_batch(messages)
+        elapsed = time.monotonic() - started
+
+        assert all(r["success"] for r in results)
+        assert len(provider.get_sent_messages()) == 6
+        assert elapsed >= 4 / 50 * 0.9
+        stats = service.pacing_stats()["from:+15550000000"]
+        assert stats["acquired"] == 6
+        assert stats["delayed"] == 4
+        assert stats["max_delay_seconds"] == pytest.approx(4 / 50, abs=0.01)
+        assert max(r["pacing_delay_seconds"] for r in results) > 0
+
+    def test_pacing_can_be_disabled(self):
+        """Test that a zero rate adds no bucket and no delay."""
+        service = SMSService(provider=MockSMSProvider(), provider_rate=0)
+
+        result = service.send_message("+1234567890", "Hello")
+
+        assert result["pacing_delay_seconds"] == 0
+        assert service.pacing_stats() == {}
@@ -0,0 +1,216 @@
+"""Tests for wait estimates learned from service times."""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.queue import EntryStatus, Queue, QueueEntry
+from app.services.sms import MockSMSProvider, sms_service
+from app.services.wait_estimator import ServiceTimes, WaitEstimator, wait_estimator
+
+START = datetime(2026, 1, 1, 9, 0)
+
+
+def _at(minutes: float) -> datetime:
+    return START + timedelta(minutes=minutes)
+
+
+class TestServiceTimes:
+    def _times(self) -> ServiceTimes:
+        return ServiceTimes(alpha=0.2, window=3, max_sample_minutes=60)
+
+    def test_samples_are_the_time_between_serves(self):
+        times = self._times()
+        times.observe(_at(0), _at(10), 1)
+        times.observe(_at(1), _at(14), 1)
+
+        assert [minutes for minutes, _ in times.samples] == [10, 4]
+
+    def test_idle_line_counts_from_the_join(self):
+        """Test time the line stood empty is not a service time."""
+        times = self._times()
+        times.observe(_at(0), _at(10), 1)
+        times.observe(_at(30), _at(33), 1)
+
+        assert times.samples[-1] == (3, 1)
+
+    def test_party_size_weights_the_ewma(self):
+        """Test a party of two moves the average like two samples."""
+        times = self._times()
+        times.observe(_at(0), _at(10), 1)
+        times.observe(_at(0), _at(14), 2)
+
+        assert times.ewma == pytest.approx(10 + (1 - 0.8**2) * (4 - 10))
+
+    def test_weighted_percentiles_of_the_window(self):
+        times = self._times()
+        times.observe(_at(0), _at(1), 1)
+        times.observe(_at(0), _at(3), 1)
+        times.observe(_at(0), _at(13), 3)
+        times.observe(_at(0), _at(23), 1)
+
+        # The first sample has left the window of three
+        assert times.count == 4
+        assert times.percentile(0.5) == 10
+        assert times.percentile(0.1) == 2
+        assert times.percentile(0.9) == 10
+
+    def test_overlong_samples_are_left_out(self):
+        times = self._times()
+        times.observe(_at(0), _at(10), 1)
+        times.observe(_at(0), _at(600), 1)
+        times.observe(_at(0), _at(605), 1)
+
+        assert [minutes for minutes, _ in times.samples] == [10, 5]
+
+
+class TestWaitEstimator:
+    def test_unknown_statistic(self):
+        with pytest.raises(ValueError):
+            WaitEstimator(
+                max_queues=1,
+                statistic="mode",
+                alpha=0.2,
+                window=10,
+                min_samples=1,
+                max_sample_minutes=60,
+            )
+
+
+def _served_history(db: Session, queue: Queue, gaps: list[float]) -> None:
+    """Entries served ``gaps`` minutes apart, the last one just now."""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    served_at = now - timedelta(minutes=sum(gaps))
+    entries = [
+        QueueEntry(
+            queue_id=queue.id,
+            customer_name="Earlier",
+            phone_number="+1234567890",
+            position=1,
+            status=EntryStatus.SERVED,
+            joined_at=served_at - timedelta(hours=1),
+            served_at=served_at,
+        )
+    ]
+    for gap in gaps:
+        served_at += timedelta(minutes=gap)
+        entries.append(
+            QueueEntry(
+                queue_id=queue.id,
+                customer_name="Earlier",
+                phone_number="+1234567890",
+                position=len(entries) + 1,
+                status=EntryStatus.SERVED,
+                joined_at=served_at - timedelta(hours=1),
+                served_at=served_at,
+            )
+        )
+    db.add_all(entries)
+    queue.next_position = len(entries) + 1
+    db.commit()
+
+
+def _join(client: TestClient, queue: Queue, name: str) -> dict:
+    response = client.post(
+        "/api/entries/join",
+        json={
+            "queue_id": queue.id,
+            "customer_name": name,
+            "phone_number": "+1234567890",
+        },
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+class TestEstimatedWaits:
+    """Test the routes estimate waits from the queue's history."""
+
+    def test_static_until_enough_serves(
+        self, client: TestClient, db: Session, test_queue: Queue
+    ):
+        _served_history(db, test_queue, [2.0] * 3)
+        _join(client, test_queue, "First")
+
+        assert _join(client, test_queue, "Second")["estimated_wait_minutes"] == 5
+
+    def test_waits_follow_service_times(
+        self, client: TestClient, db: Session, test_queue: Queue
+    ):
+        """Test join, status and listing all use the learned minutes."""
+        _served_history(db, test_queue, [2.0] * 10)
+        first = _join(client, test_queue, "First")
+        second = _join(client, test_queue, "Second")
+        third = _join(client, test_queue, "Third")
+
+        assert third["estimated_wait_minutes"] == 4
+        status = client.get(f"/api/entries/{second['id']}").json()
+        assert status["estimated_wait_minutes"] == 2
+        listing = client.get(f"/api/entries/queue/{test_queue.id}").json()
+        assert [e["estimated_wait_minutes"] for e in listing] == [0, 2, 4]
+        assert first["estimated_wait_minutes"] == 0
+
+    def test_position_alerts_use_learned_minutes(
+        self,
+        client: TestClient,
+        db: Session,
+        test_queue: Queue,
+        admin_auth_headers: dict[str, str],
+    ):
+        """Test the wait in a position alert comes from the learned minutes."""
+        _served_history(db, test_queue, [2.0] * 10)
+        joined = [_join(client, test_queue, f"Customer {i}") for i in range(4)]
+
+        mock_provider = MockSMSProvider()
+        with patch.object(sms_service, "provider", mock_provider):
+            client.patch(
+                f"/api/entries/{joined[0]['id']}/call", headers=admin_auth_headers
+            ).raise_for_status()
+
+        alerts = [
+            m["body"]
+            for m in mock_provider.get_sent_messages()
+            if "now in position 3" in m["body"]
+        ]
+        # Two waiting entries ahead at the learned 2 minutes, not the static 5
+        assert len(alerts) == 1
+        assert "Estimated wait time: 4 minutes" in alerts[0]
+
+    def test_serves_update_the_statistics(
+        self,
+        client: TestClient,
+        db: Session,
+        test_queue: Queue,
+        admin_auth_headers: dict[str, str],
+    ):
+        """Test a serve is learned from without reloading the history."""
+        _served_history(db, test_queue, [8.0] * 10)
+        first = _join(client, test_queue, "First")
+        second = _join(client, test_queue, "Second")
+        assert second["estimated_wait_minutes"] == 8
+        loads = wait_estimator.stats.loads
+
+        client.patch(f"/api/entries/{first['id']}/call", headers=admin_auth_headers)
+        client.patch(f"/api/entries/{first['id']}/serve", headers=admin_auth_headers)
+        _join(client, test_queue, "Third")
+        third = client.get(f"/api/entries/queue/{test_queue.id}").json()[-1]
+
+        # Served right away, so the average drops by alpha
+        assert third["estimated_wait_minutes"] == round(8 * 0.8)
+        assert wait_estimator.stats.loads == loads
+
+    def test_static_statistic(
+        self,
+        client: TestClient,
+        db: Session,
+        test_queue: Queue,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(wait_estimator, "statistic", "static")
+        _served_history(db, test_queue, [2.0] * 10)
+        _join(client, test_queue, "First")
+
+        assert _join(client, test_queue, "Second")["estimated_wait_minutes"] == 5